@@ -0,0 +1,72 @@
+# app_resources.py (process-wide API clients, opened and closed by the app lifespan)
+#
+# HTTP_MAX_CONNECTIONS        connections per client to the OpenAI API
+# HTTP_KEEPALIVE_CONNECTIONS  idle connections kept open for reuse
+# HTTP_KEEPALIVE_EXPIRY       seconds an idle connection is kept
+
+import os
+import asyncio
+import threading
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+
+
+def _limits():
+    import httpx
+    return httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_KEEPALIVE_CONNECTIONS,
+                        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY)
+
+
+class Resources:
+    """
+    One AsyncOpenAI client for the event loop and one OpenAI client for the
+    thread-based paths, each on its own pooled keep-alive connection pool.
+    Built on first use, so importing a module never pays for the openai
+    package; warm_up() builds them off the event loop at startup.
+    """
+
+    def __init__(self):
+        self._openai = None
+        self._openai_sync = None
+        self.lock = threading.Lock()
+
+    @property
+    def openai(self):
+        if self._openai is None:
+            with self.lock:
+                if self._openai is None:
+                    from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+                    self._openai = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"),
+                                               http_client=DefaultAsyncHttpxClient(limits=_limits()))
+        return self._openai
+
+    @property
+    def openai_sync(self):
+        if self._openai_sync is None:
+            with self.lock:
+                if self._openai_sync is None:
+                    from openai import OpenAI, DefaultHttpxClient
+                    self._openai_sync = OpenAI(api_key=os.getenv("OPENAI_API_KEY"),
+                                               http_client=DefaultHttpxClient(limits=_limits()))
+        return self._openai_sync
+
+    @property
+    def ready(self):
+        return self._openai is not None
+
+    async def warm_up(self):
+        """Imports openai and builds the async client on a worker thread."""
+        await asyncio.to_thread(lambda: self.openai)
+
+    async def close(self):
+        client, self._openai = self._openai, None
+        if client is not None:
+            await client.close()
+        sync_client, self._openai_sync = self._openai_sync, None
+        if sync_client is not None:
+            sync_client.close()
+
+
+resources = Resources()
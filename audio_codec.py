@@ -0,0 +1,144 @@
+# audio_codec.py (audio formats negotiated on the /ws/audio connection)
+#
+# The client picks them with query parameters when it connects; the server
+# answers with {"format": {...}} describing what it will actually use.
+#
+#   codec=pcm&rate=N   raw PCM16 mono at N Hz upstream (default 16000, the model rate)
+#   codec=opus         one raw Opus packet per binary message (WebCodecs AudioEncoder output)
+#   reply=opus         replies as Ogg Opus instead of raw PCM16 (streaming) or base64 WAV
+#   reply=pcm          the uncompressed replies above
+#   bitrate=N          Opus reply bitrate in bit/s
+#
+# Without reply=, a client sending Opus gets Opus back and anyone else gets
+# AUDIO_REPLY_CODEC. Everything upstream is decoded and resampled to 16 kHz
+# float32 for the VAD and Whisper. Opus needs PyAV (av): without it, opus
+# input is refused and opus replies fall back to PCM.
+
+import os
+import io
+import numpy as np
+from audio_decode import StreamResampler, TARGET_RATE
+from vad_segmenter import pcm16_to_float32
+
+AUDIO_REPLY_CODEC = os.getenv("AUDIO_REPLY_CODEC", "pcm")
+OPUS_BITRATE = int(os.getenv("OPUS_BITRATE", "24000"))      # plenty for speech at 24 kHz
+MIN_BITRATE, MAX_BITRATE = 6000, 128000
+OPUS_RATE = 48000                                            # libopus decodes at 48 kHz
+INPUT_RATES = (8000, 11025, 12000, 16000, 22050, 24000, 32000, 44100, 48000)
+
+try:
+    import av  # PyAV: libopus encode/decode in-process
+except ImportError:
+    av = None
+
+
+class UnsupportedFormat(ValueError):
+    pass
+
+
+def to_float32(samples):
+    samples = samples.reshape(-1) if samples.ndim == 1 or samples.shape[0] == 1 else samples.mean(axis=0)
+    if samples.dtype == np.int16:
+        return samples.astype(np.float32) / 32768.0
+    return samples.astype(np.float32, copy=False)
+
+
+class PcmDecoder:
+    """Raw PCM16 at any of INPUT_RATES to 16 kHz float32; odd bytes wait for the next message."""
+
+    def __init__(self, rate=TARGET_RATE):
+        self.leftover = b""
+        self.resampler = StreamResampler(rate, TARGET_RATE)
+
+    def decode(self, data):
+        data = self.leftover + bytes(data)
+        usable = len(data) - len(data) % 2
+        self.leftover = data[usable:]
+        return self.resampler.process(pcm16_to_float32(data[:usable]))
+
+
+class OpusDecoder:
+    """Raw Opus packets to 16 kHz float32. A packet that fails to decode is dropped and counted."""
+
+    def __init__(self):
+        self.codec = av.CodecContext.create("libopus", "r")
+        self.codec.sample_rate = OPUS_RATE
+        self.codec.layout = "mono"
+        self.resampler = StreamResampler(OPUS_RATE, TARGET_RATE)
+        self.corrupt = 0
+
+    def decode(self, packet):
+        if not packet:
+            return np.zeros(0, dtype=np.float32)  # an empty packet would flush the decoder
+        try:
+            frames = self.codec.decode(av.Packet(bytes(packet)))
+        except av.error.FFmpegError:
+            self.corrupt += 1
+            return np.zeros(0, dtype=np.float32)
+        if not frames:
+            return np.zeros(0, dtype=np.float32)
+        return self.resampler.process(np.concatenate([to_float32(frame.to_ndarray()) for frame in frames]))
+
+
+def encode_ogg_opus(pcm, sample_rate, bitrate=OPUS_BITRATE):
+    """
+    PCM16 mono bytes to a complete Ogg Opus file, which browsers play with
+    decodeAudioData. CPU-bound (a few ms per second of audio): call it off
+    the event loop.
+    """
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    buffer = io.BytesIO()
+    with av.open(buffer, "w", format="ogg") as container:
+        stream = container.add_stream("libopus", rate=sample_rate)
+        stream.bit_rate = bitrate
+        stream.layout = "mono"
+        frame = av.AudioFrame.from_ndarray(np.ascontiguousarray(samples).reshape(1, -1), format="s16", layout="mono")
+        frame.sample_rate = sample_rate
+        for packet in stream.encode(frame):
+            container.mux(packet)
+        for packet in stream.encode(None):
+            container.mux(packet)
+    return buffer.getvalue()
+
+
+class AudioFormat:
+    """What one connection sends and gets back, from its query parameters."""
+
+    def __init__(self, codec="pcm", rate=TARGET_RATE, reply=AUDIO_REPLY_CODEC, bitrate=OPUS_BITRATE):
+        self.codec = codec
+        self.rate = rate
+        self.reply = reply if av is not None else "pcm"
+        self.bitrate = bitrate
+
+    @classmethod
+    def negotiate(cls, params):
+        codec = params.get("codec", "pcm")
+        if codec not in ("pcm", "opus"):
+            raise UnsupportedFormat(f"Unknown codec {codec!r}; use pcm or opus")
+        if codec == "opus" and av is None:
+            raise UnsupportedFormat("Opus input is not available on this server; send codec=pcm")
+        try:
+            rate = OPUS_RATE if codec == "opus" else int(params.get("rate", TARGET_RATE))
+            bitrate = int(params.get("bitrate", OPUS_BITRATE))
+        except ValueError:
+            raise UnsupportedFormat("rate and bitrate must be integers")
+        if rate not in INPUT_RATES:
+            raise UnsupportedFormat(f"Unsupported rate {rate}; use one of {', '.join(map(str, INPUT_RATES))}")
+        reply = params.get("reply") or ("opus" if codec == "opus" else AUDIO_REPLY_CODEC)
+        if reply not in ("pcm", "opus"):
+            raise UnsupportedFormat(f"Unknown reply codec {reply!r}; use pcm or opus")
+        return cls(codec, rate, reply, min(max(bitrate, MIN_BITRATE), MAX_BITRATE))
+
+    @property
+    def opus_replies(self):
+        return self.reply == "opus"
+
+    def decoder(self):
+        return OpusDecoder() if self.codec == "opus" else PcmDecoder(self.rate)
+
+    def describe(self, streaming, reply_rate):
+        if self.opus_replies:
+            reply = {"codec": "ogg_opus", "sample_rate": reply_rate, "bitrate": self.bitrate}
+        else:
+            reply = {"codec": "pcm16", "sample_rate": reply_rate} if streaming else {"codec": "wav"}
+        return {"input": {"codec": self.codec, "sample_rate": self.rate}, "reply": reply}
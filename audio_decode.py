@@ -0,0 +1,127 @@
+# audio_decode.py (in-memory decoding of uploaded audio into Whisper-ready float32)
+
+import io
+import subprocess
+import numpy as np
+import soundfile as sf
+
+TARGET_RATE = 16000
+
+try:
+    import av  # PyAV: in-process FFmpeg bindings, decodes webm/opus without a subprocess
+except ImportError:
+    av = None
+
+
+def to_mono(audio):
+    return audio if audio.ndim == 1 else audio.mean(axis=1)
+
+
+def lowpass_kernel(src_rate, dst_rate):
+    """Windowed-sinc low-pass at the Nyquist frequency of dst_rate, for downsampling from src_rate."""
+    cutoff = dst_rate / src_rate / 2
+    taps = 8 * int(np.ceil(src_rate / dst_rate)) + 1
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+    return kernel / kernel.sum()
+
+
+def resample(audio, src_rate, dst_rate=TARGET_RATE):
+    """
+    Vectorized resampling of a mono float32 signal. Downsampling applies a
+    windowed-sinc low-pass at the new Nyquist frequency before linear
+    interpolation onto the target grid.
+    """
+    if src_rate == dst_rate or len(audio) == 0:
+        return audio.astype(np.float32, copy=False)
+
+    if dst_rate < src_rate:
+        audio = np.convolve(audio, lowpass_kernel(src_rate, dst_rate), mode="same")
+
+    duration = len(audio) / src_rate
+    n_out = int(round(duration * dst_rate))
+    src_times = np.arange(len(audio)) / src_rate
+    dst_times = np.arange(n_out) / dst_rate
+    return np.interp(dst_times, src_times, audio).astype(np.float32)
+
+
+class StreamResampler:
+    """
+    resample() for a signal that arrives in chunks (a live microphone). The
+    low-pass history and the interpolation phase carry over between chunks,
+    so chunk boundaries add no clicks and the output rate never drifts.
+    """
+
+    def __init__(self, src_rate, dst_rate=TARGET_RATE):
+        self.src_rate = src_rate
+        self.dst_rate = dst_rate
+        self.step = src_rate / dst_rate
+        self.kernel = lowpass_kernel(src_rate, dst_rate) if dst_rate < src_rate else None
+        self.history = np.zeros(len(self.kernel) - 1 if self.kernel is not None else 0, dtype=np.float32)
+        self.buffer = np.zeros(0, dtype=np.float32)
+        self.position = 0.0   # input index of the next output sample, relative to buffer
+
+    def process(self, audio):
+        audio = np.asarray(audio, dtype=np.float32)
+        if self.src_rate == self.dst_rate:
+            return audio
+        if self.kernel is not None:
+            padded = np.concatenate([self.history, audio])
+            self.history = padded[len(padded) - len(self.history):]
+            audio = np.convolve(padded, self.kernel, mode="valid").astype(np.float32)
+        self.buffer = np.concatenate([self.buffer, audio])
+
+        last = len(self.buffer) - 1
+        n_out = int((last - self.position) // self.step) + 1 if last >= self.position else 0
+        times = self.position + self.step * np.arange(n_out)
+        out = np.interp(times, np.arange(len(self.buffer)), self.buffer).astype(np.float32)
+
+        self.position += n_out * self.step
+        consumed = min(int(self.position), len(self.buffer))
+        self.buffer = self.buffer[consumed:]
+        self.position -= consumed
+        return out
+
+
+def _decode_soundfile(data):
+    audio, rate = sf.read(io.BytesIO(data), dtype="float32")
+    return resample(to_mono(audio), rate)
+
+
+def _decode_pyav(data):
+    with av.open(io.BytesIO(data)) as container:
+        stream = container.streams.audio[0]
+        converter = av.AudioResampler(format="flt", layout="mono", rate=stream.rate or TARGET_RATE)
+        chunks = []
+        for frame in container.decode(stream):
+            for converted in converter.resample(frame):
+                chunks.append(converted.to_ndarray().reshape(-1))
+        for converted in converter.resample(None):
+            chunks.append(converted.to_ndarray().reshape(-1))
+        rate = converter.rate
+    audio = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float32)
+    return resample(audio, rate)
+
+
+def _decode_ffmpeg_pipe(data):
+    # Bytes in on stdin, raw float32 16 kHz mono out on stdout: no temp files.
+    result = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+         "-f", "f32le", "-ac", "1", "-ar", str(TARGET_RATE), "pipe:1"],
+        input=data, capture_output=True, check=True
+    )
+    return np.frombuffer(result.stdout, dtype=np.float32)
+
+
+def decode_to_float32(data: bytes) -> np.ndarray:
+    """
+    Decodes an uploaded recording (wav/flac/ogg via libsndfile, webm/opus via
+    PyAV, anything else via an ffmpeg pipe) to 16 kHz mono float32.
+    """
+    try:
+        return _decode_soundfile(data)
+    except RuntimeError:  # LibsndfileError: container libsndfile cannot read (e.g. webm)
+        pass
+    if av is not None:
+        return _decode_pyav(data)
+    return _decode_ffmpeg_pipe(data)
@@ -1,88 +1,82 @@
 # backend_socket_bridge.py (new file to stream browser audio chunks to Azure GPT-4o)
 
-import os
-import json
 import base64
-import uuid
 import asyncio
-import websockets
-from datetime import datetime
-from openai import OpenAI
-from fastapi import UploadFile
-import tempfile
-import subprocess
+import threading
+from realtime_session_pool import RealtimeSessionPool
+from streaming_tts import stream_reply_audio
+from tts_cache import tts_cache
+import whisper_registry
+from audio_decode import decode_to_float32
+import pipeline_metrics as metrics
+from pipeline_metrics import log
+from app_resources import resources
+from worker_drain import drain
 
-AZURE_WS_URI = f"wss://{os.getenv('AZURE_HOST')}/openai/realtime?api-version=2024-10-01-preview&deployment=gpt-4o-mini-realtime-preview&api-key={os.getenv('AZURE_API_KEY')}"
-openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# process_browser_audio is synchronous, so pooled realtime connections live on one
+# background event loop instead of a fresh loop (and fresh connection) per request.
+# The loop's thread starts on first use, not at import.
+_bridge = None
+_bridge_lock = threading.Lock()
+realtime_pool = RealtimeSessionPool()  # owned by the bridge loop only
 
-async def stream_to_gpt_and_respond(text_input: str):
-    try:
-        async with websockets.connect(AZURE_WS_URI) as ws:
-            await ws.send(json.dumps({
-                "type": "session.update",
-                "session": {
-                    "modalities": ["text"],
-                    "tool_choice": "auto"
-                },
-                "event_id": str(uuid.uuid4())
-            }))
-
-            await ws.send(json.dumps({
-                "type": "conversation.item.create",
-                "item": {
-                    "type": "message",
-                    "role": "user",
-                    "content": [{"type": "input_text", "text": text_input}]
-                },
-                "event_id": str(uuid.uuid4())
-            }))
-            await ws.send(json.dumps({"type": "response.create", "event_id": str(uuid.uuid4())}))
-
-            full_response = ""
-            async for message in ws:
-                data = json.loads(message)
-                if data.get("type") == "response.text.delta":
-                    full_response += data.get("text", "")
-                elif data.get("type") == "response.text.done":
-                    break
-
-            return full_response
+def bridge_loop():
+    global _bridge
+    with _bridge_lock:
+        if _bridge is None:
+            _bridge = asyncio.new_event_loop()
+            threading.Thread(target=_bridge.run_forever, name="realtime-bridge", daemon=True).start()
+    return _bridge
 
+async def stream_to_gpt_and_respond(text_input: str, session_id: str = "browser"):
+    try:
+        return await realtime_pool.ask(session_id, text_input)
     except Exception as e:
-        print("[WebSocket Error]", e)
+        log("error", f"[WebSocket Error] {e}", session_id=session_id)
         return "Sorry, something went wrong."
 
-def convert_webm_to_wav(input_path):
-    output_path = input_path.replace(".webm", ".wav")
-    subprocess.run(["ffmpeg", "-y", "-i", input_path, output_path], capture_output=True)
-    return output_path
-
 def generate_tts_response(text: str) -> str:
-    speech = openai_client.audio.speech.create(
-        model="tts-1",
-        voice="nova",
-        input=text,
-        response_format="wav"
-    )
-    return base64.b64encode(speech.content).decode("utf-8")
+    audio_bytes = tts_cache.synthesize(resources.openai_sync, text, response_format="wav")
+    return base64.b64encode(audio_bytes).decode("utf-8")
 
-def process_browser_audio(audio: UploadFile):
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".webm") as temp_webm:
-        content = audio.file.read()
-        temp_webm.write(content)
-        webm_path = temp_webm.name
+async def _synthesize_pcm(text: str) -> bytes:
+    return await asyncio.to_thread(tts_cache.synthesize, resources.openai_sync, text, "pcm")
 
-    wav_path = convert_webm_to_wav(webm_path)
+def iter_reply_audio(text_input: str, session_id: str = "browser"):
+    """
+    Sentence-by-sentence variant of stream_to_gpt_and_respond + generate_tts_response:
+    yields (sentence, pcm16 bytes at 24 kHz) as soon as each sentence is synthesized.
+    """
+    audio_stream = stream_reply_audio(realtime_pool.ask_stream(session_id, text_input), _synthesize_pcm)
+    while True:
+        try:
+            yield asyncio.run_coroutine_threadsafe(audio_stream.__anext__(), bridge_loop()).result()
+        except StopAsyncIteration:
+            return
 
-    import whisper
-    model = whisper.load_model("base")
-    transcription = model.transcribe(wav_path).get("text", "")
-    print("🗣 Transcribed:", transcription)
+def process_browser_audio(audio, session_id: str = "browser"):
+    with drain.turn():  # a graceful shutdown waits for this reply to finish
+        trace = metrics.start_turn(session_id)
+        status = "error"
+        try:
+            # Decoded in memory straight to 16 kHz float32: no temp files, no ffmpeg spawn
+            with trace.span("decode"):
+                audio_array = decode_to_float32(audio.file.read())
+            with trace.span("transcribe"):
+                transcription = whisper_registry.transcribe(audio_array)
+            log("transcript", f"🗣 Transcribed: {transcription}", session_id=session_id, turn_id=trace.turn_id)
 
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    reply_text = loop.run_until_complete(stream_to_gpt_and_respond(transcription))
-    print("🤖 GPT-4o said:", reply_text)
+            with trace.span("llm"):
+                reply_text = asyncio.run_coroutine_threadsafe(
+                    stream_to_gpt_and_respond(transcription, session_id), bridge_loop()
+                ).result()
+            log("reply", f"🤖 GPT-4o said: {reply_text}", session_id=session_id, turn_id=trace.turn_id)
 
-    audio_b64 = generate_tts_response(reply_text)
-    return transcription, reply_text, audio_b64
+            with trace.span("tts"):
+                audio_bytes = tts_cache.synthesize(resources.openai_sync, reply_text, response_format="wav")
+            with trace.span("base64"):
+                audio_b64 = base64.b64encode(audio_bytes).decode("utf-8")
+            status = "ok"
+            return transcription, reply_text, audio_b64
+        finally:
+            trace.finish(status)
@@ -0,0 +1,265 @@
+# batch_forms.py (offline mode: a directory of recorded calls to filled PDFs)
+#
+#   python batch_forms.py recordings/ --output filled/
+#   python batch_forms.py recordings/ --output filled/ --workers 4 --batch-size 16
+#
+# Each recording is decoded and split into utterances by the VAD on a process
+# pool; utterances are transcribed in batches shared across the recordings in
+# flight (InferenceScheduler.run_batch); fields are extracted by the live
+# extractor and checked by form_progress; the PDF is rendered on the same
+# process pool, to <output>/<recording path>.pdf (calls/a.wav -> calls/a.wav.pdf:
+# the input tree mirrored, extension kept, so no two recordings share a PDF).
+# <output>/manifest.jsonl gets a line per finished recording,
+# so a restart skips recordings already done (unless the file changed) and
+# retries failures. <output>/report.json summarizes the whole directory,
+# including recordings/hour per core for this run.
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import whisper_registry
+from app_resources import resources
+from inference_scheduler import InferenceScheduler, MAX_BATCH
+from field_extractor import extractor
+from form_progress import progress as form_progress
+from pdf_jobs import PDF_TEMPLATE, load_in_worker, render_in_worker
+
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", str(os.cpu_count() or 1)))
+BATCH_EXTRACT_CONCURRENCY = int(os.getenv("BATCH_EXTRACT_CONCURRENCY", "8"))   # LLM calls in flight
+RECORDING_SUFFIXES = {".wav", ".flac", ".ogg", ".opus", ".webm", ".mp3", ".m4a"}
+# Speech before the agent's first question answers this, as far as the extractor is concerned
+OPENING_QUESTION = "Please tell me about your business for the merchant processing application."
+
+
+def split_recording(path):
+    """Worker: decodes a recording and returns (seconds, utterances as 16 kHz float32)."""
+    from audio_decode import decode_to_float32
+    from vad_segmenter import UtteranceSegmenter, SAMPLE_RATE
+    audio = decode_to_float32(Path(path).read_bytes())
+    segmenter = UtteranceSegmenter(partial_interval_s=0)
+    events = segmenter.feed_samples(audio) + segmenter.flush()
+    return len(audio) / SAMPLE_RATE, [segment for kind, segment in events if kind == "final"]
+
+
+def transcribe_segments(audios):
+    return whisper_registry.transcribe_batch(audios)
+
+
+def conversation_turns(texts):
+    """
+    (question, answer) pairs from a call's utterances in order: an utterance
+    ending in "?" is the agent asking, and what follows it until the next
+    question is the answer.
+    """
+    turns, question, answer = [], OPENING_QUESTION, []
+    for text in filter(None, (t.strip() for t in texts)):
+        if text.endswith("?"):
+            if answer:
+                turns.append((question, " ".join(answer)))
+            question, answer = text, []
+        else:
+            answer.append(text)
+    if answer:
+        turns.append((question, " ".join(answer)))
+    return turns
+
+
+def fingerprint(path):
+    stat = path.stat()
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def available_cores():
+    return len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+
+
+class Manifest:
+    """
+    Append-only JSON lines, one per finished recording; the last line for a
+    recording wins. Each line is flushed to disk before the next recording
+    is reported, and a torn last line from a crash is ignored on load.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if path.exists():
+            for line in path.read_text().splitlines():
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self.entries[entry["recording"]] = entry
+        self.file = open(path, "a")
+
+    def is_done(self, name, source_fingerprint):
+        entry = self.entries.get(name)
+        return (entry is not None and entry["status"] == "done" and entry["fingerprint"] == source_fingerprint
+                and Path(entry["pdf"]).exists())
+
+    def record(self, entry):
+        self.entries[entry["recording"]] = entry
+        self.file.write(json.dumps(entry) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+class BatchRun:
+    """One pass over a directory: recordings flow split -> transcribe -> extract -> render concurrently."""
+
+    def __init__(self, input_dir, output_dir, template=PDF_TEMPLATE, workers=BATCH_WORKERS, batch_size=MAX_BATCH,
+                 force=False):
+        self.input_dir = Path(input_dir)
+        self.output_dir = Path(output_dir)
+        self.template = template
+        self.workers = workers
+        self.batch_size = batch_size
+        self.force = force
+        self.recordings = sorted(p for p in self.input_dir.rglob("*")
+                                 if p.is_file() and p.suffix.lower() in RECORDING_SUFFIXES)
+
+    async def process(self, path):
+        name = str(path.relative_to(self.input_dir))
+        entry = {"recording": name, "fingerprint": fingerprint(path), "status": "failed"}
+        loop = asyncio.get_running_loop()
+        try:
+            async with self.in_flight:
+                started = time.perf_counter()
+                seconds, segments = await loop.run_in_executor(self.pool, split_recording, str(path))
+                split = time.perf_counter()
+                # One scheduler key per utterance, so batches fill from every recording in flight
+                texts = await asyncio.gather(*[
+                    self.scheduler.run_batch(f"{name}#{i}", transcribe_segments, segment)
+                    for i, segment in enumerate(segments)
+                ])
+                transcribed = time.perf_counter()
+
+                turns = conversation_turns(texts)
+                async with self.extract_limit:
+                    form_data = await extractor.extract(turns, {}) if turns else {}
+                summary = form_progress.summary({"form_data": form_data})
+                filled = {**form_data, **{field: status["value"] for field, status in summary["fields"].items()
+                                          if status["value"] is not None}}
+                extracted = time.perf_counter()
+
+                pdf_path = self.output_dir / f"{name}.pdf"
+                pdf_bytes = await loop.run_in_executor(self.pool, render_in_worker, self.template, filled)
+                pdf_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = pdf_path.with_suffix(".pdf.tmp")
+                tmp.write_bytes(pdf_bytes)
+                os.replace(tmp, pdf_path)
+                rendered = time.perf_counter()
+
+            entry.update({
+                "status": "done",
+                "pdf": str(pdf_path),
+                "audio_s": round(seconds, 2),
+                "utterances": len(segments),
+                "required_valid": f"{summary['valid']}/{summary['required']}",
+                "missing": summary["missing"],
+                "invalid": summary["invalid"],
+                "form_data": filled,
+                "transcript": texts,
+                "stages_s": {"split": round(split - started, 3), "transcribe": round(transcribed - split, 3),
+                             "extract": round(extracted - transcribed, 3), "render": round(rendered - extracted, 3)},
+            })
+            print(f"✅ {name}: {summary['valid']}/{summary['required']} required fields "
+                  f"({rendered - started:.1f}s, {len(segments)} utterances)")
+        except Exception as e:
+            entry["error"] = f"{type(e).__name__}: {e}"
+            print(f"❌ {name}: {entry['error']}")
+        self.manifest.record(entry)
+        return entry
+
+    async def run(self):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest = Manifest(self.output_dir / "manifest.jsonl")
+        todo = [p for p in self.recordings
+                if self.force or not self.manifest.is_done(str(p.relative_to(self.input_dir)), fingerprint(p))]
+        print(f"🗂 {len(self.recordings)} recordings, {len(self.recordings) - len(todo)} already done, "
+              f"{len(todo)} to process on {self.workers} workers")
+
+        self.scheduler = InferenceScheduler(max_workers=whisper_registry.WHISPER_NUM_WORKERS, max_session_queue=1,
+                                            max_pending=sys.maxsize, max_batch=self.batch_size)
+        self.in_flight = asyncio.Semaphore(self.workers * 2)   # bounds decoded audio held in memory
+        self.extract_limit = asyncio.Semaphore(BATCH_EXTRACT_CONCURRENCY)
+        # spawn, not fork: the scheduler and the OpenAI client run threads in this process
+        self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=load_in_worker, initargs=(self.template,))
+        started = time.perf_counter()
+        try:
+            results = await asyncio.gather(*[self.process(path) for path in todo])
+        finally:
+            wall = time.perf_counter() - started
+            self.pool.shutdown()
+            self.scheduler.shutdown()
+            self.manifest.close()
+            await resources.close()
+        return self.report(results, wall)
+
+    def report(self, results, wall):
+        cores = available_cores()
+        processed = [r for r in results if r["status"] == "done"]
+        entries = [self.manifest.entries[str(p.relative_to(self.input_dir))] for p in self.recordings
+                   if str(p.relative_to(self.input_dir)) in self.manifest.entries]
+        audio_s = sum(r["audio_s"] for r in processed)
+        per_hour = len(processed) / wall * 3600 if wall and processed else None
+        report = {
+            "recordings": len(self.recordings),
+            "done": sum(e["status"] == "done" for e in entries),
+            "failed": [e["recording"] for e in entries if e["status"] != "done"],
+            "this_run": {
+                "processed": len(processed),
+                "failed": len(results) - len(processed),
+                "skipped": len(self.recordings) - len(results),
+                "wall_s": round(wall, 2),
+                "audio_h": round(audio_s / 3600, 3),
+                "workers": self.workers,
+                "cores": cores,
+                "recordings_per_hour": round(per_hour, 1) if per_hour else None,
+                "recordings_per_hour_per_core": round(per_hour / cores, 1) if per_hour else None,
+                "audio_x_realtime": round(audio_s / wall, 1) if wall and audio_s else None,
+                "stage_mean_s": {
+                    stage: round(sum(r["stages_s"][stage] for r in processed) / len(processed), 3)
+                    for stage in ("split", "transcribe", "extract", "render")
+                } if processed else {},
+                "whisper": whisper_registry.stats(),
+                "extractor": dict(extractor.stats),
+            },
+            "items": [{k: v for k, v in e.items() if k not in ("form_data", "transcript", "fingerprint")}
+                      for e in entries],
+        }
+        (self.output_dir / "report.json").write_text(json.dumps(report, indent=2) + "\n")
+        return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Turn a directory of recorded calls into filled PDFs.")
+    parser.add_argument("input_dir")
+    parser.add_argument("--output", default="filled", help="PDFs, manifest.jsonl and report.json go here")
+    parser.add_argument("--template", default=PDF_TEMPLATE)
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="processes for decoding and rendering")
+    parser.add_argument("--batch-size", type=int, default=MAX_BATCH, help="utterances per Whisper batch")
+    parser.add_argument("--force", action="store_true", help="reprocess recordings the manifest has as done")
+    args = parser.parse_args(argv)
+
+    run = BatchRun(args.input_dir, args.output, args.template, args.workers, args.batch_size, args.force)
+    report = asyncio.run(run.run())
+    stats = report["this_run"]
+    print(f"📊 {stats['processed']} processed, {stats['failed']} failed, {stats['skipped']} skipped in "
+          f"{stats['wall_s']}s: {stats['recordings_per_hour_per_core']} recordings/hour/core "
+          f"({stats['cores']} cores); report in {Path(args.output) / 'report.json'}")
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
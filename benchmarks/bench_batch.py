@@ -0,0 +1,106 @@
+# benchmarks/bench_batch.py
+#
+# Offline throughput of batch_forms.py: writes --recordings synthetic calls
+# (several utterances separated by pauses, as 48 kHz WAV so decoding and
+# resampling are exercised) to a temporary directory, runs the batch with the
+# bench_e2e Whisper stand-in and the fake OpenAI server, then runs it again
+# to check that the manifest makes the restart skip everything. Prints the
+# report's throughput, including recordings/hour per core.
+#
+#   python -m benchmarks.bench_batch --recordings 40 --workers 2
+#   python -m benchmarks.bench_batch --whisper          # the real model from whisper_registry
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import multiprocessing
+from pathlib import Path
+import numpy as np
+import soundfile as sf
+from benchmarks.bench_e2e import SAMPLE_RATE, free_port, run_fakes, synth_utterance, fake_transcriber
+
+RECORDING_RATE = 48000
+
+
+def write_recordings(directory, count, utterances, seed=0):
+    from audio_decode import resample
+    rng = np.random.default_rng(seed)
+    pause = np.zeros(SAMPLE_RATE, dtype=np.int16)
+    for i in range(count):
+        parts = []
+        for _ in range(utterances):
+            parts += [synth_utterance(rng.uniform(1.0, 4.0), rng), pause]
+        call = np.concatenate(parts).astype(np.float32) / 32768
+        # Names that a flattened output would merge: day_0/call.wav, day_0__call.wav, day_0/call.flac
+        group = f"day_{i // 3}"
+        path = directory / [f"{group}/call.wav", f"{group}__call.wav", f"{group}/call.flac"][i % 3]
+        path.parent.mkdir(exist_ok=True)
+        sf.write(path, resample(call, SAMPLE_RATE, RECORDING_RATE), RECORDING_RATE, subtype="PCM_16")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recordings", type=int, default=24)
+    parser.add_argument("--utterances", type=int, default=8, help="utterances per recorded call")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--decode-cost", type=float, default=0.05, help="simulated Whisper seconds per audio second")
+    parser.add_argument("--chat-delay", type=float, default=0.3, help="fake extraction LLM seconds")
+    parser.add_argument("--whisper", action="store_true", help="use the real whisper_registry model")
+    args = parser.parse_args()
+
+    openai_port = free_port()
+    fakes = multiprocessing.Process(target=run_fakes, daemon=True,
+                                    args=(free_port(), openai_port, 0.02, 0.15, 0.12, args.chat_delay))
+    fakes.start()
+    os.environ.update({"OPENAI_BASE_URL": f"http://127.0.0.1:{openai_port}/v1",
+                       "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "bench")})
+    time.sleep(1.0)
+
+    import whisper_registry
+    import batch_forms
+    batch_sizes = []
+    if not args.whisper:
+        whisper_registry.transcribe = fake_transcriber(args.decode_cost)
+
+        def transcribe_batch(audios):
+            batch_sizes.append(len(audios))
+            return [whisper_registry.transcribe(a) for a in audios]
+        whisper_registry.transcribe_batch = transcribe_batch
+
+    root = Path(tempfile.mkdtemp(prefix="bench_batch_"))
+    recordings, output = root / "recordings", root / "filled"
+    recordings.mkdir()
+    write_recordings(recordings, args.recordings, args.utterances)
+    try:
+        first = batch_forms.BatchRun(recordings, output, workers=args.workers, batch_size=args.batch_size)
+        report = asyncio.run(first.run())
+        again = batch_forms.BatchRun(recordings, output, workers=args.workers, batch_size=args.batch_size)
+        resumed = asyncio.run(again.run())
+    finally:
+        fakes.terminate()
+
+    pdfs = list(output.rglob("*.pdf"))
+    result = {
+        "recordings": args.recordings,
+        "pdfs_written": len(pdfs),
+        "all_pdfs_valid": all(p.read_bytes()[:4] == b"%PDF" for p in pdfs),
+        "failed": report["failed"],
+        "run": {k: v for k, v in report["this_run"].items() if k not in ("whisper", "extractor")},
+        "whisper": report["this_run"]["whisper"] if args.whisper else {
+            "batches": len(batch_sizes), "mean_batch": round(np.mean(batch_sizes), 2) if batch_sizes else None},
+        "restart": {"processed": resumed["this_run"]["processed"], "skipped": resumed["this_run"]["skipped"]},
+        "output": str(output),
+    }
+    print(json.dumps(result, indent=2))
+    ok = (result["pdfs_written"] == args.recordings and result["all_pdfs_valid"] and not result["failed"]
+          and result["restart"]["skipped"] == args.recordings)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# benchmarks/bench_cold_start.py
+#
+# Cold start: spawns the Procfile's uvicorn command on a free port and times,
+# from process start, the import of main.py alone, the first request served
+# (--path, /healthz by default) and, if --ready-path is given, the first 200
+# from the readiness endpoint. Median of --runs fresh processes; no network
+# access is needed (OpenAI calls made while warming up just fail).
+#
+#   python -m benchmarks.bench_cold_start --runs 5
+#   python -m benchmarks.bench_cold_start --path / --ready-path ""   # trees without /healthz
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import http.client
+from benchmarks.bench_e2e import free_port
+
+
+def import_seconds(env):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import main"], env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def wait_for(port, path, deadline):
+    while time.perf_counter() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", path)
+            if conn.getresponse().status == 200:
+                return time.perf_counter()
+        except OSError:
+            pass
+        time.sleep(0.005)
+    return None
+
+
+def one_run(env, path, ready_path, timeout):
+    port = free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+                             "--log-level", "warning"], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        first = wait_for(port, path, start + timeout)
+        ready = wait_for(port, ready_path, start + timeout) if ready_path else None
+    finally:
+        proc.terminate()
+        proc.wait()
+    return {
+        "first_request_s": round(first - start, 3) if first else None,
+        "ready_s": round(ready - start, 3) if ready else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default="/healthz", help="first request to time")
+    parser.add_argument("--ready-path", default="/readyz", help="readiness endpoint; empty to skip")
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    env = {**os.environ, "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "bench"),
+           "OPENAI_BASE_URL": os.getenv("OPENAI_BASE_URL", "http://127.0.0.1:9/v1")}
+    imports = [import_seconds(env) for _ in range(args.runs)]
+    runs = [one_run(env, args.path, args.ready_path, args.timeout) for _ in range(args.runs)]
+
+    def median(key):
+        values = [r[key] for r in runs if r[key] is not None]
+        return round(statistics.median(values), 3) if values else None
+
+    print(json.dumps({
+        "runs": args.runs,
+        "import_main_s": round(statistics.median(imports), 3),
+        "first_request_s": median("first_request_s"),
+        "ready_s": median("ready_s"),
+        "path": args.path,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
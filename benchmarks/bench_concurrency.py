@@ -0,0 +1,99 @@
+# benchmarks/bench_concurrency.py
+#
+# Load test for N concurrent simulated audio streams. Each stream speaks a few
+# utterances; a turn is measured from end of speech to reply ready. "before"
+# runs transcription inline on the event loop (the old handle_audio_stream),
+# "after" routes it through InferenceScheduler. Event-loop lag is sampled by a
+# ticker so the stall other sockets would see is visible too.
+#
+#   python -m benchmarks.bench_concurrency --streams 16 --turns 5
+#   python -m benchmarks.bench_concurrency --whisper base   # real faster-whisper model
+
+import json
+import time
+import asyncio
+import argparse
+import numpy as np
+from inference_scheduler import InferenceScheduler
+
+SAMPLE_RATE = 16000
+
+
+def fake_transcribe(audio, cost_per_audio_second=0.15):
+    # Stand-in for a native decoder call: blocks the calling thread without holding the GIL.
+    time.sleep(cost_per_audio_second * len(audio) / SAMPLE_RATE)
+    return "fake transcript"
+
+
+def make_transcriber(whisper_size):
+    if not whisper_size:
+        return fake_transcribe
+    import faster_whisper
+    model = faster_whisper.WhisperModel(whisper_size, compute_type="int8")
+
+    def transcribe(audio):
+        segments, _ = model.transcribe(audio, beam_size=1)
+        return " ".join(seg.text.strip() for seg in segments)
+    return transcribe
+
+
+async def loop_lag_probe(samples, interval=0.01):
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - start - interval)
+
+
+async def stream(stream_id, turns, transcribe, scheduler, latencies, rng):
+    for _ in range(turns):
+        utterance_s = rng.uniform(0.8, 2.5)
+        await asyncio.sleep(utterance_s)                  # user talking
+        audio = rng.normal(0, 0.1, int(SAMPLE_RATE * utterance_s)).astype(np.float32)
+        start = time.perf_counter()
+        if scheduler is None:
+            transcribe(audio)                             # blocks the loop
+        else:
+            await scheduler.run(stream_id, transcribe, audio)
+        await asyncio.sleep(0.2)                          # GPT time-to-reply stand-in
+        latencies.append(time.perf_counter() - start)
+
+
+async def scenario(n_streams, turns, transcribe, use_scheduler, workers):
+    scheduler = InferenceScheduler(max_workers=workers, max_pending=n_streams * 2) if use_scheduler else None
+    latencies, lag = [], []
+    probe = asyncio.create_task(loop_lag_probe(lag))
+    rng = np.random.default_rng(0)
+    await asyncio.gather(*[
+        stream(f"s{i}", turns, transcribe, scheduler, latencies, rng) for i in range(n_streams)
+    ])
+    probe.cancel()
+    if scheduler:
+        scheduler.shutdown()
+    pct = lambda values, q: round(float(np.percentile(values, q)), 3)
+    return {
+        "turns": len(latencies),
+        "turn_latency_p50_s": pct(latencies, 50),
+        "turn_latency_p99_s": pct(latencies, 99),
+        "loop_lag_p99_s": pct(lag, 99),
+        "loop_lag_max_s": round(max(lag), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--streams", type=int, default=8)
+    parser.add_argument("--turns", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--whisper", help="faster-whisper model size; omit for a simulated decoder")
+    args = parser.parse_args()
+
+    transcribe = make_transcriber(args.whisper)
+    report = {
+        "before_inline": asyncio.run(scenario(args.streams, args.turns, transcribe, False, args.workers)),
+        "after_scheduler": asyncio.run(scenario(args.streams, args.turns, transcribe, True, args.workers)),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
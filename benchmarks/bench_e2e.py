@@ -0,0 +1,454 @@
+# benchmarks/bench_e2e.py
+#
+# Offline end-to-end benchmark. Azure realtime and OpenAI are replaced by local
+# stand-ins (fake_realtime_server.py and benchmarks/fake_openai_server.py, run
+# in a separate process), the app is served by uvicorn in-process, and speech
+# fixtures are replayed through each entry point at a fixed concurrency:
+#
+#   ws_audio       /ws/audio (handle_audio_stream): end of speech -> first reply audio / reply done
+#   browser_audio  backend_socket_bridge.process_browser_audio with webm uploads
+#   tts            POST /tts with distinct texts (cache misses)
+#   confirm        POST /confirm followed by GET /download
+#
+# Each scenario runs in its own child process so CPU time and peak RSS are
+# attributable to it. The report is JSON, meant to be diffed across commits.
+#
+#   python -m benchmarks.bench_e2e --concurrency 8 --requests 40 --output e2e.json
+#   python -m benchmarks.bench_e2e --scenarios tts confirm --delta-delay 0.05
+#   python -m benchmarks.bench_e2e --fixtures recordings/   # .wav/.flac/.webm/.pcm (16 kHz PCM16)
+#   python -m benchmarks.bench_e2e --scenarios ws_audio --pace 1 --speculate   # speculative replies on
+#   python -m benchmarks.bench_e2e --scenarios ws_audio --codec opus --reply opus # negotiated audio formats
+
+import io
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import asyncio
+import argparse
+import tempfile
+import platform
+import resource
+import itertools
+import threading
+import subprocess
+import multiprocessing
+from pathlib import Path
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import soundfile as sf
+
+SCENARIOS = ["ws_audio", "browser_audio", "tts", "confirm"]
+SAMPLE_RATE = 16000
+CHUNK_MS = 100
+TRAILING_SILENCE_MS = 700   # longer than VAD_SILENCE_MS so every utterance is finalized
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# --- fixtures -----------------------------------------------------------------
+
+def synth_utterance(seconds, rng):
+    """Voiced-sounding test signal: a wobbling harmonic tone under a syllable envelope."""
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    f0 = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = 0.5 + 0.5 * np.abs(np.sin(2 * np.pi * 3 * t))
+    signal = voice * envelope * 0.2 + rng.normal(0, 0.005, len(t))
+    return (np.clip(signal, -1, 1) * 32767).astype(np.int16)
+
+
+def load_fixture(path):
+    data = path.read_bytes()
+    if path.suffix == ".pcm":
+        return np.frombuffer(data, dtype=np.int16)
+    from audio_decode import decode_to_float32
+    return (decode_to_float32(data) * 32767).astype(np.int16)
+
+
+def make_fixtures(fixtures_dir=None, count=6, seed=0):
+    if fixtures_dir:
+        paths = sorted(p for p in Path(fixtures_dir).iterdir()
+                       if p.suffix in (".wav", ".flac", ".ogg", ".webm", ".pcm"))
+        return [load_fixture(p) for p in paths]
+    rng = np.random.default_rng(seed)
+    return [synth_utterance(rng.uniform(1.0, 2.5), rng) for _ in range(count)]
+
+
+def encode_stream(pcm, codec, rate):
+    """
+    A fixture as the client would stream it: CHUNK_MS messages of PCM16 at
+    rate, or one raw 20 ms Opus packet per message (WebCodecs AudioEncoder).
+    """
+    if codec == "pcm":
+        from audio_decode import resample
+        pcm = (resample(pcm.astype(np.float32) / 32768, SAMPLE_RATE, rate) * 32767).astype(np.int16)
+        chunk = rate * CHUNK_MS // 1000
+        return [pcm[start:start + chunk].tobytes() for start in range(0, len(pcm), chunk)]
+    import av
+    encoder = av.CodecContext.create("libopus", "w")
+    encoder.sample_rate, encoder.layout, encoder.format, encoder.bit_rate = SAMPLE_RATE, "mono", "s16", 24000
+    encoder.open()
+    frame_len = SAMPLE_RATE // 50
+    pcm = np.concatenate([pcm, np.zeros(-len(pcm) % frame_len, dtype=np.int16)])
+    packets = []
+    for start in range(0, len(pcm), frame_len):
+        frame = av.AudioFrame.from_ndarray(pcm[start:start + frame_len].reshape(1, -1), format="s16", layout="mono")
+        frame.sample_rate, frame.pts = SAMPLE_RATE, start
+        packets += [bytes(packet) for packet in encoder.encode(frame)]
+    return packets + [bytes(packet) for packet in encoder.encode(None)]
+
+
+def encode_upload(pcm):
+    """Encodes a fixture the way the browser's MediaRecorder would (webm/opus), else WAV."""
+    try:
+        import av
+        buffer = io.BytesIO()
+        with av.open(buffer, "w", format="webm") as container:
+            stream = container.add_stream("libopus", rate=48000)
+            frame = av.AudioFrame.from_ndarray(pcm.reshape(1, -1), format="s16", layout="mono")
+            frame.sample_rate = SAMPLE_RATE
+            resampler = av.AudioResampler(format="s16", layout="mono", rate=48000)
+            for resampled in resampler.resample(frame) + resampler.resample(None):
+                for packet in stream.encode(resampled):
+                    container.mux(packet)
+            for packet in stream.encode(None):
+                container.mux(packet)
+        return buffer.getvalue()
+    except Exception:
+        buffer = io.BytesIO()
+        sf.write(buffer, pcm, SAMPLE_RATE, format="WAV")
+        return buffer.getvalue()
+
+
+# --- stand-ins ----------------------------------------------------------------
+
+def run_fakes(realtime_port, openai_port, delta_delay, first_delta_delay, tts_delay, chat_delay):
+    import uvicorn
+    import fake_realtime_server
+    from benchmarks.fake_openai_server import make_app
+
+    async def main():
+        await fake_realtime_server.serve(port=realtime_port, delta_delay=delta_delay,
+                                         first_delta_delay=first_delta_delay)
+        server = uvicorn.Server(uvicorn.Config(make_app(tts_delay=tts_delay, chat_delay=chat_delay),
+                                               host="127.0.0.1", port=openai_port, log_level="warning"))
+        await server.serve()
+
+    asyncio.run(main())
+
+
+def start_app(port):
+    import uvicorn
+    import main
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="bench-app", daemon=True).start()
+    while not server.started:
+        time.sleep(0.02)
+    return server
+
+
+def fake_transcriber(cost_per_audio_second):
+    # Stand-in for the Whisper decoder: blocks the calling thread for a share of
+    # the audio duration and returns a distinct transcript every time, except
+    # that the same audio again within a second (a speculative transcript
+    # confirmed by the final one) reads the same, as real Whisper would.
+    counter = itertools.count()
+    recent = {}
+
+    def transcribe(audio, **kwargs):
+        time.sleep(cost_per_audio_second * len(audio) / SAMPLE_RATE)
+        key, now = (len(audio), float(np.sum(audio))), time.monotonic()
+        text, seen = recent.get(key, (None, 0))
+        if text is None or now - seen > 1.0:
+            text = f"Utterance number {next(counter)} with {len(audio)} samples."
+        recent[key] = (text, now)
+        return text
+    return transcribe
+
+
+# --- scenarios ----------------------------------------------------------------
+
+async def ws_audio_client(port, client_id, streams, turns, tts_mode, pace, results, speculate=False, audio_format=""):
+    import websockets
+    uri = f"ws://127.0.0.1:{port}/ws/audio?tts={tts_mode}&session_id=bench-ws-{client_id}{audio_format}"
+    if speculate:
+        uri += "&speculate=1"
+    async with websockets.connect(uri, max_size=None) as ws:
+        for turn in range(turns):
+            messages, message_s = streams[(client_id + turn) % len(streams)]
+            for message in messages:
+                await ws.send(message)
+                if pace:
+                    await asyncio.sleep(message_s / pace)
+            sent = time.perf_counter()
+            first_audio = None
+            while True:
+                message = await asyncio.wait_for(ws.recv(), timeout=60)
+                if isinstance(message, bytes):
+                    first_audio = first_audio or time.perf_counter() - sent
+                    continue
+                data = json.loads(message)
+                if data.get("busy"):
+                    results["errors"] += 1
+                    break
+                if "audio_bytes" in data:
+                    await asyncio.wait_for(ws.recv(), timeout=60)   # the Ogg Opus reply frame
+                if "audio_b64" in data or "audio_bytes" in data or data.get("done"):
+                    done = time.perf_counter() - sent
+                    results["latencies"].append(done)
+                    results["first_audio"].append(first_audio or done)
+                    break
+
+
+async def scenario_ws_audio(args, port, fixtures):
+    results = {"latencies": [], "first_audio": [], "errors": 0}
+    turns = max(1, args.requests // args.concurrency)
+    codec, rate = getattr(args, "codec", "pcm"), getattr(args, "rate", SAMPLE_RATE)
+    silence = np.zeros(SAMPLE_RATE * TRAILING_SILENCE_MS // 1000, dtype=np.int16)
+    streams = [(encode_stream(np.concatenate([pcm, silence]), codec, rate), 0.02 if codec == "opus" else CHUNK_MS / 1000)
+               for pcm in fixtures]
+    audio_format = f"&codec={codec}&rate={rate}"
+    if getattr(args, "reply", None):
+        audio_format += f"&reply={args.reply}"
+    outcomes = await asyncio.gather(*[
+        ws_audio_client(port, i, streams, turns, args.tts, args.pace, results, getattr(args, "speculate", False),
+                        audio_format)
+        for i in range(args.concurrency)
+    ], return_exceptions=True)
+    results["errors"] += sum(isinstance(o, Exception) for o in outcomes)
+    return results
+
+
+async def scenario_browser_audio(args, port, fixtures):
+    from backend_socket_bridge import process_browser_audio
+    uploads = [encode_upload(pcm) for pcm in fixtures]
+    results = {"latencies": [], "errors": 0}
+
+    def one(i):
+        upload = SimpleNamespace(file=io.BytesIO(uploads[i % len(uploads)]), filename="audio.webm")
+        start = time.perf_counter()
+        try:
+            process_browser_audio(upload, session_id=f"bench-browser-{i % args.concurrency}")
+            results["latencies"].append(time.perf_counter() - start)
+        except Exception:
+            results["errors"] += 1
+
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(args.concurrency) as executor:
+        await asyncio.gather(*[loop.run_in_executor(executor, one, i) for i in range(args.requests)])
+    return results
+
+
+async def run_http(args, request):
+    import httpx
+    results = {"latencies": [], "errors": 0}
+    limit = asyncio.Semaphore(args.concurrency)
+
+    async def one(client, i):
+        async with limit:
+            start = time.perf_counter()
+            try:
+                await request(client, i)
+                results["latencies"].append(time.perf_counter() - start)
+            except Exception:
+                results["errors"] += 1
+
+    async with httpx.AsyncClient(timeout=60, limits=httpx.Limits(max_connections=args.concurrency)) as client:
+        await asyncio.gather(*[one(client, i) for i in range(args.requests)])
+    return results
+
+
+async def scenario_tts(args, port, fixtures):
+    run = uuid.uuid4().hex[:8]   # distinct per run so repeated runs in one process still miss the cache
+
+    async def request(client, i):
+        text = f"Thanks, I have noted answer {run}-{i}. What is your business phone number?"
+        response = await client.post(f"http://127.0.0.1:{port}/tts", json={"text": text})
+        response.raise_for_status()
+        assert "audio_b64" in response.json()
+    return await run_http(args, request)
+
+
+def make_filled_sessions(n):
+    from form_schema import FORM_FIELDS
+    from session_store import store
+
+    sessions = []
+    for i in range(n):
+        session_id = store.create()
+        state = store.load(session_id)
+        state["form_data"].update({field: f"{field[:10]} {i}" for field in FORM_FIELDS})
+        store.save(session_id, state)
+        sessions.append(session_id)
+    return sessions
+
+
+async def confirm_and_download(client, port, session_id):
+    response = await client.post(f"http://127.0.0.1:{port}/confirm",
+                                 json={"session_id": session_id, "confirmed": True, "wait": 30})
+    response.raise_for_status()
+    download = await client.get(f"http://127.0.0.1:{port}{response.json()['download_url']}")
+    download.raise_for_status()
+    assert download.content.startswith(b"%PDF")
+
+
+async def scenario_confirm(args, port, fixtures):
+    sessions = make_filled_sessions(args.requests)
+
+    async def request(client, i):
+        await confirm_and_download(client, port, sessions[i])
+    return await run_http(args, request)
+
+
+# --- measurement --------------------------------------------------------------
+
+def percentiles(values):
+    if not values:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50_ms": round(p50 * 1000, 1), "p95_ms": round(p95 * 1000, 1),
+            "p99_ms": round(p99 * 1000, 1), "max_ms": round(max(values) * 1000, 1)}
+
+
+def run_scenario(args):
+    """Child process: serve the app, replay the scenario, write its measurements as JSON."""
+    import whisper_registry
+    import pipeline_metrics
+    if not args.whisper:
+        whisper_registry.transcribe = fake_transcriber(args.decode_cost)
+        whisper_registry.transcribe_batch = lambda audios: [whisper_registry.transcribe(a) for a in audios]
+    fixtures = make_fixtures(args.fixtures)
+
+    port = free_port()
+    server = start_app(port)
+    time.sleep(0.5)   # let startup prewarm settle before measuring
+
+    scenario = globals()[f"scenario_{args.scenario}"]
+    cpu_before, wall_before = os.times(), time.perf_counter()
+    results = asyncio.run(scenario(args, port, fixtures))
+    wall = time.perf_counter() - wall_before
+    cpu_after = os.times()
+    server.should_exit = True
+
+    cpu = (cpu_after.user - cpu_before.user) + (cpu_after.system - cpu_before.system)
+    completed = len(results["latencies"])
+    report = {
+        "completed": completed,
+        "errors": results["errors"],
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(completed / wall, 2) if wall else None,
+        "latency": percentiles(results["latencies"]),
+        "cpu_s": round(cpu, 3),
+        "cpu_util": round(cpu / wall, 3) if wall else None,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "stages": pipeline_metrics.snapshot()["stages"],
+    }
+    if "first_audio" in results:
+        report["first_audio"] = percentiles(results["first_audio"])
+    if args.scenario == "ws_audio":
+        import stream_audio_ws_handler
+        report["speculation"] = stream_audio_ws_handler.speculation_stats
+        stats = stream_audio_ws_handler.turn_stats
+        report["bandwidth"] = {
+            "bytes_in": stats["bytes_in"],
+            "bytes_out": stats["bytes_out"],
+            "kbps_in": round(stats["bytes_in"] * 8 / stats["audio_in_s"] / 1000, 1) if stats["audio_in_s"] else None,
+            "kbps_out": round(stats["bytes_out"] * 8 / stats["sent_s"] / 1000, 1) if stats["sent_s"] else None,
+        }
+    Path(args.result_file).write_text(json.dumps(report))
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=16, help="requests (ws_audio: turns) per scenario")
+    parser.add_argument("--tts", choices=["stream", "wav"], default="stream", help="ws_audio reply mode")
+    parser.add_argument("--pace", type=float, default=0, help="ws_audio send speed vs real time; 0 = unpaced")
+    parser.add_argument("--speculate", action="store_true", help="ws_audio: start replies on tentative transcripts")
+    parser.add_argument("--codec", choices=["pcm", "opus"], default="pcm", help="ws_audio upstream codec")
+    parser.add_argument("--rate", type=int, default=SAMPLE_RATE, help="ws_audio upstream PCM sample rate")
+    parser.add_argument("--reply", choices=["pcm", "opus"], help="ws_audio reply codec; server default if omitted")
+    parser.add_argument("--fixtures", help="directory of recordings; synthetic speech if omitted")
+    parser.add_argument("--delta-delay", type=float, default=0.02, help="fake realtime seconds between deltas")
+    parser.add_argument("--first-delta-delay", type=float, default=0.15)
+    parser.add_argument("--tts-delay", type=float, default=0.12, help="fake TTS seconds per request")
+    parser.add_argument("--chat-delay", type=float, default=0.3, help="fake chat completion seconds")
+    parser.add_argument("--decode-cost", type=float, default=0.05,
+                        help="simulated Whisper seconds per audio second")
+    parser.add_argument("--whisper", action="store_true", help="use the real whisper_registry model")
+    parser.add_argument("--output", help="write the JSON report here as well as stdout")
+    parser.add_argument("--scenario", help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario:
+        run_scenario(args)
+        return
+
+    realtime_port, openai_port = free_port(), free_port()
+    fakes = multiprocessing.Process(target=run_fakes, daemon=True, args=(
+        realtime_port, openai_port, args.delta_delay, args.first_delta_delay, args.tts_delay, args.chat_delay))
+    fakes.start()
+    time.sleep(1.0)
+
+    env = {
+        **os.environ,
+        "AZURE_WS_URI": f"ws://127.0.0.1:{realtime_port}",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{openai_port}/v1",
+        "OPENAI_API_KEY": "bench",
+        "WHISPER_WARMUP": "1" if args.whisper else "0",
+        "SESSION_STORE": "memory",
+    }
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("scenario", "result_file", "output")},
+        },
+        "scenarios": {},
+    }
+    try:
+        for name in args.scenarios:
+            result_file = Path(tempfile.gettempdir()) / f"bench_e2e_{uuid.uuid4().hex}.json"
+            print(f"▶️ {name}", file=sys.stderr)
+            proc = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_e2e", *sys.argv[1:],
+                 "--scenario", name, "--result-file", str(result_file)],
+                env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+            )
+            if proc.returncode or not result_file.exists():
+                report["scenarios"][name] = {"failed": proc.stderr.strip().splitlines()[-5:]}
+                continue
+            report["scenarios"][name] = json.loads(result_file.read_text())
+            result_file.unlink()
+    finally:
+        fakes.terminate()
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# benchmarks/bench_extraction.py
+#
+# Replays a recorded form-filling transcript against a stub LLM and compares
+# the legacy extraction (a blocking gpt-4 call on every user and assistant
+# message) with FieldExtractor (regex fast path, debounced JSON-mode calls).
+# Reports LLM calls per completed form, fields filled, and event-loop stalls.
+#
+#   python -m benchmarks.bench_extraction --llm-latency 0.8 --turn-gap 0.3
+#   python -m benchmarks.bench_extraction --transcript my_call.json   # [[assistant, user], ...]
+
+import json
+import time
+import types
+import asyncio
+import argparse
+from field_extractor import FieldExtractor
+from session_store import SessionStore, MemoryBackend
+
+TRANSCRIPT = [
+    ("Hello! I'm here to help with your Merchant Processing Application. What is your business name, also known as your doing business as name?", "It's Sunrise Bakery."),
+    ("Great. And what is the corporate or legal name of the business?", "Sunrise Bakery LLC"),
+    ("What is the business address?", "1200 Main Street"),
+    ("Which city, state and zip is that in?", "Austin, Texas 78701"),
+    ("What is the business phone number?", "512-555-0134"),
+    ("Do you have a fax number for the business?", "Yes, (512) 555-0199"),
+    ("What is the business email address?", "orders@sunrisebakery.com"),
+    ("And the business website address?", "www.sunrisebakery.com"),
+    ("What is the customer service email?", "help@sunrisebakery.com"),
+    ("Is the billing address the same? If not, what is the billing address?", "It's 45 Oak Avenue, Round Rock"),
+    ("What state is the billing address in?", "TX"),
+    ("And the billing zip code?", "78664"),
+    ("Who is the contact name for the account?", "Maria Lopez"),
+    ("What is your SIC or MCC code?", "5462, bakeries"),
+    ("Please provide your initials for the merchant initials fields.", "M L"),
+]
+
+
+class StubCompletions:
+    """Answers like a well-behaved JSON-mode model after a fixed delay."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    def _reply(self):
+        self.calls += 1
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(
+            message=types.SimpleNamespace(content="{}")
+        )])
+
+    async def create(self, **kwargs):
+        await asyncio.sleep(self.latency)
+        return self._reply()
+
+    def create_blocking(self, **kwargs):
+        time.sleep(self.latency)
+        return self._reply()
+
+
+async def loop_lag_probe(samples, interval=0.01):
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - start - interval)
+
+
+async def replay_legacy(transcript, completions, turn_gap):
+    # Old handle_websocket_messages: try_extract_fields ran synchronously on the
+    # user's transcription and again on the assistant's next reply.
+    for _ in transcript:
+        await asyncio.sleep(turn_gap)
+        completions.create_blocking()
+        await asyncio.sleep(turn_gap)
+        completions.create_blocking()
+
+
+async def replay_engine(transcript, completions, turn_gap, extractor, session_id):
+    for question, answer in transcript:
+        await asyncio.sleep(turn_gap)
+        extractor.submit(session_id, answer, question)
+        await asyncio.sleep(turn_gap)
+    await extractor.flush(session_id)
+
+
+async def measure(replay):
+    lag = []
+    probe = asyncio.create_task(loop_lag_probe(lag))
+    start = time.perf_counter()
+    await replay
+    elapsed = time.perf_counter() - start
+    probe.cancel()
+    return elapsed, lag
+
+
+async def main(args):
+    transcript = TRANSCRIPT
+    if args.transcript:
+        with open(args.transcript, "r", encoding="utf-8") as f:
+            transcript = [tuple(turn) for turn in json.load(f)]
+
+    legacy = StubCompletions(args.llm_latency)
+    legacy_elapsed, legacy_lag = await measure(replay_legacy(transcript, legacy, args.turn_gap))
+
+    engine_llm = StubCompletions(args.llm_latency)
+    client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=engine_llm))
+    session_store = SessionStore(MemoryBackend())
+    session_id = session_store.create()
+    extractor = FieldExtractor(client=client, session_store=session_store, debounce_s=args.debounce)
+    engine_elapsed, engine_lag = await measure(
+        replay_engine(transcript, engine_llm, args.turn_gap, extractor, session_id)
+    )
+    filled = {k: v for k, v in session_store.load(session_id)["form_data"].items() if v}
+
+    print(json.dumps({
+        "turns": len(transcript),
+        "legacy": {
+            "llm_calls": legacy.calls,
+            "max_loop_stall_s": round(max(legacy_lag), 3),
+            "elapsed_s": round(legacy_elapsed, 2),
+        },
+        "engine": {
+            "llm_calls": engine_llm.calls,
+            "max_loop_stall_s": round(max(engine_lag), 3),
+            "elapsed_s": round(engine_elapsed, 2),
+            "fast_path_fields": filled,
+            "stats": extractor.stats,
+        },
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transcript", help="JSON list of [assistant_question, user_answer] pairs")
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--turn-gap", type=float, default=0.3)
+    parser.add_argument("--debounce", type=float, default=0.75)
+    asyncio.run(main(parser.parse_args()))
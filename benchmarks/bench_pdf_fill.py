@@ -0,0 +1,79 @@
+# benchmarks/bench_pdf_fill.py
+#
+# Fills/second for the legacy per-record path (scan template, reopen, save to
+# disk) versus the cached-index in-memory fill, sequentially and through
+# fill_pdf_batch's process pool.
+#
+#   python -m benchmarks.bench_pdf_fill --sizes 1 100 1000
+
+import os
+import json
+import time
+import argparse
+import tempfile
+import fitz
+from form_schema import FORM_FIELDS
+from fill_pdf_logic import extract_form_fields, fill_pdf_bytes, fill_pdf_batch, load_template
+
+TEMPLATE = "form_template.pdf"
+
+
+def make_records(n):
+    return [{field: f"{field[:10]} {i}" for field in FORM_FIELDS} for i in range(n)]
+
+
+def legacy_fill(input_pdf_path, output_pdf_path, data):
+    # The pre-index implementation of fill_pdf, without its logging.
+    fields = extract_form_fields(input_pdf_path)
+    doc = fitz.open(input_pdf_path)
+    for field_name, field_info in fields.items():
+        if data.get(field_name):
+            x0, y0, x1, y1 = field_info['rect']
+            doc[field_info['page']].insert_text(
+                (x0 + 2, y0 + (y1 - y0) * 0.75), str(data[field_name]),
+                fontsize=min(11, (y1 - y0) - 2), fontname="helv"
+            )
+    doc.save(output_pdf_path, incremental=False, deflate=True)
+    doc.close()
+
+
+def rate(n, seconds):
+    return round(n / seconds, 2) if seconds else None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 1000])
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--legacy-max", type=int, default=100, help="skip the slow legacy path above this size")
+    args = parser.parse_args()
+
+    load_template(TEMPLATE)
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n in args.sizes:
+            records = make_records(n)
+            row = {}
+
+            if n <= args.legacy_max:
+                start = time.perf_counter()
+                for i, record in enumerate(records):
+                    legacy_fill(TEMPLATE, os.path.join(tmp_dir, f"legacy_{i}.pdf"), record)
+                row["legacy_fills_per_s"] = rate(n, time.perf_counter() - start)
+
+            start = time.perf_counter()
+            for record in records:
+                fill_pdf_bytes(TEMPLATE, record)
+            row["in_memory_fills_per_s"] = rate(n, time.perf_counter() - start)
+
+            start = time.perf_counter()
+            fill_pdf_batch(TEMPLATE, records, output_dir=os.path.join(tmp_dir, f"batch_{n}"),
+                           max_workers=args.workers)
+            row[f"batch_{args.workers}_workers_fills_per_s"] = rate(n, time.perf_counter() - start)
+
+            report[n] = row
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
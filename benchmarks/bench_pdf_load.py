@@ -0,0 +1,96 @@
+# benchmarks/bench_pdf_load.py
+#
+# Does PDF rendering hurt everyone else? Measures /tts and /ws/audio latency
+# twice against the offline stand-ins from bench_e2e: once on an idle server
+# and once while --pdf-clients sessions confirm and download PDFs in a loop.
+# With rendering on the event loop the second run degrades by roughly a
+# render time per request; with the PDF worker pool it should stay flat.
+#
+#   python -m benchmarks.bench_pdf_load --pdf-clients 4 --requests 24
+
+import os
+import json
+import time
+import asyncio
+import argparse
+import multiprocessing
+from benchmarks.bench_e2e import (
+    free_port, run_fakes, make_fixtures, fake_transcriber, start_app, percentiles,
+    scenario_tts, scenario_ws_audio, make_filled_sessions, confirm_and_download,
+)
+
+
+async def pdf_pressure(port, sessions, stop, completed):
+    import httpx
+    async with httpx.AsyncClient(timeout=60) as client:
+        i = 0
+        while not stop.is_set():
+            await confirm_and_download(client, port, sessions[i % len(sessions)])
+            completed.append(1)
+            i += 1
+
+
+async def measure(args, port, fixtures, pdf_clients):
+    stop, pdfs = asyncio.Event(), []
+    sessions = make_filled_sessions(max(1, pdf_clients) * 4)
+    pressure = [asyncio.create_task(pdf_pressure(port, sessions[i::pdf_clients], stop, pdfs))
+                for i in range(pdf_clients)]
+    if pressure:
+        await asyncio.sleep(1.0)  # let the renders get going before measuring
+
+    start = time.perf_counter()
+    tts, ws = await asyncio.gather(scenario_tts(args, port, fixtures), scenario_ws_audio(args, port, fixtures))
+    wall = time.perf_counter() - start
+
+    stop.set()
+    await asyncio.gather(*pressure, return_exceptions=True)
+    return {
+        "pdf_clients": pdf_clients,
+        "pdfs_rendered": len(pdfs),
+        "pdfs_per_s": round(len(pdfs) / wall, 2),
+        "tts": {"errors": tts["errors"], **percentiles(tts["latencies"])},
+        "ws_audio": {"errors": ws["errors"], **percentiles(ws["latencies"])},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pdf-clients", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=24)
+    parser.add_argument("--decode-cost", type=float, default=0.05)
+    args = parser.parse_args()
+    args.tts, args.pace = "stream", 0
+
+    realtime_port, openai_port = free_port(), free_port()
+    fakes = multiprocessing.Process(target=run_fakes, daemon=True,
+                                    args=(realtime_port, openai_port, 0.02, 0.15, 0.12, 0.3))
+    fakes.start()
+    os.environ.update({
+        "AZURE_WS_URI": f"ws://127.0.0.1:{realtime_port}",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{openai_port}/v1",
+        "OPENAI_API_KEY": "bench",
+        "WHISPER_WARMUP": "0",
+    })
+    time.sleep(1.0)
+
+    import whisper_registry
+    whisper_registry.transcribe = fake_transcriber(args.decode_cost)
+    whisper_registry.transcribe_batch = lambda audios: [whisper_registry.transcribe(a) for a in audios]
+    port = free_port()
+    start_app(port)
+    time.sleep(1.0)
+    fixtures = make_fixtures()
+
+    try:
+        report = {
+            "idle": asyncio.run(measure(args, port, fixtures, 0)),
+            "rendering_pdfs": asyncio.run(measure(args, port, fixtures, args.pdf_clients)),
+        }
+    finally:
+        fakes.terminate()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
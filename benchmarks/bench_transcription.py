@@ -0,0 +1,154 @@
+# benchmarks/bench_transcription.py
+#
+# Compares the legacy fixed 1-second chunking in handle_audio_stream with the
+# VAD/endpointing pipeline on recorded 16 kHz mono PCM fixtures (.pcm raw int16
+# or .wav). Reports Whisper CPU-seconds, number of transcribe calls and the
+# end-of-speech -> final transcript latency.
+#
+#   python -m benchmarks.bench_transcription --fixtures path/to/fixtures
+#   python -m benchmarks.bench_transcription            # synthetic fixture
+
+import io
+import glob
+import json
+import time
+import argparse
+import numpy as np
+import soundfile as sf
+from vad_segmenter import UtteranceSegmenter, SAMPLE_RATE, frame_rms, pcm16_to_float32
+
+CHUNK_BYTES = 8192          # browser ScriptProcessor sends 4096 int16 samples per message
+LEGACY_BYTES = 32000
+
+
+def load_fixture(path):
+    if path.endswith(".pcm"):
+        with open(path, "rb") as f:
+            return f.read()
+    audio, rate = sf.read(path, dtype="int16")
+    if audio.ndim > 1:
+        audio = audio[:, 0]
+    if rate != SAMPLE_RATE:
+        raise ValueError(f"{path}: expected {SAMPLE_RATE} Hz, got {rate}")
+    return audio.tobytes()
+
+
+def synthetic_fixture(seed=0):
+    """Voiced bursts of 1.5-3 s separated by ~1 s pauses over low background noise."""
+    rng = np.random.default_rng(seed)
+    parts = []
+    for _ in range(6):
+        parts.append(rng.normal(0, 0.002, int(SAMPLE_RATE * rng.uniform(0.8, 1.2))))
+        n = int(SAMPLE_RATE * rng.uniform(1.5, 3.0))
+        t = np.arange(n) / SAMPLE_RATE
+        f0 = rng.uniform(110, 220)
+        voiced = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 6))
+        envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t) ** 2
+        parts.append(0.15 * voiced * envelope)
+    parts.append(rng.normal(0, 0.002, SAMPLE_RATE))
+    audio = np.clip(np.concatenate(parts), -1, 1)
+    return (audio * 32767).astype(np.int16).tobytes()
+
+
+def speech_end_times(pcm, threshold=0.02, pause_s=0.5):
+    """Ground-truth utterance ends (seconds) from an offline energy pass over the whole file."""
+    frame_len = SAMPLE_RATE * 30 // 1000
+    voiced = frame_rms(pcm16_to_float32(pcm), frame_len) > threshold
+    ends, last_voiced, gap = [], None, 0
+    for i, v in enumerate(voiced):
+        if v:
+            last_voiced, gap = i, 0
+        elif last_voiced is not None:
+            gap += 1
+            if gap * 0.03 >= pause_s:
+                ends.append((last_voiced + 1) * 0.03)
+                last_voiced = None
+    if last_voiced is not None:
+        ends.append((last_voiced + 1) * 0.03)
+    return ends
+
+
+def timed_transcribe(model, audio):
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    segments, _ = model.transcribe(audio, beam_size=1)
+    text = " ".join(seg.text.strip() for seg in segments)
+    return text, time.process_time() - cpu0, time.perf_counter() - wall0
+
+
+def latencies(ends, finals):
+    """For every speech end, delay until the first final transcript produced after it."""
+    out = []
+    for end in ends:
+        later = [ready for at, ready in finals if at >= end]
+        if later:
+            out.append(min(later) - end)
+    return out
+
+
+def run_legacy(model, pcm):
+    cpu, calls, finals = 0.0, 0, []
+    buffer = bytearray()
+    for offset in range(0, len(pcm), CHUNK_BYTES):
+        buffer.extend(pcm[offset:offset + CHUNK_BYTES])
+        if len(buffer) >= LEGACY_BYTES:
+            wav = io.BytesIO()
+            sf.write(wav, np.frombuffer(buffer, dtype=np.int16), SAMPLE_RATE, format="WAV")
+            wav.seek(0)
+            _, c, w = timed_transcribe(model, wav)
+            cpu, calls = cpu + c, calls + 1
+            at = (offset + CHUNK_BYTES) / 2 / SAMPLE_RATE
+            finals.append((at, at + w))
+            buffer.clear()
+    return cpu, calls, finals
+
+
+def run_vad(model, pcm):
+    cpu, calls, finals = 0.0, 0, []
+    segmenter = UtteranceSegmenter()
+    for offset in range(0, len(pcm), CHUNK_BYTES):
+        at = (offset + CHUNK_BYTES) / 2 / SAMPLE_RATE
+        for kind, audio in segmenter.feed(pcm[offset:offset + CHUNK_BYTES]):
+            _, c, w = timed_transcribe(model, audio)
+            cpu, calls = cpu + c, calls + 1
+            if kind == "final":
+                finals.append((at, at + w))
+    return cpu, calls, finals
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", help="directory of 16 kHz mono .pcm/.wav recordings")
+    parser.add_argument("--model", default="base")
+    args = parser.parse_args()
+
+    if args.fixtures:
+        paths = sorted(glob.glob(f"{args.fixtures}/*.pcm") + glob.glob(f"{args.fixtures}/*.wav"))
+        fixtures = {p: load_fixture(p) for p in paths}
+    else:
+        fixtures = {"synthetic": synthetic_fixture()}
+
+    import faster_whisper
+    model = faster_whisper.WhisperModel(args.model, compute_type="int8")
+    report = {}
+    for name, pcm in fixtures.items():
+        ends = speech_end_times(pcm)
+        audio_s = len(pcm) / 2 / SAMPLE_RATE
+        report[name] = {"audio_seconds": round(audio_s, 2)}
+        for label, runner in (("legacy_1s", run_legacy), ("vad", run_vad)):
+            cpu, calls, finals = runner(model, pcm)
+            lat = latencies(ends, finals)
+            report[name][label] = {
+                "whisper_cpu_seconds": round(cpu, 3),
+                "transcribe_calls": calls,
+                "latency_p50_s": percentile(lat, 50),
+                "latency_p95_s": percentile(lat, 95),
+            }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# benchmarks/bench_whisper_registry.py
+#
+# What whisper_registry saves: how long a worker blocks on Whisper at
+# startup, and the transcription latency of a process_browser_audio request
+# (the first one and the steady state).
+# - legacy: every entry point loads its own model at import, and each
+#   browser upload loads another one.
+# - registry: the shared model warms up in the background and is reused.
+# Without --real, a simulated faster-whisper backend stands in. It sleeps
+# --load-s per model load and --decode-s per transcription, so the run needs
+# no model weights.
+#
+#   python -m benchmarks.bench_whisper_registry --requests 10
+#   python -m benchmarks.bench_whisper_registry --real --requests 5   # configured WHISPER_* model
+
+import os
+import sys
+import json
+import time
+import types
+import argparse
+import statistics
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+def simulate_backend(load_s, decode_s):
+    class WhisperModel:
+        def __init__(self, *args, **kwargs):
+            time.sleep(load_s)
+            self.model = types.SimpleNamespace(is_multilingual=True)
+
+        def transcribe(self, audio, **kwargs):
+            time.sleep(decode_s)
+            return iter([types.SimpleNamespace(text="simulated")]), None
+
+    module = types.ModuleType("faster_whisper")
+    module.WhisperModel = WhisperModel
+    sys.modules["faster_whisper"] = module
+    os.environ["WHISPER_BACKEND"] = "faster-whisper"
+
+
+def load_fresh(registry):
+    # What the entry points did before the registry: a new model per caller
+    if registry.WHISPER_BACKEND == "openai-whisper":
+        import whisper
+        return whisper.load_model(registry.WHISPER_MODEL_SIZE)
+    import faster_whisper
+    return faster_whisper.WhisperModel(registry.WHISPER_MODEL_SIZE, compute_type=registry.WHISPER_COMPUTE_TYPE)
+
+
+def transcribe_fresh(registry, model, audio):
+    if registry.WHISPER_BACKEND == "openai-whisper":
+        return model.transcribe(audio, fp16=False).get("text", "")
+    segments, _ = model.transcribe(audio, beam_size=1)
+    return " ".join([seg.text.strip() for seg in segments])
+
+
+def summarize(startup_block, latencies, models_loaded):
+    return {
+        "startup_block_s": round(startup_block, 3),
+        "first_request_s": round(latencies[0], 3),
+        "steady_request_p50_s": round(statistics.median(latencies[1:] or latencies), 3),
+        "models_loaded": models_loaded,
+    }
+
+
+def run_legacy(registry, audio, requests, entry_points):
+    start = time.perf_counter()
+    for _ in range(entry_points):
+        load_fresh(registry)
+    startup_block = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        transcribe_fresh(registry, load_fresh(registry), audio)
+        latencies.append(time.perf_counter() - start)
+    return summarize(startup_block, latencies, entry_points + requests)
+
+
+def run_registry(registry, audio, requests):
+    start = time.perf_counter()
+    registry.warm_up_in_background()
+    startup_block = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(requests):  # the first request lands while the warm-up is still loading
+        start = time.perf_counter()
+        registry.transcribe(audio)
+        latencies.append(time.perf_counter() - start)
+    stats = registry.stats()
+    return {**summarize(startup_block, latencies, 1),
+            "load_seconds": stats["load_seconds"], "rss_delta_mb": stats["rss_delta_mb"]}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--real", action="store_true", help="load the configured WHISPER_* model instead of simulating it")
+    parser.add_argument("--load-s", type=float, default=1.5, help="simulated model load time")
+    parser.add_argument("--decode-s", type=float, default=0.3, help="simulated transcription time")
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--audio-s", type=float, default=4.0)
+    parser.add_argument("--entry-points", type=int, default=2,
+                        help="modules that loaded a model at import (stream_audio_ws_handler, web_assistant)")
+    args = parser.parse_args()
+
+    if not args.real:
+        simulate_backend(args.load_s, args.decode_s)
+    os.environ["WHISPER_WARMUP"] = "1"
+    import whisper_registry
+
+    audio = (np.random.default_rng(0).standard_normal(int(args.audio_s * SAMPLE_RATE)) * 0.01).astype(np.float32)
+    report = {
+        "backend": whisper_registry.WHISPER_BACKEND,
+        "model_size": whisper_registry.WHISPER_MODEL_SIZE,
+        "simulated": not args.real,
+        "legacy": run_legacy(whisper_registry, audio, args.requests, args.entry_points),
+        "registry": run_registry(whisper_registry, audio, args.requests),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# benchmarks/bench_whisper_rtf.py
+#
+# Real-time factor (processing seconds / audio seconds, lower is better) of
+# whisper_registry.WhisperEngine across backends, model sizes, compute types
+# and thread counts. Fixtures are cut into utterances with the same VAD the
+# app uses; each configuration transcribes them one by one and, with
+# --batch N, in batches of N as the scheduler does when sessions queue up.
+# Prints a markdown table for choosing WHISPER_* settings per deployment.
+#
+#   python -m benchmarks.bench_whisper_rtf --sizes tiny base small --threads 1 2 4
+#   python -m benchmarks.bench_whisper_rtf --backends faster-whisper openai-whisper --batch 4
+#   python -m benchmarks.bench_whisper_rtf --fixtures path/to/fixtures --json rtf.json
+
+import glob
+import json
+import time
+import argparse
+import importlib.util
+from itertools import product
+from vad_segmenter import UtteranceSegmenter, SAMPLE_RATE
+from whisper_registry import WhisperEngine
+from benchmarks.bench_transcription import load_fixture, synthetic_fixture, CHUNK_BYTES
+
+BACKEND_MODULES = {"faster-whisper": "faster_whisper", "openai-whisper": "whisper"}
+
+
+def utterances(pcm):
+    segmenter = UtteranceSegmenter(partial_interval_s=0)
+    found = []
+    for offset in range(0, len(pcm), CHUNK_BYTES):
+        found += [audio for kind, audio in segmenter.feed(pcm[offset:offset + CHUNK_BYTES]) if kind == "final"]
+    found += [audio for kind, audio in segmenter.flush() if kind == "final"]
+    return found
+
+
+def configurations(args):
+    for backend in args.backends:
+        if importlib.util.find_spec(BACKEND_MODULES[backend]) is None:
+            print(f"⚠️ {backend} is not installed; skipping")
+            continue
+        compute_types = args.compute_types if backend == "faster-whisper" else ["float32"]
+        for size, compute_type, threads in product(args.sizes, compute_types, args.threads):
+            yield {"backend": backend, "model_size": size, "compute_type": compute_type, "cpu_threads": threads}
+
+
+def measure(config, segments, batch):
+    engine = WhisperEngine(num_workers=1, **config)
+    engine.get_model()
+    engine.transcribe(segments[0])  # warm-up: first call allocates buffers
+    audio_s = sum(len(s) for s in segments) / SAMPLE_RATE
+
+    start = time.perf_counter()
+    for segment in segments:
+        engine.transcribe(segment)
+    sequential = time.perf_counter() - start
+    row = {**config, "load_s": engine.stats["load_seconds"], "rss_mb": engine.stats["rss_delta_mb"],
+           "audio_s": round(audio_s, 2), "rtf": round(sequential / audio_s, 4)}
+
+    if batch > 1:
+        start = time.perf_counter()
+        for i in range(0, len(segments), batch):
+            engine.transcribe_batch(segments[i:i + batch])
+        row[f"rtf_batch{batch}"] = round((time.perf_counter() - start) / audio_s, 4)
+    return row
+
+
+def markdown(rows, batch):
+    columns = ["backend", "model_size", "compute_type", "cpu_threads", "load_s", "rss_mb", "rtf"]
+    if batch > 1:
+        columns.append(f"rtf_batch{batch}")
+    lines = ["| " + " | ".join(columns) + " |", "|" + "---|" * len(columns)]
+    for row in sorted(rows, key=lambda r: r["rtf"]):
+        lines.append("| " + " | ".join(str(row.get(c)) for c in columns) + " |")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", help="directory of 16 kHz mono .pcm/.wav recordings")
+    parser.add_argument("--backends", nargs="+", default=["faster-whisper", "openai-whisper"],
+                        choices=list(BACKEND_MODULES))
+    parser.add_argument("--sizes", nargs="+", default=["tiny", "base"])
+    parser.add_argument("--compute-types", nargs="+", default=["int8", "float32"])
+    parser.add_argument("--threads", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--batch", type=int, default=4, help="segments per transcribe_batch call; 1 disables")
+    parser.add_argument("--json", help="also write the rows as JSON here")
+    args = parser.parse_args()
+
+    if args.fixtures:
+        paths = sorted(glob.glob(f"{args.fixtures}/*.pcm") + glob.glob(f"{args.fixtures}/*.wav"))
+        pcms = [load_fixture(p) for p in paths]
+    else:
+        pcms = [synthetic_fixture()]
+    segments = [segment for pcm in pcms for segment in utterances(pcm)]
+    print(f"🎙 {len(segments)} utterances from {len(pcms)} fixture(s)")
+
+    rows = []
+    for config in configurations(args):
+        print("▶️", config)
+        rows.append(measure(config, segments, args.batch))
+
+    print(markdown(rows, args.batch))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# benchmarks/check_extraction.py
+#
+# Extraction regression check: FieldExtractor.extract() on turns where the
+# regex fast path used to beat the LLM or read the wrong value. A scripted
+# JSON-mode model returns what a correct extraction would; the result must
+# match it, and the regex fast path alone must not misread the answer
+# either.
+#
+# Exits nonzero on any failure.
+#
+#   python -m benchmarks.check_extraction
+
+import sys
+import json
+import types
+import asyncio
+from field_extractor import FieldExtractor, fast_path
+
+# (assistant question, user answer, scripted LLM reply, expected updates, expected fast-path updates)
+CASES = [
+    ("What city and state is the business in?", "We're in Washington, Pennsylvania",
+     {"SiteCity": "Washington", "SiteState": "PA"},
+     {"SiteCity": "Washington", "SiteState": "PA"}, {"SiteState": "PA"}),
+    ("Can you state the business name?", "Indiana Grill",
+     {"SiteCompanyName1": "Indiana Grill"},
+     {"SiteCompanyName1": "Indiana Grill"}, {}),
+    ("What is the business address and zip code?", "12345 Main Street, zip 90210",
+     {"SiteAddress": "12345 Main Street", "SiteZip": "90210"},
+     {"SiteAddress": "12345 Main Street", "SiteZip": "90210"}, {"SiteZip": "90210"}),
+    ("What is the zip code?", "It's 12345 Main Street, zip 90210",
+     None, {"SiteZip": "90210"}, {"SiteZip": "90210"}),
+]
+
+
+class ScriptedCompletions:
+    def __init__(self):
+        self.reply = None
+
+    async def create(self, **kwargs):
+        if self.reply is None:
+            raise AssertionError("the fast path should have answered this turn without the LLM")
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(
+            message=types.SimpleNamespace(content=json.dumps(self.reply))
+        )])
+
+
+async def check(failures):
+    completions = ScriptedCompletions()
+    extractor = FieldExtractor(client=types.SimpleNamespace(chat=types.SimpleNamespace(completions=completions)))
+    for question, answer, reply, expected, expected_fast in CASES:
+        completions.reply = reply
+        try:
+            got = await extractor.extract([(question, answer)], {})
+        except AssertionError as e:
+            got = str(e)
+        if got != expected:
+            failures.append(f"extract({answer!r}) -> {got}, expected {expected}")
+        found, _ = fast_path(question, answer)
+        if found != expected_fast:
+            failures.append(f"fast_path({answer!r}) -> {found}, expected {expected_fast}")
+
+
+def main():
+    failures = []
+    asyncio.run(check(failures))
+    for failure in failures:
+        print("❌", failure)
+    print(f"{len(CASES)} turns, {'FAILED' if failures else 'all passed'}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
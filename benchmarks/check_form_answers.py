@@ -0,0 +1,111 @@
+# benchmarks/check_form_answers.py
+#
+# Read-back answer check: classify_answer() on plain yeses, noes, hedges and
+# yeses that carry a correction, then FormProgress.answer() on a completed
+# form (in-process session store, no PDF rendering): a plain yes must queue
+# the PDF, and a yes with a new value must go back to collecting and reach
+# field extraction instead of confirming the old one.
+#
+# Exits nonzero on any failure.
+#
+#   python -m benchmarks.check_form_answers
+
+import sys
+import asyncio
+import form_progress
+from form_progress import FormProgress, classify_answer, CONFIRMED_REPLY, CORRECTION_ACK, REPEAT_PROMPT
+from session_store import SessionStore
+
+# phrase -> expected classify_answer() verdict
+ANSWERS = {
+    "Yes": True,
+    "Yes, that's correct.": True,
+    "Everything is correct": True,
+    "It is correct": True,
+    "I confirm": True,
+    "absolutely": True,
+    "Correct, thank you.": True,
+    "That looks good to me": True,
+    "Yes, no changes.": True,
+    "Nothing to change": True,
+    "Yes, but the zip is 90211": None,
+    "Yes, the state is wrong": None,
+    "yes 90211": None,
+    "I'm not sure": None,
+    "Hmm": None,
+    "No": False,
+    "No, the zip is 90211": False,
+    "That's not right": False,
+}
+
+COMPLETE_FORM = {
+    "SiteCompanyName1": "Indiana Grill", "CorporateCompanyName1": "Indiana Grill LLC",
+    "SiteAddress": "12 Main Street", "SiteCity": "Washington", "SiteState": "PA", "SiteZip": "90210",
+    "CorporateAddress": "12 Main Street", "CorporateCity": "Washington", "CorporateState": "PA",
+    "CorporateZip": "90210", "SiteVoice": "2125550100", "CorporateName": "Dana Lee",
+    "CorporateVoice": "2125550101", "SiteEmail": "info@grill.com", "BusinessWebsite": "grill.com",
+    "CustomerSvcEmail": "help@grill.com", "MCC-Desc": "5812 restaurants", "MerchantInitials1": "DL",
+}
+
+
+class RecordingExtractor:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, session_id, user_text, assistant_text=""):
+        self.submitted.append(user_text)
+
+
+class FakeJobs:
+    def __init__(self):
+        self.submitted = 0
+
+    async def submit(self, session_id, field_values):
+        self.submitted += 1
+        return f"job-{self.submitted}"
+
+
+async def answer_flow(user_text):
+    session_store, jobs = SessionStore(), FakeJobs()
+    form_progress.extractor = RecordingExtractor()
+    tracker = FormProgress(session_store=session_store, jobs=jobs)
+    session_id = session_store.create()
+    state = session_store.load(session_id)
+    state["form_data"].update(COMPLETE_FORM)
+    session_store.save(session_id, state)
+
+    assert await tracker.check(session_id), "complete form produced no read-back"
+    reply = await tracker.answer(session_id, user_text)
+    stage = session_store.load(session_id)["progress"]["stage"]
+    return reply, stage, jobs.submitted, form_progress.extractor.submitted
+
+
+async def check_flows(failures):
+    expected = {
+        "Everything is correct": (CONFIRMED_REPLY, "confirmed", 1, []),
+        "Yes, but the zip is 90211": (CORRECTION_ACK, "collecting", 0, ["Yes, but the zip is 90211"]),
+        "I'm not sure": (REPEAT_PROMPT, "reading_back", 0, []),
+    }
+    for text, want in expected.items():
+        got = await answer_flow(text)
+        if got != want:
+            failures.append(f"answer({text!r}) -> {got}, expected {want}")
+
+
+def main():
+    form_progress.READBACK_PREFETCH_TTS = False   # no TTS client here
+    failures = []
+    for text, want in ANSWERS.items():
+        got = classify_answer(text)
+        if got is not want:
+            failures.append(f"classify_answer({text!r}) -> {got}, expected {want}")
+    asyncio.run(check_flows(failures))
+
+    for failure in failures:
+        print("❌", failure)
+    print(f"{len(ANSWERS)} answers, {'FAILED' if failures else 'all passed'}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
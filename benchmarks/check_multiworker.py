@@ -0,0 +1,207 @@
+# benchmarks/check_multiworker.py
+#
+# Multi-worker check: runs serve.py with --workers N (benchmarks.fake_app, so
+# no Whisper weights; Azure realtime and OpenAI replaced by the bench_e2e
+# stand-ins) on a shared sqlite session store and file PDF store, then
+#
+#   1. per client: create a session, speak one turn on /ws/audio, confirm,
+#      poll /confirm/status round-robin (so other workers answer it), download
+#      the PDF and read /form-data back; the session's calls must all land on
+#      one worker and the PDF must come back whichever worker renders it;
+#   2. start a turn, SIGTERM serve.py mid-turn and check the reply still
+#      arrives, the socket is closed with 1012 and serve.py exits cleanly.
+#
+# Exits nonzero on any failure.
+#
+#   python -m benchmarks.check_multiworker --workers 3 --clients 12
+
+import os
+import sys
+import json
+import time
+import signal
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import multiprocessing
+import numpy as np
+from benchmarks.bench_e2e import (CHUNK_MS, SAMPLE_RATE, TRAILING_SILENCE_MS, free_port, make_fixtures,
+                                  run_fakes)
+
+
+def header(headers, name):
+    return headers.get(name) if headers is not None else None
+
+
+async def speak(ws, pcm):
+    chunk = SAMPLE_RATE * CHUNK_MS // 1000
+    pcm = np.concatenate([pcm, np.zeros(SAMPLE_RATE * TRAILING_SILENCE_MS // 1000, dtype=np.int16)])
+    for start in range(0, len(pcm), chunk):
+        await ws.send(pcm[start:start + chunk].tobytes())
+
+
+async def reply(ws, timeout=60):
+    while True:
+        message = await asyncio.wait_for(ws.recv(), timeout=timeout)
+        if isinstance(message, bytes):
+            continue
+        data = json.loads(message)
+        if data.get("busy"):
+            raise RuntimeError("worker busy")
+        if "audio_b64" in data or data.get("done"):
+            return data
+
+
+def fill_form(session_id, client_id):
+    from form_schema import FORM_FIELDS
+    from session_store import store
+    state = store.load(session_id)
+    values = {field: f"{field[:10]} {client_id}" for field in FORM_FIELDS}
+    state["form_data"].update(values)
+    store.save(session_id, state)
+    return values
+
+
+async def session_flow(client, port, client_id, pcm, report):
+    import websockets
+    base = f"http://127.0.0.1:{port}"
+    session_id = (await client.post(f"{base}/sessions")).raise_for_status().json()["session_id"]
+    seen = set()
+
+    async with websockets.connect(f"ws://127.0.0.1:{port}/ws/audio?tts=stream&session_id={session_id}",
+                                  max_size=None) as ws:
+        seen.add(header(getattr(ws, "response", None) and ws.response.headers, "x-worker"))
+        await speak(ws, pcm)
+        await reply(ws)
+
+    values = await asyncio.to_thread(fill_form, session_id, client_id)
+    confirm = (await client.post(f"{base}/confirm", json={"session_id": session_id, "confirmed": True})
+               ).raise_for_status()
+    seen.add(confirm.headers.get("x-worker"))
+    job_id = confirm.json()["job_id"]
+
+    # No session_id on the status URL: these go round-robin and the job is read from the store
+    status = (await client.get(f"{base}/confirm/status", params={"job_id": job_id, "wait": 30})).raise_for_status()
+    report["status_workers"].add(status.headers.get("x-worker"))
+    if status.json()["status"] != "done":
+        raise RuntimeError(f"job {job_id}: {status.json()}")
+
+    download = (await client.get(f"{base}/download", params={"session_id": session_id})).raise_for_status()
+    seen.add(download.headers.get("x-worker"))
+    if not download.content.startswith(b"%PDF"):
+        raise RuntimeError("download is not a PDF")
+
+    form = (await client.get(f"{base}/form-data", params={"session_id": session_id})).raise_for_status()
+    seen.add(form.headers.get("x-worker"))
+    if any(form.json().get(k) != v for k, v in values.items()):
+        raise RuntimeError("form data did not round-trip")
+
+    if len(seen) != 1:
+        raise RuntimeError(f"session {session_id} split across workers: {sorted(map(str, seen))}")
+    report["session_workers"].append(seen.pop())
+
+
+async def check_sessions(port, clients, fixtures):
+    import httpx
+    report = {"session_workers": [], "status_workers": set()}
+    async with httpx.AsyncClient(timeout=60) as client:
+        outcomes = await asyncio.gather(*[
+            session_flow(client, port, i, fixtures[i % len(fixtures)], report) for i in range(clients)
+        ], return_exceptions=True)
+        stats = (await client.get(f"http://127.0.0.1:{port}/router/stats")).json()
+    errors = [repr(o) for o in outcomes if isinstance(o, Exception)]
+    return {
+        "completed": clients - len(errors),
+        "errors": errors,
+        "workers_used": len(set(report["session_workers"])),
+        "status_answered_by": len(report["status_workers"]),
+        "router": stats,
+    }
+
+
+async def check_drain(port, serve, pcm):
+    import websockets
+    async with websockets.connect(f"ws://127.0.0.1:{port}/ws/audio?tts=stream&session_id=drain-check",
+                                  max_size=None) as ws:
+        await speak(ws, pcm)
+        serve.send_signal(signal.SIGTERM)
+        signalled = time.perf_counter()
+        data = await reply(ws)
+        replied = time.perf_counter() - signalled
+        try:
+            await asyncio.wait_for(ws.recv(), timeout=30)
+        except websockets.ConnectionClosed:
+            pass
+        code = ws.close_code
+    exit_code = await asyncio.to_thread(serve.wait, 60)
+    return {
+        "reply_completed": bool(data),
+        "reply_after_sigterm_s": round(replied, 3),
+        "close_code": code,
+        "serve_exit_code": exit_code,
+        "serve_exit_s": round(time.perf_counter() - signalled, 3),
+    }
+
+
+def wait_for_workers(port, workers, deadline):
+    import httpx
+    while time.monotonic() < deadline:
+        try:
+            stats = httpx.get(f"http://127.0.0.1:{port}/router/stats", timeout=1).json()
+            if len(stats["healthy"]) == workers:
+                return True
+        except (httpx.HTTPError, ValueError):
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--clients", type=int, default=12)
+    parser.add_argument("--startup-timeout", type=float, default=90)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="multiworker_")
+    realtime_port, openai_port, port = free_port(), free_port(), free_port()
+    fakes = multiprocessing.Process(target=run_fakes, daemon=True,
+                                    args=(realtime_port, openai_port, 0.02, 0.15, 0.12, 0.3))
+    fakes.start()
+    # Set before session_store is imported, so fill_form writes to the store the workers share
+    os.environ.update({
+        "SESSION_STORE": f"sqlite:///{tmp}/sessions.db",
+        "PDF_STORE": f"file://{tmp}/pdfs",
+        "AZURE_WS_URI": f"ws://127.0.0.1:{realtime_port}",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{openai_port}/v1",
+        "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "bench"),
+        "WHISPER_WARMUP": "0",
+        "DRAIN_TIMEOUT": "20",
+        "ROUTER_HEALTH_INTERVAL": "0.5",
+    })
+    serve = subprocess.Popen([sys.executable, "serve.py", "--workers", str(args.workers), "--host", "127.0.0.1",
+                              "--port", str(port), "--app", "benchmarks.fake_app:app"])
+    fixtures = make_fixtures()
+    report = {"workers": args.workers, "clients": args.clients}
+    try:
+        if not wait_for_workers(port, args.workers, time.monotonic() + args.startup_timeout):
+            raise SystemExit("❌ workers did not become ready")
+        report["sessions"] = asyncio.run(check_sessions(port, args.clients, fixtures))
+        report["drain"] = asyncio.run(check_drain(port, serve, fixtures[0]))
+    finally:
+        if serve.poll() is None:
+            serve.kill()
+        fakes.terminate()
+
+    print(json.dumps(report, indent=2, default=sorted))
+    sessions, drain = report["sessions"], report["drain"]
+    ok = (not sessions["errors"] and sessions["completed"] == args.clients
+          and sessions["workers_used"] > min(1, args.workers - 1)
+          and drain["reply_completed"] and drain["close_code"] == 1012 and drain["serve_exit_code"] == 0)
+    print("✅ multi-worker check passed" if ok else "❌ multi-worker check failed", file=sys.stderr)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
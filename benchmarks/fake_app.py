@@ -0,0 +1,15 @@
+# benchmarks/fake_app.py
+#
+# main:app with the offline Whisper stand-in from bench_e2e, for running real
+# worker processes without model weights:
+#
+#   python serve.py --workers 3 --app benchmarks.fake_app:app
+
+import os
+import whisper_registry
+from benchmarks.bench_e2e import fake_transcriber
+
+whisper_registry.transcribe = fake_transcriber(float(os.getenv("FAKE_DECODE_COST", "0.05")))
+whisper_registry.transcribe_batch = lambda audios: [whisper_registry.transcribe(a) for a in audios]
+
+from main import app  # noqa: E402  (after the patch, so handlers see the stand-in)
@@ -0,0 +1,71 @@
+# benchmarks/fake_openai_server.py (local stand-in for the OpenAI TTS and chat endpoints)
+#
+# Serves canned audio from /v1/audio/speech (1 s of a 24 kHz tone as WAV or raw
+# PCM, after a configurable synthesis delay) and an empty JSON object from
+# /v1/chat/completions, so the app's OpenAI clients work offline when pointed
+# here with OPENAI_BASE_URL.
+#
+#   python -m benchmarks.fake_openai_server 8766
+#   OPENAI_BASE_URL=http://127.0.0.1:8766/v1 uvicorn main:app
+
+import io
+import sys
+import time
+import asyncio
+import numpy as np
+import soundfile as sf
+import uvicorn
+from fastapi import FastAPI, Body
+from fastapi.responses import Response
+
+TTS_SAMPLE_RATE = 24000
+TTS_DELAY = 0.12            # seconds before the first byte, per request
+TTS_DELAY_PER_CHAR = 0.001  # longer inputs take longer to synthesize
+CHAT_DELAY = 0.3
+
+
+def canned_audio(seconds=1.0):
+    t = np.arange(int(TTS_SAMPLE_RATE * seconds)) / TTS_SAMPLE_RATE
+    pcm = (np.sin(2 * np.pi * 220 * t) * 3000).astype(np.int16)
+    wav = io.BytesIO()
+    sf.write(wav, pcm, TTS_SAMPLE_RATE, format="WAV", subtype="PCM_16")
+    return {"pcm": pcm.tobytes(), "wav": wav.getvalue()}
+
+
+def make_app(tts_delay=TTS_DELAY, tts_delay_per_char=TTS_DELAY_PER_CHAR, chat_delay=CHAT_DELAY):
+    app = FastAPI()
+    audio = canned_audio()
+    app.state.requests = {"speech": 0, "chat": 0}
+
+    @app.post("/v1/audio/speech")
+    async def speech(payload: dict = Body(...)):
+        app.state.requests["speech"] += 1
+        await asyncio.sleep(tts_delay + tts_delay_per_char * len(payload.get("input", "")))
+        response_format = payload.get("response_format", "mp3")
+        media_type = "audio/wav" if response_format == "wav" else "application/octet-stream"
+        return Response(content=audio.get(response_format, audio["wav"]), media_type=media_type)
+
+    @app.post("/v1/chat/completions")
+    async def chat(payload: dict = Body(...)):
+        app.state.requests["chat"] += 1
+        await asyncio.sleep(chat_delay)
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "{}"},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    return app
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8766
+    print(f"🧪 Fake OpenAI server on http://127.0.0.1:{port}/v1")
+    uvicorn.run(make_app(), host="127.0.0.1", port=port, log_level="warning")
@@ -0,0 +1,111 @@
+# fake_realtime_server.py (local stand-in for the Azure GPT-4o realtime WebSocket)
+#
+# Speaks the subset of the realtime protocol used by this app: it accepts
+# session.update / conversation.item.create / input_audio_buffer.append+commit /
+# response.create / response.cancel / conversation.item.delete and answers with response.created,
+# response.text.delta events (plus response.audio.delta when the session asked for audio),
+# response.text.done and response.done.
+#
+#   python fake_realtime_server.py 8765
+#   AZURE_WS_URI=ws://127.0.0.1:8765 uvicorn main:app
+
+import sys
+import json
+import base64
+import uuid
+import asyncio
+import websockets
+
+DELTA_DELAY = 0.02
+FIRST_DELTA_DELAY = 0.15
+AUDIO_DELTA = base64.b64encode(bytes(960)).decode("ascii")   # 20 ms of 24 kHz PCM16 silence
+
+
+def make_reply(user_text):
+    return f"You said: {user_text}. Could you tell me your business name?"
+
+
+async def respond(ws, user_text, audio, delta_delay, first_delta_delay):
+    reply = make_reply(user_text)
+    item_id = "item_" + uuid.uuid4().hex[:24]
+    await ws.send(json.dumps({"type": "response.created"}))
+    await ws.send(json.dumps({"type": "response.output_item.added",
+                              "item": {"id": item_id, "type": "message", "role": "assistant"}}))
+    await asyncio.sleep(first_delta_delay)
+    for word in reply.split(" "):
+        await ws.send(json.dumps({"type": "response.text.delta", "text": word + " "}))
+        if audio:
+            await ws.send(json.dumps({"type": "response.audio.delta", "delta": AUDIO_DELTA}))
+        await asyncio.sleep(delta_delay)
+    if audio:
+        await ws.send(json.dumps({"type": "response.audio.done"}))
+    await ws.send(json.dumps({"type": "response.text.done", "text": reply}))
+    await ws.send(json.dumps({"type": "response.done"}))
+
+
+async def handler(ws, path=None, delta_delay=DELTA_DELAY, first_delta_delay=FIRST_DELTA_DELAY):
+    last_user_text = ""
+    user_items = []    # (item_id, text) of user messages still in the conversation
+    audio_output = False
+    buffered_audio = 0
+    response = None
+
+    def start_response():
+        return asyncio.ensure_future(respond(ws, last_user_text, audio_output, delta_delay, first_delta_delay))
+
+    async for message in ws:
+        msg = json.loads(message)
+        event_type = msg.get("type")
+
+        if event_type == "session.update":
+            audio_output = "audio" in msg.get("session", {}).get("modalities", [])
+
+        elif event_type == "conversation.item.create":
+            item = msg.get("item", {})
+            if item.get("role") == "user":
+                last_user_text = item["content"][0].get("text", "")
+                user_items.append((item.get("id"), last_user_text))
+
+        elif event_type == "input_audio_buffer.append":
+            buffered_audio += len(base64.b64decode(msg.get("audio", "")))
+
+        elif event_type == "input_audio_buffer.commit":
+            # Stands in for server VAD: a committed buffer is a user turn.
+            await ws.send(json.dumps({"type": "input_audio_buffer.committed"}))
+            last_user_text = f"{buffered_audio} bytes of audio"
+            buffered_audio = 0
+            response = start_response()
+
+        elif event_type == "response.create":
+            response = start_response()
+
+        elif event_type == "response.cancel":
+            if response is not None and not response.done():
+                response.cancel()
+                await ws.send(json.dumps({"type": "response.done", "response": {"status": "cancelled"}}))
+            else:
+                await ws.send(json.dumps({"type": "error", "error": {"code": "response_cancel_not_active"}}))
+
+        elif event_type == "conversation.item.delete":
+            item_id = msg.get("item_id")
+            user_items = [(i, text) for i, text in user_items if i != item_id]
+            last_user_text = user_items[-1][1] if user_items else ""
+            await ws.send(json.dumps({"type": "conversation.item.deleted", "item_id": item_id}))
+
+    if response is not None:
+        response.cancel()
+
+
+async def serve(host="127.0.0.1", port=8765, **handler_kwargs):
+    """Starts the fake server and returns the websockets server object."""
+    return await websockets.serve(lambda ws, path=None: handler(ws, path, **handler_kwargs), host, port)
+
+
+async def main(port):
+    server = await serve(port=port)
+    print(f"🧪 Fake realtime server on ws://127.0.0.1:{port}")
+    await server.wait_closed()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 8765))
@@ -0,0 +1,217 @@
+# field_extractor.py (asynchronous, incremental form-field extraction)
+
+import os
+import re
+import json
+import asyncio
+from form_schema import FORM_FIELDS
+from field_normalizers import FINDERS
+from session_store import store
+from pipeline_metrics import timed
+from app_resources import resources
+
+EXTRACTION_MODEL = os.getenv("EXTRACTION_MODEL", "gpt-4o-mini")
+DEBOUNCE_S = float(os.getenv("EXTRACTION_DEBOUNCE_S", "0.75"))
+
+# Question keywords -> topic handled by the regex fast path
+TOPIC_KEYWORDS = {
+    "zip": r"\bzip\b|\bpostal\b",
+    # The noun, not the verb: "what state is it in?", not "can you state the business name?"
+    "state": r"\bstate\b(?!\s+(?:the|your|its|it|that|this|a|an|how|what|which|whether|if|why|for)\b)",
+    "fax": r"\bfax\b",
+    "phone": r"\bphone\b|\btelephone\b",
+    "email": r"\be-?mail\b",
+    "website": r"\bwebsite\b|\bweb site\b|\burl\b|\bweb address\b",
+}
+# Topics the fast path cannot answer; their presence always needs the LLM
+LLM_ONLY_KEYWORDS = r"\bname\b|\baddress\b|\bcity\b|\binitials?\b|\bmcc\b|\bsic\b|\bsignature\b|\bowner\b|\bcontact\b|\bretrieval\b"
+
+TOPIC_FIELDS = {
+    "zip": {"site": "SiteZip", "corporate": "CorporateZip"},
+    "state": {"site": "SiteState", "corporate": "CorporateState"},
+    "phone": {"site": "SiteVoice", "corporate": "CorporateVoice"},
+    "fax": {"site": "SiteFax", "corporate": "CorporateFax"},
+    "email": {"site": "SiteEmail", "corporate": "CorporateEmail", "support": "CustomerSvcEmail"},
+    "website": {"site": "BusinessWebsite", "corporate": "BusinessWebsite"},
+}
+
+
+def _field_words(field):
+    words = re.findall(r"[A-Z][a-z]+|[A-Z]+(?![a-z])|[a-z]+", field)
+    return {w.lower() for w in words} - {"site", "desc", "svc"}
+
+FIELD_WORDS = {field: _field_words(field) for field in FORM_FIELDS}
+
+
+def question_group(question):
+    q = question.lower()
+    if "customer service" in q or "support" in q:
+        return "support"
+    if any(word in q for word in ("billing", "corporate", "legal", "mailing")):
+        return "corporate"
+    return "site"
+
+
+def fast_path(question, answer):
+    """
+    Returns (updates, complete): values recognized by regex for the topics the
+    question asks about, and whether that covers everything it asked for.
+    """
+    q = question.lower()
+    topics = [topic for topic, pattern in TOPIC_KEYWORDS.items() if re.search(pattern, q)]
+    ambiguous = "fax" in topics and "phone" in topics   # two numbers in one answer: leave to the LLM
+    group = question_group(question)
+
+    updates = {}
+    for topic in topics:
+        if ambiguous and topic in ("fax", "phone"):
+            continue
+        fields = TOPIC_FIELDS[topic]
+        value = FINDERS[topic](answer)
+        if value is not None:
+            updates[fields.get(group, fields["site"])] = value
+
+    rest = re.sub(r"\b(e-?mail|website|web site|web) address\b", "", q)
+    complete = (bool(topics) and not ambiguous and len(updates) == len(topics)
+                and not re.search(LLM_ONLY_KEYWORDS, rest))
+    return updates, complete
+
+
+def relevant_fields(turns, form_data):
+    """Fields still missing plus any filled field the turns talk about (corrections)."""
+    text = " ".join(q + " " + a for q, a in turns).lower()
+    words = set(re.findall(r"[a-z]+", text))
+    return [
+        field for field in FORM_FIELDS
+        if not form_data.get(field) or FIELD_WORDS[field] & words
+    ]
+
+
+class FieldExtractor:
+    """
+    Collects (assistant question, user answer) turns per session and, after a
+    short debounce, extracts field values for all of them in one pass: regex
+    fast path first, then a single JSON-mode LLM call limited to the fields
+    that are still missing or being discussed. Runs entirely off the caller's
+    path; results are merged into the session's form_data in the store. Each
+    listener is then awaited with the session id after every pass, including
+    passes that found nothing new, so it can re-check the form.
+    """
+
+    def __init__(self, client=None, session_store=store, model=EXTRACTION_MODEL, debounce_s=DEBOUNCE_S):
+        self._client = client
+        self.store = session_store
+        self.model = model
+        self.debounce_s = debounce_s
+        self.pending = {}
+        self.tasks = {}
+        self.locks = {}
+        self.listeners = []
+        self.stats = {"turns": 0, "batches": 0, "coalesced": 0, "fast_path_turns": 0, "llm_calls": 0}
+
+    @property
+    def client(self):
+        return self._client or resources.openai
+
+    def submit(self, session_id, user_text, assistant_question):
+        if not user_text or not assistant_question:
+            return
+        self.stats["turns"] += 1
+        entry = self.pending.setdefault(session_id, {"turns": [], "timer": None})
+        turn = (assistant_question, user_text)
+        if turn not in entry["turns"]:
+            entry["turns"].append(turn)
+        if entry["timer"] is not None:
+            entry["timer"].cancel()
+            self.stats["coalesced"] += 1
+        entry["timer"] = asyncio.get_running_loop().call_later(self.debounce_s, self._start, session_id)
+
+    def _start(self, session_id):
+        entry = self.pending.pop(session_id, None)
+        if entry:
+            self.tasks[session_id] = asyncio.ensure_future(self._run(session_id, entry["turns"]))
+
+    async def flush(self, session_id):
+        """Runs any debounced turns now and waits for extraction to finish."""
+        entry = self.pending.get(session_id)
+        if entry:
+            entry["timer"].cancel()
+            self._start(session_id)
+        task = self.tasks.get(session_id)
+        if task is not None:
+            await task
+
+    async def _run(self, session_id, turns):
+        lock = self.locks.setdefault(session_id, asyncio.Lock())
+        async with lock:
+            self.stats["batches"] += 1
+            form_data = (await self.store.aload(session_id))["form_data"]
+            try:
+                updates = await self.extract(turns, form_data)
+            except Exception as e:
+                print("❌ LLM extraction failed:", e)
+                updates = {}
+            if updates:
+                # Merged in one atomic step: turns recorded meanwhile by the reply path are kept
+                await self.store.aupdate(session_id, lambda state: state["form_data"].update(updates))
+                print("🧠 Extracted:", updates)
+            for listener in self.listeners:
+                try:
+                    await listener(session_id)
+                except Exception as e:
+                    print("❌ Extraction listener failed:", e)
+        if self.tasks.get(session_id) is asyncio.current_task():
+            del self.tasks[session_id]
+            if session_id not in self.pending:
+                self.locks.pop(session_id, None)
+
+    async def extract(self, turns, form_data):
+        updates, llm_turns = {}, []
+        for question, answer in turns:
+            found, complete = fast_path(question, answer)
+            if complete:
+                updates.update(found)
+                self.stats["fast_path_turns"] += 1
+            else:
+                # The LLM reads the whole turn; a partial regex guess ("Washington" for the state
+                # in "Washington, Pennsylvania") is worse than none
+                llm_turns.append((question, answer))
+
+        if llm_turns:
+            merged = {**form_data, **updates}
+            fields = relevant_fields(llm_turns, merged)
+            if fields:
+                updates.update(await self._ask_llm(llm_turns, fields))
+        return updates
+
+    async def _ask_llm(self, turns, fields):
+        self.stats["llm_calls"] += 1
+        transcript = "\n".join(f"Assistant: {q}\nUser: {a}" for q, a in turns)
+        prompt = f"""
+You are helping to fill out a merchant processing application form. Based on the conversation below, extract values for any of these fields that the user provided:
+
+{fields}
+
+{transcript}
+
+Respond with a JSON object whose keys are field names from the list above. Omit fields the user did not provide.
+"""
+        with timed("extraction_llm"):
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": "You extract structured fields from conversations and reply in JSON."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0,
+                response_format={"type": "json_object"}
+            )
+        content = response.choices[0].message.content
+        parsed = json.loads(content)
+        return {
+            key: value for key, value in parsed.items()
+            if key in fields and value not in (None, "", "null")
+        }
+
+
+extractor = FieldExtractor()
@@ -0,0 +1,87 @@
+# field_normalizers.py (deterministic recognizers for easily spotted form values)
+
+import re
+
+US_STATES = {
+    "alabama": "AL", "alaska": "AK", "arizona": "AZ", "arkansas": "AR", "california": "CA",
+    "colorado": "CO", "connecticut": "CT", "delaware": "DE", "district of columbia": "DC",
+    "florida": "FL", "georgia": "GA", "hawaii": "HI", "idaho": "ID", "illinois": "IL",
+    "indiana": "IN", "iowa": "IA", "kansas": "KS", "kentucky": "KY", "louisiana": "LA",
+    "maine": "ME", "maryland": "MD", "massachusetts": "MA", "michigan": "MI", "minnesota": "MN",
+    "mississippi": "MS", "missouri": "MO", "montana": "MT", "nebraska": "NE", "nevada": "NV",
+    "new hampshire": "NH", "new jersey": "NJ", "new mexico": "NM", "new york": "NY",
+    "north carolina": "NC", "north dakota": "ND", "ohio": "OH", "oklahoma": "OK", "oregon": "OR",
+    "pennsylvania": "PA", "rhode island": "RI", "south carolina": "SC", "south dakota": "SD",
+    "tennessee": "TN", "texas": "TX", "utah": "UT", "vermont": "VT", "virginia": "VA",
+    "washington": "WA", "west virginia": "WV", "wisconsin": "WI", "wyoming": "WY",
+}
+STATE_CODES = set(US_STATES.values())
+
+EMAIL_RE = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b")
+URL_RE = re.compile(r"\b(?:https?://)?(?:www\.)?[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}(?:/\S*)?", re.I)
+PHONE_RE = re.compile(r"(?<!\d)(?:\+?1[\s.-]?)?\(?(\d{3})\)?[\s.-]?(\d{3})[\s.-]?(\d{4})(?!\d)")
+ZIP_RE = re.compile(r"(?<![\d-])(\d{5})(?:[\s-](\d{4}))?(?![\d-])")
+STATE_NAME_RE = re.compile(r"\b(" + "|".join(sorted(US_STATES, key=len, reverse=True)) + r")\b", re.I)
+STATE_CODE_RE = re.compile(r"\b([A-Z]{2})\b")
+# Values the user labels ("zip 90210", "the state is Ohio") beat anything else in the answer
+ZIP_LABEL_RE = re.compile(r"\b(?:zip|postal)(?: code)?(?: is)?\W*", re.I)
+STATE_LABEL_RE = re.compile(r"\bstate(?: is)?\W*", re.I)
+
+
+def find_email(text):
+    match = EMAIL_RE.search(text)
+    return match.group(0).lower() if match else None
+
+
+def find_url(text):
+    text = EMAIL_RE.sub(" ", text)
+    match = URL_RE.search(text)
+    return match.group(0).rstrip(".,").lower() if match else None
+
+
+def find_phone(text):
+    match = PHONE_RE.search(text)
+    return f"({match.group(1)}) {match.group(2)}-{match.group(3)}" if match else None
+
+
+def _after_label(label_re, text):
+    # The text following the last label, or None when there is none
+    labels = list(label_re.finditer(text))
+    return text[labels[-1].end():] if labels else None
+
+
+def find_zip(text):
+    text = PHONE_RE.sub(" ", text)
+    labelled = _after_label(ZIP_LABEL_RE, text)
+    match = ZIP_RE.match(labelled) if labelled is not None else None
+    # Unlabelled, the zip closes an address: "12345 Main Street, Springfield 90210" is 90210
+    match = match or (list(ZIP_RE.finditer(text)) or [None])[-1]
+    if not match:
+        return None
+    return f"{match.group(1)}-{match.group(2)}" if match.group(2) else match.group(1)
+
+
+def find_state(text):
+    labelled = _after_label(STATE_LABEL_RE, text)
+    if labelled is not None:
+        match = STATE_NAME_RE.match(labelled) or STATE_CODE_RE.match(labelled)
+        code = US_STATES.get(match.group(1).lower(), match.group(1)) if match else None
+        if code in STATE_CODES:
+            return code
+    # Unlabelled, the state follows the city: "Washington, Pennsylvania" is PA
+    names = STATE_NAME_RE.findall(text)
+    if names:
+        return US_STATES[names[-1].lower()]
+    # Bare two-letter codes only when written in capitals ("TX"), so words like "in"/"or" don't match.
+    codes = [code for code in STATE_CODE_RE.findall(text) if code in STATE_CODES]
+    return codes[-1] if codes else None
+
+
+FINDERS = {
+    "email": find_email,
+    "website": find_url,
+    "phone": find_phone,
+    "fax": find_phone,
+    "zip": find_zip,
+    "state": find_state,
+}
@@ -1,8 +1,15 @@
+import os
 import sys
 import json
 import io
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor
 import fitz  # PyMuPDF
 
+_template_cache = {}
+_template_lock = threading.Lock()
+
 
 def extract_form_fields(pdf_path):
     """
@@ -28,41 +35,136 @@ def extract_form_fields(pdf_path):
     return fields
 
 
-def fill_pdf(input_pdf_path, output_pdf_path, data):
-    """
-    Overlays extracted field values into corresponding positions on a PDF using text rendering.
-    """
-    # Clean up null values
-    for key in list(data.keys()):
-        if data[key] == "null" or data[key] is None:
-            data[key] = ""
+def _index_path(pdf_path):
+    return os.path.splitext(pdf_path)[0] + ".fields.json"
 
-    print("Extracting field positions...")
-    fields = extract_form_fields(input_pdf_path)
 
-    print(f"Opening PDF: {input_pdf_path}")
-    doc = fitz.open(input_pdf_path)
+def load_template(pdf_path):
+    """
+    Returns (template_bytes, field_index) for a template, cached per process.
+    The field index is built on first use and persisted next to the template as
+    <name>.fields.json (not versioned), then rebuilt only when the template's
+    SHA-256 no longer matches.
+    """
+    st = os.stat(pdf_path)
+    cache_key = (os.path.abspath(pdf_path), st.st_mtime_ns, st.st_size)
+    cached = _template_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    with _template_lock:
+        cached = _template_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        with open(pdf_path, "rb") as f:
+            template_bytes = f.read()
+        digest = hashlib.sha256(template_bytes).hexdigest()
+
+        fields = None
+        index_path = _index_path(pdf_path)
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("sha256") == digest:
+                fields = index["fields"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+        if fields is None:
+            print(f"Building field index for {pdf_path}...")
+            fields = extract_form_fields(pdf_path)
+            try:
+                # Atomic: several PDF workers may build it at once on a fresh checkout
+                tmp_path = f"{index_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"sha256": digest, "fields": fields}, f)
+                os.replace(tmp_path, index_path)
+            except OSError as e:
+                print(f"Could not persist field index: {e}")
+
+        cached = (template_bytes, fields)
+        _template_cache.clear()
+        _template_cache[cache_key] = cached
+        return cached
+
+
+def fill_pdf_bytes(input_pdf_path, data, verbose=False):
+    """
+    Overlays field values onto the template and returns the filled PDF as bytes.
+    The template is opened once, from memory, using the cached field index.
+    """
+    template_bytes, fields = load_template(input_pdf_path)
+    doc = fitz.open(stream=template_bytes, filetype="pdf")
 
     for field_name, field_info in fields.items():
-        if field_name in data and data[field_name]:
-            value = data[field_name]
-            page_num = field_info['page']
-            x0, y0, x1, y1 = field_info['rect']
-            page = doc[page_num]
+        value = data.get(field_name)
+        if not value or value == "null":
+            continue
+        page_num = field_info['page']
+        x0, y0, x1, y1 = field_info['rect']
+        page = doc[page_num]
+
+        font_size = min(11, (y1 - y0) - 2)  # Auto-scale font
+        x_pos = x0 + 2                     # Small left margin
+        y_pos = y0 + (y1 - y0) * 0.75      # Slightly below center
+
+        if verbose:
+            print(f"Field: {field_name}, Value: {value}")
+        page.insert_text((x_pos, y_pos), str(value), fontsize=font_size, fontname="helv")
 
-            font_size = min(11, (y1 - y0) - 2)  # Auto-scale font
-            x_pos = x0 + 2                     # Small left margin
-            y_pos = y0 + (y1 - y0) * 0.75      # Slightly below center
+    buffer = io.BytesIO()
+    doc.save(buffer, incremental=False, deflate=True)
+    doc.close()
+    return buffer.getvalue()
 
-            print(f"Field: {field_name}, Value: {value}")
-            page.insert_text((x_pos, y_pos), str(value), fontsize=font_size, fontname="helv")
+
+def fill_pdf(input_pdf_path, output_pdf_path, data):
+    """
+    Overlays extracted field values into corresponding positions on a PDF using text rendering.
+    """
+    print(f"Filling PDF: {input_pdf_path}")
+    pdf_bytes = fill_pdf_bytes(input_pdf_path, data, verbose=True)
 
     print(f"Saving to: {output_pdf_path}")
-    doc.save(output_pdf_path, incremental=False, deflate=True)
-    doc.close()
+    with open(output_pdf_path, "wb") as f:
+        f.write(pdf_bytes)
     print(f"PDF successfully filled and saved to {output_pdf_path}")
 
 
+def _fill_one(job):
+    input_pdf_path, data, output_pdf_path = job
+    pdf_bytes = fill_pdf_bytes(input_pdf_path, data)
+    if output_pdf_path is None:
+        return pdf_bytes
+    with open(output_pdf_path, "wb") as f:
+        f.write(pdf_bytes)
+    return output_pdf_path
+
+
+def fill_pdf_batch(input_pdf_path, records, output_dir=None, max_workers=None):
+    """
+    Fills many records against one template on a process pool. Each worker
+    loads the template and field index once. With output_dir, record i is
+    written to <output_dir>/filled_<i>.pdf and the paths are returned;
+    otherwise the PDF bytes are returned in record order.
+    """
+    load_template(input_pdf_path)  # build/persist the index once, before forking workers
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    jobs = [
+        (input_pdf_path, record, os.path.join(output_dir, f"filled_{i}.pdf") if output_dir else None)
+        for i, record in enumerate(records)
+    ]
+    if len(jobs) <= 1:
+        return [_fill_one(job) for job in jobs]
+
+    max_workers = max_workers or os.cpu_count() or 1
+    chunksize = max(1, len(jobs) // (max_workers * 4))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_fill_one, jobs, chunksize=chunksize))
+
+
 def load_json_data(json_file_path):
     """
     Loads field values from a JSON file.
@@ -0,0 +1,328 @@
+# form_progress.py (deterministic form-completion tracking, read-back and confirmation)
+#
+# Stages, kept in the session state under "progress":
+#   collecting    fields are still missing or invalid; the assistant keeps asking
+#   reading_back  every required field is valid; the read-back was sent, awaiting yes/no
+#   confirmed     the user said yes; fields are confirmed and the PDF is queued
+#
+# A live handler registers progress.speakers[session_id] (an async callable
+# taking the text) while its client is connected: after every extraction pass
+# the read-back, once ready, is spoken through it. The handler passes each
+# user transcript to answer() first and only runs a normal turn on None.
+# A handler whose client fetches the speech itself after getting the text
+# (the relay's browser, from /tts/stream) also sets
+# progress.speech_formats[session_id], and the read-back is synthesized
+# ahead in that form: "stream" (PCM per sentence) or "wav" (the whole text).
+# Handlers that synthesize in-process need no prefetch.
+
+import os
+import re
+import asyncio
+from field_normalizers import EMAIL_RE, URL_RE, ZIP_RE, STATE_CODES, US_STATES, find_phone
+from session_store import store
+from pdf_jobs import pdf_jobs, PdfQueueFull
+from field_extractor import extractor
+from tts_cache import tts_cache
+from streaming_tts import stream_reply_audio, synthesize_pcm, iter_text
+from pipeline_metrics import log
+from app_resources import resources
+
+READBACK_PREFETCH_TTS = os.getenv("READBACK_PREFETCH_TTS", "1") == "1"
+
+# field -> (spoken label, value kind, required). Required = what the assistant is told to collect.
+FIELD_SPECS = {
+    "SiteCompanyName1": ("business name", "text", True),
+    "CorporateCompanyName1": ("legal name", "text", True),
+    "SiteAddress": ("business address", "text", True),
+    "SiteCity": ("city", "text", True),
+    "SiteState": ("state", "state", True),
+    "SiteZip": ("zip code", "zip", True),
+    "CorporateAddress": ("billing address", "text", True),
+    "CorporateCity": ("billing city", "text", True),
+    "CorporateState": ("billing state", "state", True),
+    "CorporateZip": ("billing zip code", "zip", True),
+    "SiteVoice": ("business phone", "phone", True),
+    "SiteFax": ("fax", "phone", False),
+    "CorporateName": ("contact name", "text", True),
+    "CorporateVoice": ("contact phone", "phone", True),
+    "CorporateFax": ("contact fax", "phone", False),
+    "SiteEmail": ("business email", "email", True),
+    "BusinessWebsite": ("website", "website", True),
+    "CustomerSvcEmail": ("customer service email", "email", True),
+    "MCC-Desc": ("SIC or MCC", "text", True),
+    "MerchantInitials1": ("initials", "initials", True),
+}
+REQUIRED_FIELDS = [field for field, (_, _, required) in FIELD_SPECS.items() if required]
+
+# One sentence per group so the streaming TTS path synthesizes (and caches) them separately.
+# A sentence is skipped when any of its fields is empty.
+READ_BACK = [
+    "Business name {SiteCompanyName1}, legal name {CorporateCompanyName1}.",
+    "Business address {SiteAddress}, {SiteCity}, {SiteState} {SiteZip}.",
+    "Billing address {CorporateAddress}, {CorporateCity}, {CorporateState} {CorporateZip}.",
+    "Business phone {SiteVoice}.",
+    "Fax {SiteFax}.",
+    "Contact {CorporateName}, phone {CorporateVoice}.",
+    "Contact fax {CorporateFax}.",
+    "Business email {SiteEmail}, customer service email {CustomerSvcEmail}.",
+    "Website {BusinessWebsite}.",
+    "SIC or MCC {MCC-Desc}, initials {MerchantInitials1}.",
+]
+READ_BACK_INTRO = "Here is what I have."
+# Fixed sentences, so worth listing in TTS_PREWARM_FILE; every read-back ends with the first
+CONFIRM_PROMPT = "Thank you. Could you please confirm that all of this information is correct?"
+CONFIRMED_REPLY = "Thank you. It may take a few seconds to process all the information."
+REPEAT_PROMPT = "Sorry, I didn't catch that. Is all of the information correct? Please say yes, or tell me what to change."
+CORRECTION_PROMPT = "No problem. What should I change?"
+CORRECTION_ACK = "Thanks, let me update that."
+
+YES_WORDS = (r"yes|yeah|yep|yup|sure|ok|okay|perfect|absolutely|definitely|exactly|correct|right|accurate|"
+             r"confirm(ed)?|good|great|fine")
+# Words that can surround a yes without adding anything ("I confirm", "everything is correct, thanks")
+FILLER_WORDS = (r"i|it|it's|its|is|that|that's|thats|this|all|everything|looks|look|sounds|seems|to|me|thank|"
+                r"thanks|you|please|the|information|details|go|ahead|so|well|oh|um|uh|hmm|totally|very|much")
+# A yes and nothing else. A yes followed by anything more ("yes, but the zip is ...") is not one.
+AFFIRMATIVE_RE = re.compile(rf"(({FILLER_WORDS}) )*({YES_WORDS})( ({FILLER_WORDS}|{YES_WORDS}))*")
+LEADING_YES_RE = re.compile(rf"(({FILLER_WORDS}) )*({YES_WORDS})\b")
+NEGATIVE_RE = re.compile(r"\b(no|nope|not|wrong|incorrect|change|actually|wait|mistake|fix)\b")
+# Negations that confirm ("yes, no changes"): removed before looking for a no
+CONFIRMING_NEGATION_RE = re.compile(
+    r"\b(no|not any|nothing|don'?t|do not) (changes?|mistakes?|errors?|corrections?|problems?|issues?|"
+    r"need to change( anything)?|to (change|fix)|change anything|wrong)\b|\bnothing (else|wrong)\b"
+)
+UNSURE_RE = re.compile(r"\b(not sure|unsure|don'?t know|do not know|maybe|not really sure)\b")
+NO_WORDS_RE = re.compile(r"\b(no|nope|nah|not|wrong|incorrect)\b")
+FIELD_PLACEHOLDER_RE = re.compile(r"\{([^}]+)\}")
+
+
+def new_progress():
+    return {"stage": "collecting", "read_back": "", "confirmed": [], "pdf_job": None}
+
+
+def progress_of(state):
+    return state.setdefault("progress", new_progress())
+
+
+def validate(kind, value):
+    """Returns (normalized value, None) or (None, reason)."""
+    if value is None or not str(value).strip() or str(value).strip().lower() in ("null", "none", "n/a"):
+        return None, "missing"
+    value = " ".join(str(value).split())
+    if kind == "email":
+        return (value.lower(), None) if EMAIL_RE.fullmatch(value) else (None, "not an email address")
+    if kind == "website":
+        return (value.lower(), None) if URL_RE.fullmatch(value) else (None, "not a web address")
+    if kind == "phone":
+        phone = find_phone(value)
+        return (phone, None) if phone else (None, "not a 10-digit phone number")
+    if kind == "zip":
+        match = ZIP_RE.fullmatch(value)
+        if not match:
+            return None, "not a 5 or 9 digit zip code"
+        return (f"{match.group(1)}-{match.group(2)}" if match.group(2) else match.group(1)), None
+    if kind == "state":
+        code = US_STATES.get(value.lower(), value.upper())
+        return (code, None) if code in STATE_CODES else (None, "not a US state")
+    if kind == "initials":
+        letters = re.sub(r"[^A-Za-z]", "", value)
+        return (letters.upper(), None) if 1 <= len(letters) <= 4 else (None, "not initials")
+    return value, None
+
+
+def _normalize(text):
+    return " ".join(re.sub(r"[^\w\s']", " ", text.lower()).split())
+
+
+def classify_answer(text):
+    """
+    True for a plain yes, False for a no or a correction, None when unclear.
+    A yes with more after it ("yes, but the zip is 90211") is unclear: it
+    may carry a correction, so answer() sends it through field extraction.
+    """
+    text = _normalize(text)
+    if UNSURE_RE.search(text):
+        return None
+    rest, confirming = CONFIRMING_NEGATION_RE.subn(" ", text)
+    rest = " ".join(rest.split())
+    if AFFIRMATIVE_RE.fullmatch(rest) or (confirming > 0 and not rest):
+        return True
+    if NEGATIVE_RE.search(rest) and not LEADING_YES_RE.match(rest):
+        return False
+    return None
+
+
+def has_details(text):
+    """True when an answer says more than yes or no: a "but", a value, a field name."""
+    text = _normalize(text)
+    if UNSURE_RE.search(text):
+        return False
+    rest = CONFIRMING_NEGATION_RE.sub(" ", text)
+    words = [word for word in rest.split()
+             if not re.fullmatch(rf"{YES_WORDS}|{FILLER_WORDS}", word) and not NO_WORDS_RE.fullmatch(word)]
+    return bool(words)
+
+
+class FormProgress:
+    """
+    Tracks each session's form against FIELD_SPECS without the LLM: per-field
+    status, a read-back assembled from templates once every required field
+    is valid, yes/no handling of the user's answer and, on yes, the PDF
+    render. State lives in the session store, so any worker can pick it up.
+    """
+
+    def __init__(self, session_store=store, jobs=pdf_jobs, tts_client=None):
+        self.store = session_store
+        self.jobs = jobs
+        self._tts_client = tts_client
+        self.speakers = {}   # session_id -> async callable delivering assistant text to the client
+        self.speech_formats = {}   # session_id -> "stream" or "wav": how its client synthesizes the text
+        self.stats = {"read_backs": 0, "confirmed": 0, "corrections": 0, "unclear_answers": 0}
+
+    @property
+    def tts_client(self):
+        return self._tts_client or resources.openai
+
+    def field_status(self, form_data, confirmed=()):
+        fields = {}
+        for field, (label, kind, required) in FIELD_SPECS.items():
+            value, error = validate(kind, form_data.get(field))
+            if field in confirmed and value is not None:
+                status = "confirmed"
+            elif value is not None:
+                status = "valid"
+            else:
+                status = "missing" if error == "missing" else "invalid"
+            fields[field] = {"label": label, "required": required, "status": status, "value": value, "error": error}
+        return fields
+
+    def summary(self, state):
+        progress = state.get("progress") or new_progress()
+        fields = self.field_status(state["form_data"], progress["confirmed"])
+        required = [fields[field] for field in REQUIRED_FIELDS]
+        return {
+            "stage": progress["stage"],
+            "required": len(required),
+            "valid": sum(f["status"] in ("valid", "confirmed") for f in required),
+            "missing": [f for f in REQUIRED_FIELDS if fields[f]["status"] == "missing"],
+            "invalid": {f: fields[f]["error"] for f in FIELD_SPECS if fields[f]["status"] == "invalid"},
+            "pdf_job": progress["pdf_job"],
+            "fields": fields,
+        }
+
+    def read_back(self, form_data):
+        values = {field: validate(kind, form_data.get(field))[0] for field, (_, kind, _) in FIELD_SPECS.items()}
+        sentences = [READ_BACK_INTRO]
+        for template in READ_BACK:
+            names = FIELD_PLACEHOLDER_RE.findall(template)
+            if all(values.get(name) for name in names):
+                sentences.append(FIELD_PLACEHOLDER_RE.sub(lambda m: values[m.group(1)], template))
+        sentences.append(CONFIRM_PROMPT)
+        return " ".join(sentences)
+
+    async def check(self, session_id):
+        """
+        Called after fields change. Returns the read-back text when the form
+        has just become complete, otherwise None.
+        """
+        if not self._ready_for_read_back(await self.store.aload(session_id)):
+            return None
+        read_back = []
+
+        def start_read_back(state):
+            # Checked again inside the atomic update: another writer may have moved the stage on
+            read_back.clear()
+            if self._ready_for_read_back(state):
+                read_back.append(self.read_back(state["form_data"]))
+                progress_of(state).update(stage="reading_back", read_back=read_back[0])
+                state["last_assistant_msg"] = read_back[0]
+
+        await self.store.aupdate(session_id, start_read_back)
+        if not read_back:
+            return None
+        text = read_back[0]
+        self.stats["read_backs"] += 1
+        log("read_back", f"📋 Read-back ready for {session_id}", session_id=session_id)
+        speech_format = self.speech_formats.get(session_id)
+        if READBACK_PREFETCH_TTS and speech_format:
+            asyncio.ensure_future(self._prefetch_speech(text, speech_format))
+        return text
+
+    def _ready_for_read_back(self, state):
+        if progress_of(state)["stage"] != "collecting":
+            return False
+        fields = self.field_status(state["form_data"])
+        return all(fields[field]["status"] == "valid" for field in REQUIRED_FIELDS)
+
+    async def on_extracted(self, session_id):
+        # Extraction listener. Without a connected client nobody would hear the
+        # read-back, so it waits for a pass while one is.
+        speaker = self.speakers.get(session_id)
+        if speaker is None:
+            return
+        text = await self.check(session_id)
+        if text:
+            await speaker(text)
+
+    async def answer(self, session_id, user_text):
+        """
+        Handles the user's reply to the read-back. Returns the assistant's
+        reply text when the tracker answered it, or None when the session is
+        not waiting on a read-back (the conversation carries on as usual).
+        Anything but a plain yes with details in it goes to field extraction.
+        """
+        state = await self.store.aload(session_id)
+        progress = progress_of(state)
+        if progress["stage"] != "reading_back":
+            return None
+
+        verdict = classify_answer(user_text)
+        if verdict is None:
+            self.stats["unclear_answers"] += 1
+            if not has_details(user_text):
+                return REPEAT_PROMPT
+        if not verdict:
+            # A no, or a yes with details. Back to collecting: the extractor runs check() after its
+            # next pass, whether or not it finds anything, so the read-back comes again. A bare "no"
+            # has nothing to extract: the user's next turn (the correction) is submitted as usual
+            # and triggers that pass.
+            if verdict is False:
+                self.stats["corrections"] += 1
+            bare_no = not has_details(user_text)
+            if not bare_no:
+                extractor.submit(session_id, user_text, progress["read_back"])
+            await self.store.aupdate(session_id, lambda state: progress_of(state).update(stage="collecting",
+                                                                                         read_back=""))
+            return CORRECTION_PROMPT if bare_no else CORRECTION_ACK
+
+        fields = self.field_status(state["form_data"])
+        confirmed = {field: status["value"] for field, status in fields.items() if status["value"] is not None}
+        pdf_job = None
+        try:
+            pdf_job = await self.jobs.submit(session_id, {**state["form_data"], **confirmed})
+        except PdfQueueFull as e:
+            log("error", f"⚠️ PDF not queued, /confirm can retry: {e}", session_id=session_id)
+
+        def confirm(state):
+            state["form_data"].update(confirmed)
+            progress_of(state).update(stage="confirmed", confirmed=list(confirmed), pdf_job=pdf_job)
+            state["end_triggered"] = True
+
+        await self.store.aupdate(session_id, confirm)
+        self.stats["confirmed"] += 1
+        log("confirmed", f"✅ Form confirmed for {session_id}", session_id=session_id, pdf_job=pdf_job)
+        return CONFIRMED_REPLY
+
+    async def _prefetch_speech(self, text, speech_format):
+        # The client speaks the read-back next; have it in the TTS cache, keyed as it will ask, by then.
+        try:
+            if speech_format == "stream":
+                async for _ in stream_reply_audio(iter_text(text), lambda s: synthesize_pcm(self.tts_client, s)):
+                    pass
+            else:
+                await tts_cache.asynthesize(self.tts_client, text, response_format="wav")
+        except Exception as e:
+            print("⚠️ Read-back TTS prefetch failed:", e)
+
+
+progress = FormProgress()
+extractor.listeners.append(progress.on_extracted)
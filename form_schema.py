@@ -0,0 +1,7 @@
+# form_schema.py (fields of the Merchant Processing Application collected by the assistant)
+
+FORM_FIELDS = ["SiteCompanyName1", "SiteAddress", "SiteCity", "SiteState", "SiteZip", "SiteVoice", "SiteFax", "CorporateCompanyName1", "CorporateAddress", "CorporateCity", "CorporateState", "CorporateZip", "CorporateName", "SiteEmail", "CorporateVoice", "CorporateFax", "BusinessWebsite", "CorporateEmail", "CustomerSvcEmail", "AppRetrievalMail", "AppRetrievalFax", "AppRetrievalFaxNumber", "MCC-Desc", "MerchantInitials1", "MerchantInitials2", "MerchantInitials3", "MerchantInitials4", "MerchantInitials5", "MerchantInitials6", "MerchantInitials7", "signer1signature1", "Owner0Name1", "Owner0LastName1", "signer1signature2", "Owner0Name2", "Owner0LastName2"]
+
+
+def empty_form():
+    return {field: None for field in FORM_FIELDS}
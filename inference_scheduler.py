@@ -0,0 +1,148 @@
+# inference_scheduler.py (bounded, fair executor for blocking model calls)
+
+import os
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# CTranslate2 / PyTorch release the GIL while decoding, so threads give real
+# parallelism here without pickling audio across a process boundary.
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+MAX_SESSION_QUEUE = int(os.getenv("INFERENCE_MAX_SESSION_QUEUE", "2"))
+MAX_PENDING = int(os.getenv("INFERENCE_MAX_PENDING", str(INFERENCE_WORKERS * 4)))
+MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", "8"))
+
+
+class SchedulerBusy(Exception):
+    """Raised when a job is rejected because the session or the whole pool is saturated."""
+
+
+class InferenceScheduler:
+    """
+    Runs blocking inference jobs on a bounded thread pool. Each session has its
+    own FIFO queue and sessions are served round-robin, so one chatty caller
+    cannot starve the others. Submissions beyond the per-session or global
+    limits fail fast with SchedulerBusy instead of queueing unboundedly.
+
+    Jobs submitted with run_batch() that are waiting when a worker frees up
+    are handed to their batch function together, one per session, up to
+    max_batch at a time.
+    """
+
+    def __init__(self, max_workers=INFERENCE_WORKERS, max_session_queue=MAX_SESSION_QUEUE,
+                 max_pending=MAX_PENDING, max_batch=MAX_BATCH):
+        self.max_workers = max_workers
+        self.max_session_queue = max_session_queue
+        self.max_pending = max_pending
+        self.max_batch = max_batch
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="inference")
+        self.queues = {}
+        self.ready = deque()
+        self.running = 0
+        self.pending = 0
+
+    @property
+    def saturated(self):
+        return self.pending >= self.max_pending
+
+    async def run(self, session_id, fn, *args, **kwargs):
+        return await self._submit(session_id, fn, args, kwargs, False)
+
+    async def run_batch(self, session_id, batch_fn, item):
+        """Runs batch_fn([item, ...]) -> [result, ...], possibly sharing the call with other sessions."""
+        return await self._submit(session_id, batch_fn, (item,), {}, True)
+
+    async def _submit(self, session_id, fn, args, kwargs, batched):
+        queue = self.queues.setdefault(session_id, deque())
+        if len(queue) >= self.max_session_queue or self.saturated:
+            if not queue:
+                del self.queues[session_id]
+            raise SchedulerBusy(f"inference queue full for session {session_id}")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        queue.append((fn, args, kwargs, future, batched))
+        self.pending += 1
+        if session_id not in self.ready:
+            self.ready.append(session_id)
+        self._dispatch(loop)
+        return await future
+
+    def _pop(self, session_id):
+        queue = self.queues[session_id]
+        entry = queue.popleft()
+        if queue:
+            self.ready.append(session_id)   # back of the line: round-robin
+        else:
+            del self.queues[session_id]
+        return entry
+
+    def _dispatch(self, loop):
+        while self.running < self.max_workers and self.ready:
+            fn, args, kwargs, future, batched = self._pop(self.ready.popleft())
+
+            if future.cancelled():
+                self.pending -= 1
+                continue
+
+            self.running += 1
+            if batched:
+                jobs = [(args[0], future)] + self._take_batch(fn, self.max_batch - 1)
+                job = self.executor.submit(fn, [item for item, _ in jobs])
+                job.add_done_callback(
+                    lambda job, jobs=jobs: loop.call_soon_threadsafe(self._batch_finished, loop, job, jobs)
+                )
+                continue
+
+            job = self.executor.submit(fn, *args, **kwargs)
+            job.add_done_callback(
+                lambda job, future=future: loop.call_soon_threadsafe(self._finished, loop, job, future)
+            )
+
+    def _take_batch(self, fn, limit):
+        """Pulls waiting run_batch jobs for the same fn off the head of other sessions' queues."""
+        taken = []
+        for session_id in list(self.ready):
+            if len(taken) >= limit:
+                break
+            head = self.queues[session_id][0]
+            if head[0] is not fn or not head[4]:
+                continue
+            self.ready.remove(session_id)
+            _, args, _, future, _ = self._pop(session_id)
+            if future.cancelled():
+                self.pending -= 1
+                continue
+            taken.append((args[0], future))
+        return taken
+
+    def _finished(self, loop, job, future):
+        self.running -= 1
+        self.pending -= 1
+        if not future.cancelled():
+            error = job.exception()
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(job.result())
+        self._dispatch(loop)
+
+    def _batch_finished(self, loop, job, jobs):
+        self.running -= 1
+        self.pending -= len(jobs)
+        error = job.exception()
+        results = job.result() if error is None else [None] * len(jobs)
+        for (_, future), result in zip(jobs, results):
+            if future.cancelled():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        self._dispatch(loop)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+scheduler = InferenceScheduler()
@@ -1,54 +1,167 @@
 import os
-import json
 import base64
-from fastapi import FastAPI, Request, UploadFile, File, Body
-from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Body, WebSocket
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
-from openai import OpenAI
-from fill_pdf_logic import fill_pdf
+from app_resources import resources
+from worker_drain import drain
+from pdf_jobs import pdf_jobs, PdfQueueFull
+from session_store import store
+import realtime_relay
+import stream_audio_ws_handler
+from stream_audio_ws_handler import handle_audio_stream
+from tts_cache import tts_cache
+import whisper_registry
+import pipeline_metrics
+from pipeline_metrics import timed
+from field_extractor import extractor
+from form_progress import progress as form_progress
+from inference_scheduler import scheduler
+from streaming_tts import stream_reply_audio, synthesize_pcm, iter_text, PCM_SAMPLE_RATE
 
-app = FastAPI()
+# Warm-ups /readyz waits for (clients, tts, whisper, pdf); empty = ready as soon as startup returns
+READY_REQUIRES = [c.strip() for c in os.getenv("READY_REQUIRES", "").split(",") if c.strip()]
+
+async def prewarm_tts():
+    await resources.warm_up()
+    await tts_cache.prewarm(resources.openai)
+
+@asynccontextmanager
+async def lifespan(app):
+    # Only cheap work before yield: the app serves requests as soon as it returns. The configured
+    # TTS phrases (if any), the OpenAI clients, the Whisper model and the PDF workers warm up in
+    # the background.
+    warmups = [asyncio.create_task(prewarm_tts())]
+    whisper_registry.warm_up_in_background()
+    pdf_jobs.warm_up()
+    yield
+    for task in warmups:
+        task.cancel()
+    pdf_jobs.shutdown()
+    await resources.close()
+
+app = FastAPI(lifespan=lifespan)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
 class ConfirmRequest(BaseModel):
+    session_id: str
     confirmed: bool
+    wait: float = 0  # seconds to hold the request for the render to finish, up to MAX_WAIT_S; 0 returns at once
+
+PDF_CHUNK_BYTES = 64 * 1024
+MAX_WAIT_S = 30  # longest a /confirm or /confirm/status request is held open
 
 @app.get("/", response_class=HTMLResponse)
 async def index(request: Request):
-    return templates.TemplateResponse("index.html", {
-        "request": request,
-        "AZURE_API_KEY": os.getenv("AZURE_API_KEY")
-    })
+    return templates.TemplateResponse(request, "index.html")
+
+@app.get("/healthz")
+async def healthz():
+    # Liveness: the process is up and its event loop is responsive
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    # Readiness: not draining, the session store answers and the warm-ups named in READY_REQUIRES are done
+    components = {
+        "clients": resources.ready,
+        "tts": tts_cache.prewarmed,
+        "whisper": whisper_registry.stats()["loaded"],
+        "pdf": pdf_jobs.ready,
+    }
+    try:
+        await store.aexists("readyz")
+        components["store"] = True
+    except Exception:
+        components["store"] = False
+    ready = not drain.draining and components["store"] and all(components.get(n, False) for n in READY_REQUIRES)
+    return JSONResponse(content={"ready": ready, "draining": drain.draining, "requires": READY_REQUIRES,
+                                 "components": components},
+                        status_code=200 if ready else 503)
+
+@app.post("/sessions")
+async def create_session():
+    return {"session_id": await store.acreate()}
 
 @app.get("/form-data")
-async def get_form_data():
-    if os.path.exists("filled_form.json"):
-        with open("filled_form.json", "r", encoding="utf-8") as f:
-            raw_data = json.load(f)
-        filtered_data = {
-            k: v for k, v in raw_data.items()
-            if v is not None and v.strip().lower() != "null"
-        }
-        return JSONResponse(content=filtered_data)
-    return JSONResponse(content={}, status_code=404)
+async def get_form_data(session_id: str):
+    if not await store.aexists(session_id):
+        return JSONResponse(content={}, status_code=404)
+    raw_data = (await store.aload(session_id))["form_data"]
+    filtered_data = {
+        k: v for k, v in raw_data.items()
+        if v is not None and str(v).strip().lower() != "null"
+    }
+    return JSONResponse(content=filtered_data)
+
+@app.get("/form-progress")
+async def get_form_progress(session_id: str):
+    # Per-field status and stage of the deterministic completion tracker (form_progress.py)
+    if not await store.aexists(session_id):
+        return JSONResponse(content={}, status_code=404)
+    return form_progress.summary(await store.aload(session_id))
 
 @app.post("/confirm")
 async def confirm_form(request: ConfirmRequest):
-    if request.confirmed:
-        with open("filled_form.json", "r", encoding="utf-8") as f:
-            field_values = json.load(f)
-        input_pdf = "form_template.pdf"
-        output_pdf = "output_filled.pdf"
-        fill_pdf(input_pdf, output_pdf, field_values)
-        return {"status": "filled", "download_url": "/download"}
-    return {"status": "cancelled"}
+    if not await store.aexists(request.session_id):
+        return JSONResponse(content={"error": "Unknown session"}, status_code=404)
+    if not request.confirmed:
+        return {"status": "cancelled"}
+
+    # Rendering happens on the PDF worker pool; poll /confirm/status or pass wait
+    state = await store.aload(request.session_id)
+    progress = state.get("progress") or {}
+    job_id = progress.get("pdf_job") if progress.get("stage") == "confirmed" else None
+    if job_id is None or (await pdf_jobs.status(job_id) or {}).get("status") in (None, "failed"):
+        # Not already queued by the completion tracker when the user confirmed by voice
+        try:
+            job_id = await pdf_jobs.submit(request.session_id, state["form_data"])
+        except PdfQueueFull:
+            return JSONResponse(content={"error": "PDF renderer busy, try again shortly"}, status_code=503)
+    wait = min(request.wait, MAX_WAIT_S)
+    job = await pdf_jobs.wait(job_id, wait) if wait else await pdf_jobs.status(job_id)
+    return {
+        "status": "filled" if job["status"] == "done" else job["status"],
+        "job_id": job_id,
+        "status_url": f"/confirm/status?job_id={job_id}",
+        "download_url": f"/download?session_id={request.session_id}"
+    }
+
+@app.get("/confirm/status")
+async def confirm_status(job_id: str, wait: float = 0):
+    # wait > 0 long-polls: the response comes back as soon as the render finishes
+    job = await pdf_jobs.wait(job_id, min(wait, MAX_WAIT_S)) if wait else await pdf_jobs.status(job_id)
+    if job is None:
+        return JSONResponse(content={"error": "Unknown job"}, status_code=404)
+    return job
 
 @app.get("/download")
-async def download_pdf():
-    return FileResponse("output_filled.pdf", media_type="application/pdf", filename="Merchant_Form_Filled.pdf")
+async def download_pdf(session_id: str):
+    job = await pdf_jobs.latest_for(session_id)
+    if job and job["status"] in ("queued", "rendering"):
+        return JSONResponse(content={"status": job["status"], "job_id": job["job_id"]}, status_code=202)
+    pdf_bytes = await store.aload_pdf(session_id)
+    if pdf_bytes is None:
+        return JSONResponse(content={"error": "No filled PDF for this session"}, status_code=404)
+
+    async def chunks():
+        view = memoryview(pdf_bytes)
+        for start in range(0, len(view), PDF_CHUNK_BYTES):
+            yield bytes(view[start:start + PDF_CHUNK_BYTES])
+
+    return StreamingResponse(
+        chunks(),
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": 'attachment; filename="Merchant_Form_Filled.pdf"',
+            "Content-Length": str(len(pdf_bytes))
+        }
+    )
 
 @app.post("/tts")
 async def tts_endpoint(payload: dict = Body(...)):
@@ -57,15 +170,67 @@ async def tts_endpoint(payload: dict = Body(...)):
         if not text:
             return JSONResponse(content={"error": "No text provided"}, status_code=400)
 
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        speech = client.audio.speech.create(
-            model="tts-1",
-            voice="nova",
-            input=text,
-            response_format="wav"
-        )
-        audio_bytes = speech.content
-        b64_audio = base64.b64encode(audio_bytes).decode("utf-8")
+        with timed("http_tts"):
+            audio_bytes = await tts_cache.asynthesize(resources.openai, text, response_format="wav")
+        with timed("http_base64"):
+            b64_audio = base64.b64encode(audio_bytes).decode("utf-8")
         return {"audio_b64": b64_audio}
     except Exception as e:
         return JSONResponse(content={"error": str(e)}, status_code=500)
+
+@app.get("/whisper-stats")
+async def whisper_stats():
+    return whisper_registry.stats()
+
+@app.get("/tts/cache-stats")
+async def tts_cache_stats():
+    return tts_cache.stats()
+
+@app.post("/tts/stream")
+async def tts_stream_endpoint(payload: dict = Body(...)):
+    # Sentence-chunked synthesis: raw PCM16 bytes are streamed as each sentence is ready
+    text = payload.get("text", "")
+    if not text:
+        return JSONResponse(content={"error": "No text provided"}, status_code=400)
+
+    async def pcm_chunks():
+        audio_stream = stream_reply_audio(iter_text(text), lambda s: synthesize_pcm(resources.openai, s))
+        async for _, audio in audio_stream:
+            yield audio
+
+    return StreamingResponse(
+        pcm_chunks(),
+        media_type="audio/pcm",
+        headers={"X-Sample-Rate": str(PCM_SAMPLE_RATE)}
+    )
+
+@app.websocket("/ws/audio")
+async def audio_stream_endpoint(websocket: WebSocket):
+    await handle_audio_stream(websocket)
+
+@app.websocket("/ws/realtime")
+async def realtime_relay_endpoint(websocket: WebSocket):
+    await realtime_relay.handle_relay(websocket)
+
+@app.get("/relay/stats")
+async def relay_stats():
+    return realtime_relay.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    # Prometheus text format: stage latency quantiles plus the existing per-component stats
+    return pipeline_metrics.render_prometheus({
+        "audio_ws": stream_audio_ws_handler.turn_stats,
+        "speculation": stream_audio_ws_handler.speculation_stats,
+        "tts_cache": tts_cache.stats(),
+        "whisper": whisper_registry.stats(),
+        "relay": realtime_relay.stats()["totals"],
+        "extractor": extractor.stats,
+        "form_progress": form_progress.stats,
+        "inference": {"running": scheduler.running, "pending": scheduler.pending},
+        "drain": drain.stats(),
+    })
+
+@app.get("/metrics/summary")
+async def metrics_summary():
+    return pipeline_metrics.snapshot()
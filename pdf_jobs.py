@@ -0,0 +1,173 @@
+# pdf_jobs.py (background PDF rendering on a bounded process pool, tracked by job id)
+
+import os
+import time
+import uuid
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from session_store import store
+from pipeline_metrics import observe
+from worker_drain import drain
+
+PDF_TEMPLATE = "form_template.pdf"
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(max(1, min(2, (os.cpu_count() or 1))))))
+PDF_MAX_PENDING = int(os.getenv("PDF_MAX_PENDING", str(PDF_WORKERS * 8)))
+JOB_TTL = float(os.getenv("PDF_JOB_TTL", "3600"))
+POLL_INTERVAL = 0.2   # wait() on a job rendering in another worker polls the shared store
+
+
+def load_in_worker(template):
+    # PyMuPDF is only ever imported in the worker processes, never by the app itself
+    from fill_pdf_logic import load_template
+    return load_template(template)
+
+
+def render_in_worker(template, form_data):
+    from fill_pdf_logic import fill_pdf_bytes
+    return fill_pdf_bytes(template, form_data)
+
+
+class PdfQueueFull(Exception):
+    """Raised when more renders are queued than PDF_MAX_PENDING allows."""
+
+
+class PdfJobQueue:
+    """
+    Renders filled PDFs off the event loop. PyMuPDF holds the GIL while it
+    lays out and deflates the document, so renders run in worker processes
+    (each loads the template and field index once), at most PDF_WORKERS at a
+    time. Results and job records go to the session store, so with a shared
+    backend any worker can report on a job or serve its PDF; callers poll
+    status() or await wait() with the job id.
+    """
+
+    def __init__(self, template=PDF_TEMPLATE, max_workers=PDF_WORKERS, max_pending=PDF_MAX_PENDING,
+                 session_store=store):
+        self.template = template
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.store = session_store
+        self.executor = None
+        self.warming = []
+        self.jobs = {}
+        self.tasks = {}
+        self.latest = {}     # session_id -> most recent job_id
+
+    def _pool(self):
+        if self.executor is None:
+            # spawn, not fork: the app process already runs several threads
+            self.executor = ProcessPoolExecutor(
+                self.max_workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=load_in_worker, initargs=(self.template,)
+            )
+        return self.executor
+
+    def warm_up(self):
+        """Starts the worker processes so the first render does not pay for spawning them."""
+        pool = self._pool()
+        self.warming = [pool.submit(load_in_worker, self.template) for _ in range(self.max_workers)]
+
+    @property
+    def ready(self):
+        """True once the warm-up renders' workers are up with the template loaded."""
+        return bool(self.warming) and all(f.done() and not f.exception() for f in self.warming)
+
+    @property
+    def pending(self):
+        return sum(job["status"] in ("queued", "rendering") for job in self.jobs.values())
+
+    async def submit(self, session_id, form_data):
+        self._expire()
+        if self.pending >= self.max_pending:
+            raise PdfQueueFull(f"{self.pending} PDF renders already queued")
+        job_id = uuid.uuid4().hex
+        self.jobs[job_id] = {
+            "job_id": job_id,
+            "session_id": session_id,
+            "status": "queued",
+            "created": time.time(),
+            "finished": None,
+            "render_ms": None,
+            "error": None,
+        }
+        self.latest[session_id] = job_id
+        await self.store.asave_job(self.jobs[job_id])
+        self.tasks[job_id] = asyncio.ensure_future(self._render(job_id, session_id, form_data))
+        return job_id
+
+    async def _render(self, job_id, session_id, form_data):
+        job = self.jobs[job_id]
+        loop = asyncio.get_running_loop()
+        pool = None
+        with drain.turn():
+            try:
+                job["status"] = "rendering"
+                await self.store.asave_job(job)
+                start = time.perf_counter()
+                pool = self._pool()
+                pdf_bytes = await loop.run_in_executor(pool, render_in_worker, self.template, form_data)
+                job["render_ms"] = round((time.perf_counter() - start) * 1000, 1)
+                observe("pdf_render", time.perf_counter() - start)
+                await self.store.asave_pdf(session_id, pdf_bytes)
+                job["status"] = "done"
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool) and self.executor is pool:
+                    # A worker died: reap the broken pool and start a fresh one for the next job.
+                    # Other jobs failing on the same pool find it already replaced.
+                    self.executor = None
+                    pool.shutdown(wait=False, cancel_futures=True)
+                print("❌ PDF render failed:", e)
+                job["status"], job["error"] = "failed", str(e)
+            finally:
+                job["finished"] = time.time()
+                self.tasks.pop(job_id, None)
+                try:
+                    await self.store.asave_job(job)
+                except Exception as e:
+                    print("❌ PDF job record not saved:", e)
+
+    async def status(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return dict(job)
+        return await self.store.aload_job(job_id) if job_id else None
+
+    async def latest_for(self, session_id):
+        if session_id in self.latest:
+            return await self.status(self.latest[session_id])
+        return await self.store.alatest_job(session_id)
+
+    async def wait(self, job_id, timeout=None):
+        """Waits up to timeout seconds for the job to finish and returns its status."""
+        task = self.tasks.get(job_id)
+        if task is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(task), timeout)
+            except asyncio.TimeoutError:
+                pass
+            return await self.status(job_id)
+        # Rendering in another worker (or already finished)
+        deadline = time.monotonic() + (timeout or 0)
+        job = await self.status(job_id)
+        while job and job["status"] in ("queued", "rendering") and time.monotonic() < deadline:
+            await asyncio.sleep(POLL_INTERVAL)
+            job = await self.status(job_id)
+        return job
+
+    def _expire(self):
+        cutoff = time.time() - JOB_TTL
+        for job_id, job in list(self.jobs.items()):
+            if job["finished"] and job["finished"] < cutoff:
+                del self.jobs[job_id]
+                if self.latest.get(job["session_id"]) == job_id:
+                    del self.latest[job["session_id"]]
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+pdf_jobs = PdfJobQueue()
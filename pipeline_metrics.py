@@ -0,0 +1,241 @@
+# pipeline_metrics.py (per-turn stage tracing, latency quantiles and Prometheus export)
+#
+# Each user turn gets a TurnTrace with a session/turn id. Stages are timed with
+#
+#   trace = start_turn(session_id)
+#   with trace.span("transcribe"):
+#       ...
+#   trace.mark("first_audio")       # time since the turn started
+#   trace.finish()
+#
+# and every observation lands in a per-stage window exported on /metrics as a
+# Prometheus summary (p50/p95/p99 + sum + count). Only METRICS_SAMPLE_RATE of
+# turns are traced; the rest get a no-op trace so the hot path stays cheap.
+
+import os
+import json
+import time
+import uuid
+import random
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+METRICS_SAMPLE_RATE = float(os.getenv("METRICS_SAMPLE_RATE", "1.0"))
+METRICS_WINDOW = int(os.getenv("METRICS_WINDOW", "2048"))   # observations kept per stage for quantiles
+LOG_JSON = os.getenv("LOG_JSON", "0") == "1"
+QUANTILES = (0.5, 0.95, 0.99)
+PREFIX = "voice"
+
+
+def log(event, message, **fields):
+    """Prints message, or one JSON object per line when LOG_JSON=1."""
+    if LOG_JSON:
+        print(json.dumps({"ts": round(time.time(), 3), "event": event, "message": message, **fields},
+                         default=str, ensure_ascii=False), flush=True)
+    else:
+        print(message)
+
+
+class StageStats:
+    """Running count/sum for one stage plus a bounded window of recent values for quantiles."""
+
+    def __init__(self, window=METRICS_WINDOW):
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+
+    def quantiles(self):
+        values = sorted(self.recent)
+        if not values:
+            return {q: None for q in QUANTILES}
+        return {q: values[min(len(values) - 1, int(q * len(values)))] for q in QUANTILES}
+
+
+class Registry:
+    def __init__(self):
+        self.stages = {}
+        self.counters = {"turns_started": 0, "turns_sampled": 0, "turns_finished": 0}
+        self.lock = threading.Lock()   # whisper and PDF stages are observed from worker threads
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            stats = self.stages.get(stage)
+            if stats is None:
+                stats = self.stages[stage] = StageStats()
+            stats.observe(seconds)
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self):
+        with self.lock:
+            stages = {name: (s.count, s.total, s.quantiles()) for name, s in self.stages.items()}
+            counters = dict(self.counters)
+        return {
+            "counters": counters,
+            "stages": {
+                name: {
+                    "count": count,
+                    "mean_ms": round(total / count * 1000, 2) if count else None,
+                    **{f"p{int(q * 100)}_ms": round(v * 1000, 2) if v is not None else None
+                       for q, v in quantiles.items()},
+                }
+                for name, (count, total, quantiles) in sorted(stages.items())
+            },
+        }
+
+
+registry = Registry()
+
+
+def observe(stage, seconds):
+    registry.observe(stage, seconds)
+
+
+@contextmanager
+def timed(stage):
+    """Times a block outside any turn (model load, PDF fill, HTTP TTS)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start)
+
+
+class TurnTrace:
+    """Stage spans for one user turn, logged as a single record when the turn finishes."""
+
+    sampled = True
+
+    def __init__(self, session_id, turn_id=None):
+        self.session_id = session_id
+        self.turn_id = turn_id or uuid.uuid4().hex[:12]
+        self.started = time.perf_counter()
+        self.spans = {}
+        self.finished = False
+
+    @contextmanager
+    def span(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def add(self, stage, seconds):
+        # Stages that repeat within a turn (per-sentence TTS, sends) accumulate in the log record.
+        self.spans[stage] = self.spans.get(stage, 0.0) + seconds
+        observe(stage, seconds)
+
+    def mark(self, stage):
+        """Records the time from turn start to now, once per turn (e.g. first_audio)."""
+        if stage not in self.spans:
+            self.add(stage, time.perf_counter() - self.started)
+
+    def finish(self, status="ok"):
+        if self.finished:
+            return
+        self.finished = True
+        total = time.perf_counter() - self.started
+        observe("turn_total", total)
+        registry.count("turns_finished")
+        log("turn", f"⏱ Turn {self.turn_id} ({status}): {total * 1000:.0f} ms "
+                    + " ".join(f"{k}={v * 1000:.0f}" for k, v in self.spans.items()),
+            session_id=self.session_id, turn_id=self.turn_id, status=status,
+            total_ms=round(total * 1000, 1),
+            spans_ms={k: round(v * 1000, 1) for k, v in self.spans.items()})
+
+
+class NullTrace:
+    """Stand-in for unsampled turns: same interface, records nothing."""
+
+    sampled = False
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.turn_id = None
+
+    @contextmanager
+    def span(self, stage):
+        yield
+
+    def add(self, stage, seconds):
+        pass
+
+    def mark(self, stage):
+        pass
+
+    def finish(self, status="ok"):
+        pass
+
+
+def start_turn(session_id):
+    registry.count("turns_started")
+    if METRICS_SAMPLE_RATE < 1.0 and random.random() >= METRICS_SAMPLE_RATE:
+        return NullTrace(session_id)
+    registry.count("turns_sampled")
+    return TurnTrace(session_id)
+
+
+async def watch_deltas(trace, deltas):
+    """Passes LLM text deltas through, marking time-to-first-delta and generation end."""
+    first = True
+    async for delta in deltas:
+        if first:
+            trace.mark("llm_first_delta")
+            first = False
+        yield delta
+    trace.mark("llm_done")
+
+
+def _metric_name(*parts):
+    return "_".join(p.replace(".", "_").replace("-", "_") for p in (PREFIX,) + parts if p)
+
+
+def _flatten(prefix, stats):
+    for key, value in stats.items():
+        if isinstance(value, bool):
+            yield _metric_name(prefix, key), int(value)
+        elif isinstance(value, (int, float)):
+            yield _metric_name(prefix, key), value
+        elif isinstance(value, dict):
+            yield from _flatten(f"{prefix}_{key}", value)
+
+
+def render_prometheus(collectors=None):
+    """
+    Prometheus text exposition: stage latency summaries, turn counters and the
+    numeric fields of every stats dict in collectors ({name: stats_dict}).
+    """
+    with registry.lock:
+        stages = {name: (s.count, s.total, s.quantiles()) for name, s in registry.stages.items()}
+        counters = dict(registry.counters)
+
+    name = _metric_name("stage_seconds")
+    lines = [f"# HELP {name} Voice pipeline stage latency in seconds.", f"# TYPE {name} summary"]
+    for stage, (count, total, quantiles) in sorted(stages.items()):
+        for q, v in quantiles.items():
+            if v is not None:
+                lines.append(f'{name}{{stage="{stage}",quantile="{q}"}} {v:.6f}')
+        lines.append(f'{name}_sum{{stage="{stage}"}} {total:.6f}')
+        lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+
+    for key, value in sorted(counters.items()):
+        metric = _metric_name(key, "total")
+        lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+
+    for prefix, stats in (collectors or {}).items():
+        for metric, value in _flatten(prefix, stats):
+            lines += [f"# TYPE {metric} gauge", f"{metric} {value}"]
+    return "\n".join(lines) + "\n"
+
+
+def snapshot():
+    return registry.snapshot()
@@ -0,0 +1,286 @@
+# realtime_relay.py (browser <-> upstream realtime relay with binary audio framing)
+#
+# The browser talks only to this server. Binary WebSocket frames carry raw
+# PCM16 audio in both directions; JSON text frames carry control events.
+#
+#   browser -> relay   binary: PCM16 mic audio at 24 kHz (the realtime pcm16 input format)
+#                      text:   {"type": "conversation.item.create" | "response.create" | ...}
+#   relay -> browser   binary: PCM16 reply audio at 24 kHz (response.audio.delta, decoded)
+#                      text:   every other upstream event, plus relay.ready (with "fresh": true when
+#                              the conversation has not started, so the browser greets only then) and
+#                              {"type": "relay.say", "text"}: assistant text the model did not
+#                              generate (the form read-back and the answers to it), for the
+#                              browser to speak with /tts/stream
+#
+# User transcripts go to form_progress.answer and, when it does not settle
+# them, to the field extractor. While the read-back awaits a yes or no the
+# model's automatic reply is switched off, so only the tracker answers.
+
+import os
+import json
+import time
+import uuid
+import base64
+import asyncio
+from collections import deque
+from starlette.websockets import WebSocket, WebSocketDisconnect
+from realtime_session_pool import RealtimeSessionPool
+from pipeline_metrics import observe
+from worker_drain import drain
+from session_store import store
+from field_extractor import extractor
+from form_progress import progress as form_progress
+
+RELAY_SESSION_CONFIG = {
+    "modalities": os.getenv("RELAY_MODALITIES", "text").split(","),
+    "instructions": "You are a helpful form-filling assistant. Ask questions one by one and extract values.",
+    "input_audio_format": "pcm16",
+    "output_audio_format": "pcm16",
+    "input_audio_transcription": {"model": "whisper-1"},
+    "turn_detection": {"type": "server_vad"},
+}
+OUTPUT_SAMPLE_RATE = 24000
+
+# Control events the browser may send upstream; everything else is dropped.
+CLIENT_EVENTS = {
+    "conversation.item.create",
+    "response.create",
+    "response.cancel",
+    "input_audio_buffer.commit",
+    "input_audio_buffer.clear",
+}
+TURN_START_EVENTS = {"input_audio_buffer.speech_stopped", "input_audio_buffer.committed"}
+FIRST_OUTPUT_EVENTS = {"response.audio.delta", "response.text.delta", "response.audio_transcript.delta"}
+
+relay_pool = RealtimeSessionPool(session_config=RELAY_SESSION_CONFIG)
+relay_sessions = {}
+relay_totals = {"sessions": 0, "bytes_in": 0, "bytes_out": 0, "frames_in": 0, "frames_out": 0}
+
+
+class RelayStats:
+    """Per-session traffic counters and end-of-speech -> first-output round trips."""
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.started = time.time()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.frames_in = 0
+        self.frames_out = 0
+        self.upstream_bytes_out = 0
+        self.upstream_bytes_in = 0
+        self.round_trips = deque(maxlen=200)
+        self._turn_started = None
+        self.holds_lock = False
+
+    def turn_started(self):
+        if self._turn_started is None:
+            self._turn_started = time.perf_counter()
+
+    def output_seen(self):
+        if self._turn_started is not None:
+            rtt = time.perf_counter() - self._turn_started
+            self.round_trips.append(rtt)
+            observe("relay_first_output", rtt)
+            self._turn_started = None
+
+    def snapshot(self):
+        rtts = sorted(self.round_trips)
+        return {
+            "session_id": self.session_id,
+            "seconds": round(time.time() - self.started, 1),
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "frames_in": self.frames_in,
+            "frames_out": self.frames_out,
+            "upstream_bytes_in": self.upstream_bytes_in,
+            "upstream_bytes_out": self.upstream_bytes_out,
+            "turns": len(rtts),
+            "rtt_p50_ms": round(rtts[len(rtts) // 2] * 1000, 1) if rtts else None,
+            "rtt_last_ms": round(self.round_trips[-1] * 1000, 1) if rtts else None,
+        }
+
+
+async def _send_upstream(session, stats, event):
+    payload = json.dumps(event)
+    stats.upstream_bytes_out += len(payload)
+    session.last_used = time.monotonic()
+    await session.ws.send(payload)
+
+
+async def _set_auto_response(session, stats, enabled):
+    await _send_upstream(session, stats, {"type": "session.update", "session": {
+        "turn_detection": {**RELAY_SESSION_CONFIG["turn_detection"], "create_response": enabled}
+    }})
+
+
+async def _say(websocket: WebSocket, session, stats, text):
+    """Adds text the model did not generate to the conversation and has the browser speak it."""
+    session.history.append(("assistant", text))
+    await _send_upstream(session, stats, session._message_item("assistant", text))
+    await store.aadd_message(stats.session_id, "assistant", text)
+    payload = json.dumps({"type": "relay.say", "text": text})
+    await websocket.send_text(payload)
+    stats.bytes_out += len(payload)
+    stats.frames_out += 1
+
+
+async def _user_said(websocket: WebSocket, session, stats, text):
+    session.history.append(("user", text))
+    state = await store.aadd_message(stats.session_id, "user", text)
+    answer = await form_progress.answer(stats.session_id, text)
+    if answer is None:
+        # Answers the assistant's last question; extracted in the background
+        extractor.submit(stats.session_id, text, state["last_assistant_msg"])
+        return
+    if (await store.aload(stats.session_id))["progress"]["stage"] != "reading_back":
+        await _set_auto_response(session, stats, True)
+    await _say(websocket, session, stats, answer)
+
+
+async def _pump_browser(websocket: WebSocket, session, stats):
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+
+        if message.get("bytes") is not None:
+            pcm = message["bytes"]
+            stats.frames_in += 1
+            stats.bytes_in += len(pcm)
+            await _send_upstream(session, stats, {
+                "type": "input_audio_buffer.append",
+                "audio": base64.b64encode(pcm).decode("ascii")
+            })
+
+        elif message.get("text") is not None:
+            stats.frames_in += 1
+            stats.bytes_in += len(message["text"])
+            event = json.loads(message["text"])
+            if event.get("type") not in CLIENT_EVENTS:
+                continue
+            if event["type"] == "conversation.item.create" and event.get("item", {}).get("role") == "user":
+                text = " ".join(c.get("text", "") for c in event["item"].get("content", []) if c.get("text"))
+                if text:
+                    session.history.append(("user", text))
+                    await store.aadd_message(stats.session_id, "user", text)
+            if event["type"] in ("response.create", "input_audio_buffer.commit"):
+                stats.turn_started()
+            event["event_id"] = str(uuid.uuid4())
+            await _send_upstream(session, stats, event)
+
+
+async def _pump_upstream(websocket: WebSocket, session, stats):
+    async for message in session.ws:
+        stats.upstream_bytes_in += len(message)
+        session.last_used = time.monotonic()
+        data = json.loads(message)
+        event_type = data.get("type")
+
+        # The session lock is held per response, like RealtimeSession.ask_stream turns
+        if event_type == "response.created" and not stats.holds_lock:
+            await session.lock.acquire()
+            stats.holds_lock = True
+        elif event_type == "response.done" and stats.holds_lock:
+            session.lock.release()
+            stats.holds_lock = False
+
+        if event_type in TURN_START_EVENTS:
+            stats.turn_started()
+        elif event_type in FIRST_OUTPUT_EVENTS:
+            stats.output_seen()
+
+        if event_type == "conversation.item.input_audio_transcription.completed" and data.get("transcript", "").strip():
+            await _user_said(websocket, session, stats, data["transcript"].strip())
+        elif event_type in ("response.text.done", "response.audio_transcript.done"):
+            text = data.get("text") or data.get("transcript") or ""
+            session.history.append(("assistant", text))
+            await store.aadd_message(stats.session_id, "assistant", text)
+
+        if event_type == "response.audio.delta":
+            pcm = base64.b64decode(data.get("delta", ""))
+            await websocket.send_bytes(pcm)
+            stats.bytes_out += len(pcm)
+        else:
+            await websocket.send_text(message)
+            stats.bytes_out += len(message)
+        stats.frames_out += 1
+
+
+async def handle_relay(websocket: WebSocket):
+    await websocket.accept()
+    if drain.draining:
+        await websocket.close(code=1013)  # try again later: reconnect lands on another worker
+        return
+    session_id = websocket.query_params.get("session_id") or str(uuid.uuid4())
+    connection_id = str(uuid.uuid4())
+    stats = relay_sessions[connection_id] = RelayStats(session_id)
+    relay_totals["sessions"] += 1
+    print("🔀 Relay client connected:", session_id)
+
+    # The upstream connection stays in the pool after the browser leaves, so a
+    # reconnecting tab resumes the same conversation without a new handshake.
+    session = await relay_pool.acquire(session_id)
+
+    async def speak(text):
+        # The read-back, from the extraction pass: the tracker, not the model, takes the answer
+        await _set_auto_response(session, stats, False)
+        await _say(websocket, session, stats, text)
+
+    session.clients += 1   # keeps the pool from closing the socket under this connection
+    try:
+        async with session.lock:
+            if session.ws is None:
+                await session.connect()
+        state = await store.aload(session_id)
+        if state["progress"]["stage"] == "reading_back":
+            await _set_auto_response(session, stats, False)
+        form_progress.speakers[session_id] = speak
+        form_progress.speech_formats[session_id] = "stream"   # the browser speaks relay.say via /tts/stream
+        await websocket.send_text(json.dumps({
+            "type": "relay.ready",
+            "session_id": session_id,
+            "fresh": not session.history and not state["conversation_history"],
+            "audio_output": "audio" in RELAY_SESSION_CONFIG["modalities"],
+            "sample_rate": OUTPUT_SAMPLE_RATE
+        }))
+
+        browser = asyncio.create_task(_pump_browser(websocket, session, stats))
+        upstream = asyncio.create_task(_pump_upstream(websocket, session, stats))
+        done, pending = await asyncio.wait({browser, upstream}, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        for task in done:
+            if task.exception() and not isinstance(task.exception(), WebSocketDisconnect):
+                raise task.exception()
+        if upstream in done:
+            raise ConnectionError("upstream realtime connection closed")
+    except Exception as e:
+        print("❌ Relay error:", e)
+        await relay_pool.release(session_id)  # drop a broken upstream; the next connect replays the history
+        try:
+            await websocket.close(code=1011)
+        except Exception:
+            pass
+    finally:
+        if stats.holds_lock:
+            session.lock.release()   # left mid-response
+        session.clients -= 1
+        if form_progress.speakers.get(session_id) is speak:
+            del form_progress.speakers[session_id]
+            form_progress.speech_formats.pop(session_id, None)
+        snapshot = relay_sessions.pop(connection_id).snapshot()
+        for key in ("bytes_in", "bytes_out", "frames_in", "frames_out"):
+            relay_totals[key] += snapshot[key]
+        print("🔀 Relay closed:", session_id, snapshot)
+
+
+def stats():
+    return {
+        "totals": relay_totals,
+        "active": [s.snapshot() for s in relay_sessions.values()],
+    }
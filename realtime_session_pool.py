@@ -0,0 +1,308 @@
+# realtime_session_pool.py (long-lived Azure GPT-4o realtime sessions, one per conversation)
+
+import os
+import json
+import uuid
+import time
+import asyncio
+from collections import OrderedDict
+import websockets
+
+# -------------------------------
+# Configuration
+# -------------------------------
+AZURE_WS_URI = os.getenv("AZURE_WS_URI") or (
+    f"wss://{os.getenv('AZURE_HOST')}/openai/realtime"
+    f"?api-version=2024-10-01-preview"
+    f"&deployment=gpt-4o-mini-realtime-preview"
+    f"&api-key={os.getenv('AZURE_API_KEY')}"
+)
+
+MAX_SESSIONS = int(os.getenv("REALTIME_MAX_SESSIONS", "32"))
+IDLE_TIMEOUT = float(os.getenv("REALTIME_IDLE_TIMEOUT", "300"))
+# How long a closed session's history is kept for a reconnect to replay
+HISTORY_TTL = float(os.getenv("REALTIME_HISTORY_TTL", os.getenv("SESSION_TTL", "3600")))
+PING_INTERVAL = float(os.getenv("REALTIME_PING_INTERVAL", "20"))
+CONNECT_RETRIES = 4
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+CANCEL_DRAIN_TIMEOUT = 2.0
+
+DEFAULT_SESSION_CONFIG = {"modalities": ["text"], "tool_choice": "auto"}
+
+
+class IncompleteResponse(RuntimeError):
+    """The model stopped before finishing (response.done with a status other than completed)."""
+
+
+class RealtimeSession:
+    """
+    One realtime WebSocket kept open for the lifetime of a conversation.
+    Keepalive is handled by websockets' ping/pong; on a dropped connection the
+    session reconnects with exponential backoff and replays the conversation so
+    the model keeps its context.
+    """
+
+    def __init__(self, uri, session_config=None):
+        self.uri = uri
+        self.session_config = session_config or DEFAULT_SESSION_CONFIG
+        self.ws = None
+        self.lock = asyncio.Lock()
+        self.history = []
+        self.last_turn_items = ()   # upstream item ids of the last completed turn
+        self.last_used = time.monotonic()
+        self.connects = 0
+        self.clients = 0   # live connections relaying through this socket; the pool leaves it open
+
+    async def send_event(self, event):
+        event["event_id"] = str(uuid.uuid4())
+        await self.ws.send(json.dumps(event))
+
+    async def connect(self):
+        delay = BACKOFF_BASE
+        for attempt in range(CONNECT_RETRIES + 1):
+            try:
+                self.ws = await websockets.connect(
+                    self.uri, ping_interval=PING_INTERVAL, ping_timeout=PING_INTERVAL
+                )
+                self.connects += 1
+                await self.send_event({"type": "session.update", "session": self.session_config})
+                for role, text in self.history:
+                    await self.send_event(self._message_item(role, text))
+                return
+            except (OSError, asyncio.TimeoutError, websockets.WebSocketException) as e:
+                self.ws = None
+                if attempt == CONNECT_RETRIES:
+                    raise
+                print(f"🔁 Realtime connect failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, BACKOFF_MAX)
+
+    @staticmethod
+    def _message_item(role, text, item_id=None):
+        content_type = "input_text" if role == "user" else "text"
+        item = {
+            "type": "message",
+            "role": role,
+            "content": [{"type": content_type, "text": text}]
+        }
+        if item_id:
+            item["id"] = item_id
+        return {"type": "conversation.item.create", "item": item}
+
+    async def ask_stream(self, user_text, retract_on_cancel=False):
+        """
+        Yields response.text.delta text as it arrives and returns at
+        response.done, so the next turn starts on a clean stream. A response
+        that ends any other way raises instead of being recorded as the reply.
+        The session lock is held until the generator is exhausted, so consume
+        it fully (or aclose it).
+        With retract_on_cancel (a bool, or a callable checked at cancel time),
+        a turn abandoned mid-response is removed from the upstream conversation
+        instead of kept, as speculative replies need.
+        """
+        async with self.lock:
+            self.last_used = time.monotonic()
+            reply = ""
+            user_item_id = "msg_" + uuid.uuid4().hex[:24]
+            reply_item_id = None
+            self.last_turn_items = ()
+            for attempt in range(2):
+                try:
+                    if self.ws is None:
+                        await self.connect()
+                    await self.send_event(self._message_item("user", user_text, user_item_id))
+                    await self.send_event({"type": "response.create"})
+
+                    async for message in self.ws:
+                        data = json.loads(message)
+                        if data.get("type") == "response.output_item.added":
+                            reply_item_id = data.get("item", {}).get("id")
+                        elif data.get("type") == "response.text.delta":
+                            delta = data.get("text", "")
+                            reply += delta
+                            yield delta
+                        elif data.get("type") == "response.done":
+                            status = data.get("response", {}).get("status", "completed")
+                            if status != "completed":
+                                raise IncompleteResponse(f"realtime response {status}")
+                            break
+                    else:
+                        # The server closed the connection cleanly mid-response
+                        raise websockets.ConnectionClosed(None, None)
+                    break
+                except websockets.ConnectionClosed:
+                    # Dropped before any output: reconnect once and replay the turn.
+                    self.ws = None
+                    if attempt or reply:
+                        raise
+                except (asyncio.CancelledError, GeneratorExit):
+                    # Consumer gave up mid-response (barge-in): stop generation upstream.
+                    if callable(retract_on_cancel):
+                        retract_on_cancel = retract_on_cancel()
+                    retract = [user_item_id, reply_item_id] if retract_on_cancel else []
+                    if not retract_on_cancel:
+                        self.history.append(("user", user_text))
+                        if reply:
+                            self.history.append(("assistant", reply))
+                    if self.ws is not None:
+                        asyncio.ensure_future(self._cancel_response(retract))
+                    raise
+            self.history.append(("user", user_text))
+            self.history.append(("assistant", reply))
+            self.last_turn_items = (user_item_id, reply_item_id)
+            self.last_used = time.monotonic()
+
+    async def add_message(self, role, text):
+        """
+        Adds a message the model did not produce (a templated read-back and
+        the answer to it) to the conversation, so later turns have the context.
+        """
+        async with self.lock:
+            self.history.append((role, text))
+            self.last_turn_items = ()
+            if self.ws is None:
+                return   # the next connect replays it
+            try:
+                await self.send_event(self._message_item(role, text))
+            except websockets.ConnectionClosed:
+                self.ws = None
+
+    async def retract_last_turn(self):
+        """Deletes the last completed turn, e.g. a speculative reply the user did not ask for after all."""
+        async with self.lock:
+            items, self.last_turn_items = self.last_turn_items, ()
+            if not items:
+                return
+            del self.history[-2:]
+            if self.ws is None:
+                return
+            try:
+                for item_id in items:
+                    if item_id:
+                        await self.send_event({"type": "conversation.item.delete", "item_id": item_id})
+            except Exception:
+                await self.close()   # the reconnect replays the trimmed history
+
+    async def _cancel_response(self, retract=()):
+        """
+        Sends response.cancel and drains the stream up to the end of the
+        cancelled response, so the next turn starts on a clean connection.
+        Conversation items listed in retract are then deleted. Runs under the
+        session lock, ahead of any later turn.
+        """
+        async with self.lock:
+            if self.ws is None:
+                return
+
+            async def drain():
+                async for message in self.ws:
+                    if json.loads(message).get("type") in ("response.done", "response.cancelled", "error"):
+                        return
+
+            try:
+                await self.send_event({"type": "response.cancel"})
+                await asyncio.wait_for(drain(), CANCEL_DRAIN_TIMEOUT)
+                for item_id in retract:
+                    if item_id:
+                        await self.send_event({"type": "conversation.item.delete", "item_id": item_id})
+            except Exception:
+                # Unknown stream state: reconnect (with history replay) on the next turn.
+                await self.close()
+
+    async def ask(self, user_text):
+        return "".join([delta async for delta in self.ask_stream(user_text)])
+
+    async def close(self):
+        if self.ws is not None:
+            try:
+                await self.ws.close()
+            except Exception:
+                pass
+            self.ws = None
+
+
+class RealtimeSessionPool:
+    """
+    Map of conversation id -> RealtimeSession with at most max_sessions open
+    connections. A connection idle for longer than idle_timeout is closed, as
+    is the least recently used idle one when the limit is reached; either way
+    the session keeps its history and the next turn reconnects and replays
+    it. Sessions unused for history_ttl are dropped.
+    """
+
+    def __init__(self, uri=AZURE_WS_URI, max_sessions=MAX_SESSIONS, idle_timeout=IDLE_TIMEOUT,
+                 session_config=None, history_ttl=HISTORY_TTL):
+        self.uri = uri
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.history_ttl = history_ttl
+        self.session_config = session_config
+        self.sessions = OrderedDict()
+
+    async def acquire(self, session_id):
+        await self.evict_idle()
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = RealtimeSession(self.uri, self.session_config)
+            self.sessions[session_id] = session
+        if session.ws is None:
+            await self._make_room(session)
+        self.sessions.move_to_end(session_id)
+        return session
+
+    def open_sessions(self):
+        return sum(s.ws is not None for s in self.sessions.values())
+
+    async def _make_room(self, keep):
+        while self.open_sessions() >= self.max_sessions:
+            victim = next((s for s in self.sessions.values()
+                           if s.ws is not None and s is not keep and not s.lock.locked() and not s.clients), None)
+            if victim is None:
+                # Every connection is mid-turn or in use; allow a temporary overshoot.
+                return
+            await victim.close()
+
+    async def evict_idle(self):
+        now = time.monotonic()
+        for sid, session in list(self.sessions.items()):
+            if session.lock.locked() or session.clients:
+                continue
+            idle = now - session.last_used
+            if idle > self.history_ttl:
+                del self.sessions[sid]
+                await session.close()
+            elif idle > self.idle_timeout and session.ws is not None:
+                await session.close()
+
+    async def ask(self, session_id, user_text):
+        session = await self.acquire(session_id)
+        return await session.ask(user_text)
+
+    async def ask_stream(self, session_id, user_text, **kwargs):
+        session = await self.acquire(session_id)
+        async for delta in session.ask_stream(user_text, **kwargs):
+            yield delta
+
+    async def add_message(self, session_id, role, text):
+        session = await self.acquire(session_id)
+        await session.add_message(role, text)
+
+    async def retract_last_turn(self, session_id):
+        session = self.sessions.get(session_id)
+        if session is not None:
+            await session.retract_last_turn()
+
+    async def release(self, session_id):
+        """Closes the session's connection. Its history stays, so the next acquire replays it."""
+        session = self.sessions.get(session_id)
+        if session is not None:
+            await session.close()
+
+    async def close_all(self):
+        for session in self.sessions.values():
+            await session.close()
+        self.sessions.clear()
+
+
+pool = RealtimeSessionPool()
@@ -0,0 +1,119 @@
+# serve.py (production entry point: one worker, or several behind the session router)
+#
+#   python serve.py --port $PORT                       one worker (what the Procfile runs)
+#   WEB_CONCURRENCY=4 python serve.py --port $PORT     four workers behind worker_router
+#
+# Several workers need shared state: SESSION_STORE (and optionally PDF_STORE)
+# must not be memory; it defaults to sqlite:///sessions.db here. Each worker
+# gets its share of the cores for PDF rendering and Whisper unless set.
+# SIGTERM drains: workers stop taking new conversations, finish the turns in
+# flight (up to DRAIN_TIMEOUT) and exit; the router exits after them.
+
+import os
+import sys
+import time
+import socket
+import argparse
+import multiprocessing
+import uvicorn
+
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+DRAIN_TIMEOUT = float(os.getenv("DRAIN_TIMEOUT", "30"))
+
+
+class DrainingServer(uvicorn.Server):
+    """
+    uvicorn.Server that treats the first SIGTERM/SIGINT as a drain: it keeps
+    serving while on_drain() winds work down and exits once idle() is true
+    or timeout passes. A second signal exits straight away.
+    """
+
+    def __init__(self, config, on_drain, idle, timeout=DRAIN_TIMEOUT):
+        super().__init__(config)
+        self.on_drain = on_drain
+        self.idle = idle
+        self.timeout = timeout
+        self.drain_deadline = None
+
+    def handle_exit(self, sig, frame):
+        if self.drain_deadline is None:
+            self.drain_deadline = time.monotonic() + self.timeout
+            self.on_drain()
+            return
+        super().handle_exit(sig, frame)
+
+    async def on_tick(self, counter):
+        if self.drain_deadline is not None and not self.should_exit:
+            self.should_exit = self.idle() or time.monotonic() > self.drain_deadline
+        return await super().on_tick(counter)
+
+
+def run_worker(app, host, port):
+    from worker_drain import drain
+    config = uvicorn.Config(app, host=host, port=port, log_level="warning",
+                            timeout_graceful_shutdown=5)
+    DrainingServer(config, on_drain=drain.begin, idle=lambda: drain.idle).run()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def share_cores(workers):
+    cores = os.cpu_count() or 1
+    share = str(max(1, cores // workers))
+    for name in ("PDF_WORKERS", "INFERENCE_WORKERS", "WHISPER_NUM_WORKERS"):
+        os.environ.setdefault(name, share)
+    os.environ.setdefault("WHISPER_CPU_THREADS", "1" if cores <= workers else share)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY)
+    parser.add_argument("--app", default="main:app", help="ASGI app each worker serves")
+    args = parser.parse_args()
+
+    if args.workers <= 1:
+        run_worker(args.app, args.host, args.port)
+        return
+
+    if os.getenv("SESSION_STORE", "memory") == "memory":
+        os.environ["SESSION_STORE"] = "sqlite:///sessions.db"
+        print("⚠️ SESSION_STORE=memory cannot be shared between workers; using sqlite:///sessions.db")
+    share_cores(args.workers)
+
+    ctx = multiprocessing.get_context("spawn")
+    workers = []
+    for _ in range(args.workers):
+        port = free_port()
+        process = ctx.Process(target=run_worker, args=(args.app, "127.0.0.1", port), daemon=False)
+        process.start()
+        workers.append((f"127.0.0.1:{port}", process))
+    print(f"🧭 Routing :{args.port} to {len(workers)} workers:", ", ".join(w for w, _ in workers))
+
+    def drain_workers():
+        print("🚰 Draining workers")
+        for _, process in workers:
+            if process.is_alive():
+                process.terminate()   # SIGTERM: each worker drains on its own
+
+    from worker_router import make_app
+    config = uvicorn.Config(make_app([w for w, _ in workers]), host=args.host, port=args.port, log_level="warning")
+    server = DrainingServer(config, on_drain=drain_workers, idle=lambda: not any(p.is_alive() for _, p in workers),
+                            timeout=DRAIN_TIMEOUT + 5)
+    try:
+        server.run()
+    finally:
+        for _, process in workers:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.kill()
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+# session_store.py (per-session conversation and form state, shared across workers)
+#
+# SESSION_STORE selects the backend:
+#   memory                  in-process dict (default, single worker)
+#   sqlite:///sessions.db   one SQLite file shared by every worker on the host
+#   redis://host:6379/0     any Redis-compatible server (requires the redis package)
+#
+# PDF_STORE optionally keeps generated PDFs elsewhere (same URL forms, plus
+# file:///path/to/dir for plain files on a shared volume); default: SESSION_STORE.
+# Anything but memory is shared, so several workers can serve the same session.
+# Changes to a session go through update(), which each backend applies
+# atomically (lock, BEGIN IMMEDIATE, WATCH/MULTI, lock file), so concurrent
+# writers (two workers, or the extractor beside the reply path) never drop
+# each other's turns or fields.
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import fcntl
+import sqlite3
+import threading
+from datetime import datetime
+from form_schema import empty_form
+
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")
+SESSION_TTL = float(os.getenv("SESSION_TTL", "3600"))
+PDF_STORE = os.getenv("PDF_STORE", "")
+
+
+def new_state():
+    return {
+        "form_data": empty_form(),
+        "conversation_history": [],
+        "last_user_msg": "",
+        "last_assistant_msg": "",
+        "end_triggered": False,
+        "progress": {"stage": "collecting", "read_back": "", "confirmed": [], "pdf_job": None},
+    }
+
+
+def append_message(state, role, text):
+    state["conversation_history"].append({"role": role, "text": text, "timestamp": datetime.now().isoformat()})
+    state["last_assistant_msg" if role == "assistant" else "last_user_msg"] = text
+
+
+class MemoryBackend:
+    def __init__(self):
+        self.items = {}
+        self.lock = threading.Lock()
+
+    def _sweep(self, now):
+        expired = [key for key, (expires, _) in self.items.items() if expires < now]
+        for key in expired:
+            del self.items[key]
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None or item[0] < time.time():
+                self.items.pop(key, None)
+                return None
+            return item[1]
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        with self.lock:
+            self._sweep(now)
+            self.items[key] = (now + ttl, value)
+
+    def update(self, key, fn, ttl):
+        now = time.time()
+        with self.lock:
+            self._sweep(now)
+            item = self.items.get(key)
+            value = fn(item[1] if item else None)
+            self.items[key] = (now + ttl, value)
+            return value
+
+    def delete(self, key):
+        with self.lock:
+            self.items.pop(key, None)
+
+
+class SQLiteBackend:
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        with self._conn() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value BLOB, expires REAL)")
+
+    def _conn(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self.local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value FROM kv WHERE key = ? AND expires >= ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute("DELETE FROM kv WHERE expires < ?", (now,))
+            conn.execute("INSERT OR REPLACE INTO kv VALUES (?, ?, ?)", (key, value, now + ttl))
+
+    def update(self, key, fn, ttl):
+        # BEGIN IMMEDIATE takes the write lock before the read, so other writers wait their turn
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute("SELECT value FROM kv WHERE key = ? AND expires >= ?", (key, now)).fetchone()
+            value = fn(row[0] if row else None)
+            conn.execute("INSERT OR REPLACE INTO kv VALUES (?, ?, ?)", (key, value, now + ttl))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        return value
+
+    def delete(self, key):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+
+
+class RedisBackend:
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("SESSION_STORE=redis://... requires the 'redis' package")
+        self.redis = redis
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl):
+        self.client.set(key, value, ex=int(ttl))
+
+    def update(self, key, fn, ttl):
+        # Optimistic: WATCH the key and retry if another writer changed it before EXEC
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    value = fn(pipe.get(key))
+                    pipe.multi()
+                    pipe.set(key, value, ex=int(ttl))
+                    pipe.execute()
+                    return value
+                except self.redis.WatchError:
+                    continue
+
+    def delete(self, key):
+        self.client.delete(key)
+
+
+class FileBackend:
+    """One file per key; expiry is the file's mtime. Writes are atomic renames."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key.replace(":", "_").replace("/", "_"))
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            if os.path.getmtime(path) < time.time():
+                os.remove(path)
+                return None
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def set(self, key, value, ttl):
+        path = self._path(key)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(value.encode() if isinstance(value, str) else value)
+        os.replace(tmp, path)
+        expires = time.time() + ttl
+        os.utime(path, (expires, expires))
+
+    def update(self, key, fn, ttl):
+        # An exclusive lock on a sidecar file serializes writers in every process sharing the directory.
+        # The lock file outlives delete(): removing it could let two writers lock different files.
+        with open(f"{self._path(key)}.lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                value = fn(self.get(key))
+                self.set(key, value, ttl)
+                return value
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+def make_backend(url=SESSION_STORE):
+    if url.startswith("file:///"):
+        return FileBackend(url[len("file://"):])
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://")):
+        return RedisBackend(url)
+    return MemoryBackend()
+
+
+class SessionStore:
+    """
+    Conversation state (form_data, history, last messages, end flag), the
+    generated PDF and its render job records, keyed by session id and
+    expiring SESSION_TTL seconds after the last write.
+    """
+
+    def __init__(self, backend=None, ttl=SESSION_TTL, pdf_backend=None):
+        self.backend = backend or make_backend()
+        self.pdf_backend = pdf_backend or (make_backend(PDF_STORE) if PDF_STORE else self.backend)
+        self.ttl = ttl
+
+    @property
+    def shared(self):
+        """False when state only lives in this process (the memory backend)."""
+        return not isinstance(self.backend, MemoryBackend)
+
+    def create(self):
+        session_id = uuid.uuid4().hex
+        self.save(session_id, new_state())
+        return session_id
+
+    def exists(self, session_id):
+        return self.backend.get(f"state:{session_id}") is not None
+
+    def load(self, session_id):
+        raw = self.backend.get(f"state:{session_id}")
+        return json.loads(raw) if raw is not None else new_state()
+
+    def save(self, session_id, state):
+        self.backend.set(f"state:{session_id}", json.dumps(state), self.ttl)
+
+    def update(self, session_id, mutate):
+        """
+        Applies mutate(state) to the stored state atomically and returns the
+        result. mutate may run more than once (Redis retries on conflict), so
+        it should only change the state it is given.
+        """
+        def apply(raw):
+            state = json.loads(raw) if raw is not None else new_state()
+            mutate(state)
+            return json.dumps(state)
+        return json.loads(self.backend.update(f"state:{session_id}", apply, self.ttl))
+
+    def add_message(self, session_id, role, text):
+        """Appends a turn to the conversation history and returns the updated state."""
+        return self.update(session_id, lambda state: append_message(state, role, text))
+
+    def save_pdf(self, session_id, pdf_bytes):
+        self.pdf_backend.set(f"pdf:{session_id}", pdf_bytes, self.ttl)
+
+    def load_pdf(self, session_id):
+        return self.pdf_backend.get(f"pdf:{session_id}")
+
+    def save_job(self, job):
+        self.backend.set(f"job:{job['job_id']}", json.dumps(job), self.ttl)
+        self.backend.set(f"latest_job:{job['session_id']}", job["job_id"], self.ttl)
+
+    def load_job(self, job_id):
+        raw = self.backend.get(f"job:{job_id}")
+        return json.loads(raw) if raw is not None else None
+
+    def latest_job(self, session_id):
+        job_id = self.backend.get(f"latest_job:{session_id}")
+        if isinstance(job_id, bytes):
+            job_id = job_id.decode()
+        return self.load_job(job_id) if job_id else None
+
+    def delete(self, session_id):
+        self.backend.delete(f"state:{session_id}")
+        self.pdf_backend.delete(f"pdf:{session_id}")
+
+    # Async variants for request handlers: the memory backend is a dict lookup and
+    # runs inline; SQLite and Redis round trips run in a thread off the event loop.
+
+    async def _run(self, fn, *args):
+        if isinstance(self.backend, MemoryBackend) and isinstance(self.pdf_backend, MemoryBackend):
+            return fn(*args)
+        return await asyncio.to_thread(fn, *args)
+
+    async def acreate(self):
+        return await self._run(self.create)
+
+    async def aexists(self, session_id):
+        return await self._run(self.exists, session_id)
+
+    async def aload(self, session_id):
+        return await self._run(self.load, session_id)
+
+    async def asave(self, session_id, state):
+        await self._run(self.save, session_id, state)
+
+    async def aupdate(self, session_id, mutate):
+        return await self._run(self.update, session_id, mutate)
+
+    async def aadd_message(self, session_id, role, text):
+        return await self._run(self.add_message, session_id, role, text)
+
+    async def asave_pdf(self, session_id, pdf_bytes):
+        await self._run(self.save_pdf, session_id, pdf_bytes)
+
+    async def aload_pdf(self, session_id):
+        return await self._run(self.load_pdf, session_id)
+
+    async def asave_job(self, job):
+        await self._run(self.save_job, job)
+
+    async def aload_job(self, job_id):
+        return await self._run(self.load_job, job_id)
+
+    async def alatest_job(self, session_id):
+        return await self._run(self.latest_job, session_id)
+
+
+store = SessionStore()
@@ -1,10 +1,17 @@
-// realtime_transcriber_client.js (Streaming to Azure GPT-4o Realtime)
+// realtime_transcriber_client.js (Streaming to GPT-4o Realtime through the server relay)
 
 let socket;
 let audioContext;
 let processor;
 let input;
 let globalStream;
+let playbackContext;
+let playAt = 0;
+let sessionId;
+let audioOutput = false;
+let replySampleRate = 24000;
+
+const MIC_SAMPLE_RATE = 24000;  // realtime pcm16 input format
 
 const status = document.getElementById('status');
 const replyAudio = document.getElementById('replyAudio');
@@ -26,58 +33,99 @@ function appendToConversation(role, text) {
   conversation.scrollTop = conversation.scrollHeight;
 }
 
-function initWebSocket() {
-  const API_VERSION = "2024-10-01-preview";
-const DEPLOYMENT = "gpt-4o-mini-realtime-preview";
-const RESOURCE_HOST = "admin-m7q8p9qe-eastus2.cognitiveservices.azure.com";
-const API_KEY = "{{ AZURE_API_KEY }}";
+async function getSessionId() {
+  let id = sessionStorage.getItem('session_id');
+  if (!id) {
+    const response = await fetch('/sessions', { method: 'POST' });
+    id = (await response.json()).session_id;
+    sessionStorage.setItem('session_id', id);
+  }
+  return id;
+}
 
-const WS_URI = `wss://${RESOURCE_HOST}/openai/realtime?api-version=${API_VERSION}&deployment=${DEPLOYMENT}&api-key=${API_KEY}`;
-  socket = new WebSocket(WS_URI);
+// Schedules raw PCM16 mono audio right after whatever is already queued.
+function playPcm16(bytes, sampleRate) {
+  if (!playbackContext || playbackContext.sampleRate !== sampleRate) {
+    playbackContext = new AudioContext({ sampleRate });
+    playAt = 0;
+  }
+  const samples = new Int16Array(bytes.buffer, bytes.byteOffset, bytes.byteLength / 2);
+  const buffer = playbackContext.createBuffer(1, samples.length, sampleRate);
+  const channel = buffer.getChannelData(0);
+  for (let i = 0; i < samples.length; i++) {
+    channel[i] = samples[i] / 0x8000;
+  }
+
+  const source = playbackContext.createBufferSource();
+  source.buffer = buffer;
+  source.connect(playbackContext.destination);
+  playAt = Math.max(playAt, playbackContext.currentTime);
+  source.start(playAt);
+  playAt += buffer.duration;
+  return source;
+}
+
+function initWebSocket() {
+  const scheme = location.protocol === 'https:' ? 'wss' : 'ws';
+  socket = new WebSocket(`${scheme}://${location.host}/ws/realtime?session_id=${sessionId}`);
+  socket.binaryType = 'arraybuffer';
 
   socket.onopen = () => {
     setStatus('listening');
     console.log('✅ WebSocket connected');
-    socket.send(JSON.stringify({
-      type: "session.update",
-      session: {
-        modalities: ["audio"],
-        instructions: "You are a helpful form-filling assistant. Ask questions one by one and extract values."
-      }
-    }));
-    socket.send(JSON.stringify({
-  type: "response.create"
-}));
-
-// 🗣️ Send initial welcome message like original assistant
-socket.send(JSON.stringify({
-  type: "conversation.item.create",
-  item: {
-    type: "message",
-    role: "user",
-    content: [
-      {
-        type: "input_text",
-        text: "Hello, can we get started by telling me the first steps?"
-      }
-    ]
-  }
-}));
   };
 
   socket.onmessage = (event) => {
+    if (event.data instanceof ArrayBuffer) {
+      // Binary frame: reply audio as raw PCM16
+      setStatus('speaking');
+      const source = playPcm16(new Uint8Array(event.data), replySampleRate);
+      source.onended = () => {
+        if (playbackContext.currentTime >= playAt) setStatus('listening');
+      };
+      return;
+    }
+
     const msg = JSON.parse(event.data);
     const type = msg.type;
 
-    if (type === "response.text") {
-      const partial = msg.text;
-      console.log("✏️ Partial:", partial);
+    if (type === "relay.ready") {
+      audioOutput = msg.audio_output;
+      replySampleRate = msg.sample_rate;
+      if (msg.fresh) {
+        // 🗣️ Send initial welcome message like original assistant; a reconnect resumes instead
+        socket.send(JSON.stringify({
+          type: "conversation.item.create",
+          item: {
+            type: "message",
+            role: "user",
+            content: [
+              {
+                type: "input_text",
+                text: "Hello, can we get started by telling me the first steps?"
+              }
+            ]
+          }
+        }));
+        socket.send(JSON.stringify({ type: "response.create" }));
+      }
+    }
+    if (type === "response.text.delta") {
+      console.log("✏️ Partial:", msg.delta || msg.text);
     }
     if (type === "response.text.done") {
       const finalText = msg.text;
       appendToConversation('assistant', finalText);
+      if (!audioOutput) {
+        setStatus('speaking');
+        synthesizeSpeech(finalText);
+      }
+    }
+    if (type === "relay.say") {
+      // Read-back and confirmation from the server, not the model: always spoken here
+      appendToConversation('assistant', msg.text);
       setStatus('speaking');
-      synthesizeSpeech(finalText);
+      synthesizeSpeech(msg.text);
     }
   };
 
@@ -93,19 +141,38 @@ socket.send(JSON.stringify({
 }
 
 async function synthesizeSpeech(text) {
-  const response = await fetch("/tts", {
+  // Streams sentence-chunked PCM16 from /tts/stream and schedules each piece
+  // back to back, so playback starts with the first sentence.
+  const response = await fetch("/tts/stream", {
     method: "POST",
     headers: { "Content-Type": "application/json" },
     body: JSON.stringify({ text })
   });
-  const { audio_b64 } = await response.json();
-
-  const audioBlob = new Blob([
-    Uint8Array.from(atob(audio_b64), c => c.charCodeAt(0))
-  ], { type: 'audio/wav' });
-  replyAudio.src = URL.createObjectURL(audioBlob);
-  replyAudio.play();
-  replyAudio.onended = () => setStatus('listening');
+  const sampleRate = parseInt(response.headers.get("X-Sample-Rate") || "24000", 10);
+
+  const reader = response.body.getReader();
+  let carry = new Uint8Array(0);
+  let lastSource = null;
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+
+    const bytes = new Uint8Array(carry.length + value.length);
+    bytes.set(carry);
+    bytes.set(value, carry.length);
+    const usable = bytes.length - (bytes.length % 2);
+    carry = bytes.slice(usable);
+    if (!usable) continue;
+
+    lastSource = playPcm16(bytes.subarray(0, usable), sampleRate);
+  }
+
+  if (lastSource) {
+    lastSource.onended = () => setStatus('listening');
+  } else {
+    setStatus('listening');
+  }
 }
 
 async function startStreamingAudio() {
@@ -119,26 +186,20 @@ async function startStreamingAudio() {
     console.warn('Mic permission query unsupported:', err);
   }
 
-  audioContext = new AudioContext({ sampleRate: 16000 });
+  audioContext = new AudioContext({ sampleRate: MIC_SAMPLE_RATE });
   globalStream = await navigator.mediaDevices.getUserMedia({ audio: true });
   input = audioContext.createMediaStreamSource(globalStream);
   processor = audioContext.createScriptProcessor(4096, 1, 1);
 
   processor.onaudioprocess = (e) => {
-  const inputData = e.inputBuffer.getChannelData(0);
-  const int16Data = convertFloat32ToInt16(inputData);
-
-  if (socket && socket.readyState === 1) {
-    const base64Audio = btoa(
-      String.fromCharCode(...new Uint8Array(int16Data))
-    );
-
-    socket.send(JSON.stringify({
-      type: "input.audio",
-      audio: base64Audio
-    }));
-  }
-};
+    const inputData = e.inputBuffer.getChannelData(0);
+    const int16Data = convertFloat32ToInt16(inputData);
+
+    // Binary frame: raw PCM16, no base64/JSON wrapping
+    if (socket && socket.readyState === 1) {
+      socket.send(int16Data);
+    }
+  };
 
   input.connect(processor);
   processor.connect(audioContext.destination);
@@ -148,13 +209,14 @@ function convertFloat32ToInt16(buffer) {
   let l = buffer.length;
   const result = new Int16Array(l);
   for (let i = 0; i < l; i++) {
-    result[i] = Math.min(1, buffer[i]) * 0x7FFF;
+    result[i] = Math.max(-1, Math.min(1, buffer[i])) * 0x7FFF;
   }
   return result.buffer;
 }
 
-window.onload = () => {
+window.onload = async () => {
   console.log('📡 Initializing assistant...');
+  sessionId = await getSessionId();
   initWebSocket();
   startStreamingAudio();
 };
@@ -1,101 +1,508 @@
 # stream_audio_ws_handler.py
+#
+# /ws/audio: the client streams microphone audio (see audio_codec.py for the
+# formats) and gets JSON messages and reply audio back:
+#
+#   {"format": {...}}                       first, what the connection will use
+#   {"partial": text} / {"transcript": text} what the user is saying / said
+#   {"sentence", "seq", ...} + binary        streamed reply audio (?tts=stream), then {"text", "done"}
+#   {"text", "audio_b64"}                    whole reply as WAV (?tts=wav), or {"text", "audio_bytes"} + binary
+#   {"cancelled": true, "reason", "unplayed_s"}
+#                                            stop the reply now: stop what is playing, drop what is
+#                                            queued. Nothing more of that reply follows; later audio is
+#                                            the next reply.
+#
+# The server assumes the client plays reply audio as it arrives, back to back,
+# and keeps that playhead: talking over a reply (barge-in) cancels it while
+# it is still generating or still playing, and audio cut off is not counted
+# as delivered.
 
 import os
-import io
+import re
+import time
 import base64
 import uuid
 import json
 import asyncio
-import websockets
+import difflib
+import functools
 import numpy as np
-import soundfile as sf
-import faster_whisper
-from openai import OpenAI
 from starlette.websockets import WebSocket
+from app_resources import resources
+from audio_codec import AudioFormat, UnsupportedFormat, encode_ogg_opus
+from audio_decode import TARGET_RATE
+from worker_drain import drain
+import whisper_registry
+from realtime_session_pool import pool as realtime_pool
+from vad_segmenter import UtteranceSegmenter
+from inference_scheduler import scheduler, SchedulerBusy
+from tts_cache import tts_cache
+from streaming_tts import stream_reply_audio, synthesize_pcm, iter_text, PCM_SAMPLE_RATE
+from session_store import store
+from field_extractor import extractor
+from form_progress import progress as form_progress
+import pipeline_metrics as metrics
+from pipeline_metrics import log
 
-# Load Whisper model (faster-whisper for real-time)
-model = faster_whisper.WhisperModel("base", compute_type="int8")
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Default reply mode; clients can pick per connection with ?tts=stream or ?tts=wav
+STREAMING_TTS = os.getenv("STREAMING_TTS", "0") == "1"
+# New speech while a reply is in flight cancels that reply
+BARGE_IN = os.getenv("BARGE_IN", "1") == "1"
 
-# Azure GPT-4o WS connection setup
-AZURE_WS = f"wss://{os.getenv('AZURE_HOST')}/openai/realtime?api-version=2024-10-01-preview&deployment=gpt-4o-mini-realtime-preview&api-key={os.getenv('AZURE_API_KEY')}"
+# Opt-in (or ?speculate=1): start the reply on the transcript of a short pause and
+# keep it if the final transcript matches, so GPT latency overlaps the endpointing wait
+SPECULATIVE_REPLY = os.getenv("SPECULATIVE_REPLY", "0") == "1"
+SPECULATIVE_PAUSE_MS = int(os.getenv("SPECULATIVE_PAUSE_MS", "250"))
+SPECULATIVE_MATCH = float(os.getenv("SPECULATIVE_MATCH", "0.9"))   # normalized similarity for a hit
 
-async def stream_text_to_gpt(user_text: str) -> str:
+# Totals across finished sessions: reply audio synthesized, sent, cut off by a barge-in before the
+# client played it (interrupted) and played (delivered = sent - interrupted), and bytes on the wire
+# each way against the audio they carried (see audio_codec.py)
+turn_stats = {"turns": 0, "cancelled_turns": 0, "synthesized_s": 0.0, "sent_s": 0.0, "interrupted_s": 0.0,
+              "delivered_s": 0.0, "bytes_in": 0, "bytes_out": 0, "audio_in_s": 0.0}
+# Speculative replies: kept (hits), discarded by the final transcript (misses) or
+# by the user talking on (abandoned), and GPT time already spent when a hit was kept
+speculation_stats = {"speculations": 0, "hits": 0, "misses": 0, "abandoned": 0, "saved_s": 0.0}
+
+def normalize_transcript(text: str) -> str:
+    return " ".join(re.sub(r"[^\w\s']", " ", text.lower()).split())
+
+def transcripts_match(a: str, b: str, threshold: float = SPECULATIVE_MATCH) -> bool:
+    a, b = normalize_transcript(a), normalize_transcript(b)
+    return bool(a and b) and (a == b or difflib.SequenceMatcher(None, a, b).ratio() >= threshold)
+
+class MeteredSocket:
+    """
+    Counts the bytes a connection receives and sends, and the reply audio it
+    sends and the client plays, into meter; everything else passes through.
+    """
+
+    def __init__(self, websocket: WebSocket, meter: dict):
+        self.websocket = websocket
+        self.meter = meter
+        self.playing_until = 0.0   # monotonic time the client finishes the reply audio sent so far
+
+    def audio_sent(self, seconds: float):
+        self.playing_until = max(self.playing_until, time.monotonic()) + seconds
+        self.meter["sent_s"] += seconds
+        self.meter["delivered_s"] += seconds
+
+    def playing(self) -> bool:
+        return time.monotonic() < self.playing_until
+
+    def stop_playback(self) -> float:
+        """Seconds of sent audio the client has not played yet; no longer counted as delivered."""
+        unplayed = max(0.0, self.playing_until - time.monotonic())
+        self.playing_until = 0.0
+        self.meter["delivered_s"] -= unplayed
+        self.meter["interrupted_s"] += unplayed
+        return unplayed
+
+    def __getattr__(self, name):
+        return getattr(self.websocket, name)
+
+    async def receive_bytes(self):
+        data = await self.websocket.receive_bytes()
+        self.meter["bytes_in"] += len(data)
+        return data
+
+    async def send_bytes(self, data):
+        self.meter["bytes_out"] += len(data)
+        await self.websocket.send_bytes(data)
+
+    async def send_text(self, text):
+        self.meter["bytes_out"] += len(text)  # json.dumps output is ASCII
+        await self.websocket.send_text(text)
+
+class SpeculativeReply:
+    """
+    A GPT reply started on a tentative transcript. Deltas are buffered until
+    the final transcript adopts the reply or cancels it; a cancelled reply is
+    deleted from the conversation so it never happened as far as GPT knows.
+    """
+
+    def __init__(self, session_id: str, text: str):
+        self.session_id = session_id
+        self.text = text
+        self.adopted = False
+        self.started = time.perf_counter()
+        self.finished = None
+        self.queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        try:
+            async for delta in realtime_pool.ask_stream(self.session_id, self.text,
+                                                        retract_on_cancel=lambda: not self.adopted):
+                self.queue.put_nowait(delta)
+            self.finished = time.perf_counter()
+        except Exception as e:
+            self.queue.put_nowait(e)
+        finally:
+            self.queue.put_nowait(None)
+
+    def head_start(self) -> float:
+        """Seconds of GPT generation already done (or spent) when the final transcript arrived."""
+        return (self.finished or time.perf_counter()) - self.started
+
+    def adopt(self):
+        """Hands over the deltas (buffered and still to come) as the reply to the final transcript."""
+        self.adopted = True
+        return self._deltas()
+
+    async def _deltas(self):
+        try:
+            while True:
+                item = await self.queue.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            self.task.cancel()   # the adopted turn was cancelled (barge-in): stop generating
+
+    async def cancel(self):
+        if not self.task.done():
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        elif self.finished is not None:
+            await realtime_pool.retract_last_turn(self.session_id)
+
+async def stream_text_to_gpt(user_text: str, session_id: str = "default", deltas=None) -> str:
+    # Reuses the conversation's long-lived realtime connection (see realtime_session_pool.py)
     try:
-        async with websockets.connect(AZURE_WS) as ws:
-            await ws.send(json.dumps({
-                "type": "session.update",
-                "session": {"modalities": ["text"], "tool_choice": "auto"},
-                "event_id": str(uuid.uuid4())
-            }))
-            await ws.send(json.dumps({
-                "type": "conversation.item.create",
-                "item": {
-                    "type": "message",
-                    "role": "user",
-                    "content": [{"type": "input_text", "text": user_text}]
-                },
-                "event_id": str(uuid.uuid4())
-            }))
-            await ws.send(json.dumps({"type": "response.create", "event_id": str(uuid.uuid4())}))
-
-            full_response = ""
-            async for message in ws:
-                data = json.loads(message)
-                if data.get("type") == "response.text.delta":
-                    full_response += data.get("text", "")
-                elif data.get("type") == "response.text.done":
-                    break
-            return full_response
+        if deltas is not None:
+            return "".join([delta async for delta in deltas])
+        return await realtime_pool.ask(session_id, user_text)
     except Exception as e:
-        print("[WebSocket GPT Error]", e)
+        log("error", f"[WebSocket GPT Error] {e}", session_id=session_id)
         return "Sorry, something went wrong."
 
-def convert_pcm_to_wav(pcm_data):
-    arr = np.frombuffer(pcm_data, dtype=np.int16)
-    buffer = io.BytesIO()
-    sf.write(buffer, arr, 16000, format='WAV')
-    buffer.seek(0)
-    return buffer
+async def encode_reply(pcm: bytes, fmt: AudioFormat, trace) -> bytes:
+    with trace.span("encode"):
+        return await asyncio.to_thread(encode_ogg_opus, pcm, PCM_SAMPLE_RATE, fmt.bitrate)
+
+async def stream_reply_to_client(websocket: WebSocket, user_text: str, session_id: str, meter: dict,
+                                 trace=None, deltas=None, fmt=None) -> str:
+    """
+    Pipelined reply: GPT deltas are split into sentences, synthesized concurrently
+    and sent in order as {"sentence", "seq", ...} followed by one binary frame of
+    raw PCM16 (or Ogg Opus, if negotiated) per sentence, then {"text", "done"}
+    with the full reply. Cancelling the calling task cancels generation and any
+    queued synthesis. deltas, if given, replaces asking GPT (an adopted
+    speculative reply).
+    """
+    trace = trace or metrics.NullTrace(session_id)
+    opus = fmt is not None and fmt.opus_replies
+
+    async def synthesize(sentence):
+        with trace.span("tts"):
+            audio = await synthesize_pcm(resources.openai, sentence)
+        seconds = pcm_seconds(len(audio))
+        meter["synthesized_s"] += seconds
+        if opus:
+            audio = await encode_reply(audio, fmt, trace)
+        return audio, seconds
+
+    reply = ""
+    try:
+        if deltas is None:
+            deltas = realtime_pool.ask_stream(session_id, user_text)
+        deltas = metrics.watch_deltas(trace, deltas)
+        audio_stream = stream_reply_audio(deltas, synthesize)
+        async for seq, (sentence, (audio, seconds)) in aenumerate(audio_stream):
+            with trace.span("ws_send"):
+                await websocket.send_text(json.dumps({
+                    "sentence": sentence,
+                    "seq": seq,
+                    "format": "ogg_opus" if opus else "pcm16",
+                    "sample_rate": PCM_SAMPLE_RATE
+                }))
+                await websocket.send_bytes(audio)
+            trace.mark("first_audio")
+            websocket.audio_sent(seconds)
+            reply += (" " if reply else "") + sentence
+    except Exception as e:
+        log("error", f"[Streaming reply Error] {e}", session_id=session_id)
+        if not reply:
+            reply = "Sorry, something went wrong."
+    await websocket.send_text(json.dumps({"text": reply, "done": True}))
+    return reply
+
+def kbps(n_bytes: int, audio_seconds: float) -> str:
+    # Wire bytes per second of audio carried, so codecs compare regardless of session length
+    return f"{n_bytes * 8 / audio_seconds / 1000:.0f} kbps" if audio_seconds else "no audio"
+
+def pcm_seconds(n_bytes: int, sample_rate: int = PCM_SAMPLE_RATE) -> float:
+    return n_bytes / 2 / sample_rate
+
+async def aenumerate(aiterable):
+    i = 0
+    async for item in aiterable:
+        yield i, item
+        i += 1
+
+def transcribe_segments(audios: list) -> list:
+    # Whisper takes 16 kHz float32 directly, no WAV round-trip needed. Segments from
+    # several sessions that queued up together are decoded in one batch.
+    return whisper_registry.transcribe_batch(audios)
+
+async def reply_to_client(websocket: WebSocket, text: str, session_id: str, streaming: bool, meter: dict,
+                          trace=None, deltas=None, fmt=None):
+    with drain.turn():  # a graceful shutdown waits for this reply to finish
+        trace = trace or metrics.NullTrace(session_id)
+        status = "ok"
+        try:
+            if streaming:
+                reply = await stream_reply_to_client(websocket, text, session_id, meter, trace, deltas, fmt)
+                log("reply", f"🤖 {reply}", session_id=session_id, turn_id=trace.turn_id)
+                await store.aadd_message(session_id, "assistant", reply)
+                return
+
+            with trace.span("llm"):
+                reply = await stream_text_to_gpt(text, session_id, deltas)
+            log("reply", f"🤖 {reply}", session_id=session_id, turn_id=trace.turn_id)
+            await store.aadd_message(session_id, "assistant", reply)
+
+            if fmt is not None and fmt.opus_replies:
+                # One binary Ogg Opus frame announced by its JSON header: no WAV, no base64
+                with trace.span("tts"):
+                    pcm = await synthesize_pcm(resources.openai, reply)
+                seconds = pcm_seconds(len(pcm))
+                meter["synthesized_s"] += seconds
+                reply_audio = await encode_reply(pcm, fmt, trace)
+                with trace.span("ws_send"):
+                    await websocket.send_text(json.dumps({
+                        "text": reply,
+                        "format": "ogg_opus",
+                        "audio_bytes": len(reply_audio)
+                    }))
+                    await websocket.send_bytes(reply_audio)
+                trace.mark("first_audio")
+                websocket.audio_sent(seconds)
+                return
+
+            with trace.span("tts"):
+                reply_audio = await tts_cache.asynthesize(resources.openai, reply, response_format="wav")
+            seconds = pcm_seconds(max(0, len(reply_audio) - 44))  # tts-1 WAV: 24 kHz PCM16 + 44-byte header
+            meter["synthesized_s"] += seconds
+            with trace.span("base64"):
+                reply_audio_b64 = base64.b64encode(reply_audio).decode("utf-8")
+
+            with trace.span("ws_send"):
+                await websocket.send_text(json.dumps({
+                    "text": reply,
+                    "audio_b64": reply_audio_b64
+                }))
+            trace.mark("first_audio")
+            websocket.audio_sent(seconds)
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        except Exception as e:
+            status = "error"
+            log("error", f"❌ Reply failed: {e}", session_id=session_id, turn_id=trace.turn_id)
+        finally:
+            trace.finish(status)
 
 async def handle_audio_stream(websocket: WebSocket):
     await websocket.accept()
-    print("🔌 WebSocket client connected")
+    if drain.draining:
+        await websocket.close(code=1013)  # try again later: reconnect lands on another worker
+        return
+    try:
+        fmt = AudioFormat.negotiate(websocket.query_params)
+    except UnsupportedFormat as e:
+        await websocket.send_text(json.dumps({"error": str(e)}))
+        await websocket.close(code=1003)
+        return
+    session_id = websocket.query_params.get("session_id") or str(uuid.uuid4())
+    log("connected", "🔌 WebSocket client connected", session_id=session_id)
 
-    pcm_buffer = bytearray()
+    streaming = websocket.query_params.get("tts", "stream" if STREAMING_TTS else "wav") == "stream"
+    speculate = websocket.query_params.get("speculate", "1" if SPECULATIVE_REPLY else "0") == "1"
+    segmenter = UtteranceSegmenter(tentative_ms=SPECULATIVE_PAUSE_MS if speculate else 0)
+    decoder = fmt.decoder()
     last_transcript = ""
+    meter = dict.fromkeys(turn_stats, 0)
+    websocket = MeteredSocket(websocket, meter)
+    spec_meter = dict.fromkeys(speculation_stats, 0)
+    turn = None  # in-flight GPT + TTS reply for the previous utterance
+    speculation = None  # reply started on a tentative transcript, not yet adopted
+    connection = object()  # this connection's key in drain.busy
+
+    async def cancel_turn(reason):
+        # Stops the reply if it is still generating or still playing on the client
+        nonlocal turn
+        task = turn
+        generating = task is not None and not task.done()
+        if generating:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if turn is task:   # speak() may have queued a new turn while this one wound down
+            turn = None
+        if not generating and not websocket.playing():
+            return
+        unplayed = websocket.stop_playback()
+        meter["cancelled_turns"] += 1
+        log("cancelled", f"✋ Reply cancelled: {reason} ({unplayed:.1f}s unplayed)", session_id=session_id,
+            reason=reason, unplayed_s=round(unplayed, 2))
+        await websocket.send_text(json.dumps({"cancelled": True, "reason": reason, "unplayed_s": round(unplayed, 2)}))
+
+    def queue_turn(run):
+        # Starts run() as the new turn once the turn in flight, if any, is done
+        nonlocal turn
+        previous = turn
 
+        async def after_previous():
+            if previous is not None and not previous.done():
+                await previous   # cancelling this turn (barge-in) cancels that one too
+            await run()
+
+        meter["turns"] += 1
+        turn = asyncio.create_task(after_previous())
+        turn.add_done_callback(lambda _: drain.set_busy(connection, segmenter.in_speech))
+
+    async def speak(text):
+        # The read-back, from the extraction pass: spoken like a reply once the reply in flight is done
+        async def read_back():
+            await realtime_pool.add_message(session_id, "assistant", text)
+            await reply_to_client(websocket, text, session_id, streaming, meter, deltas=iter_text(text), fmt=fmt)
+
+        queue_turn(read_back)
+        drain.set_busy(connection, True)
+
+    async def drop_speculation(outcome):
+        nonlocal speculation
+        if speculation is not None:
+            await speculation.cancel()
+            spec_meter[outcome] += 1
+            log("speculation", f"🔮 Speculative reply {outcome}: {speculation.text}",
+                session_id=session_id, outcome=outcome)
+            speculation = None
+
+    form_progress.speakers[session_id] = speak
     try:
+        await websocket.send_text(json.dumps({"format": fmt.describe(streaming, PCM_SAMPLE_RATE)}))
         while True:
-            chunk = await websocket.receive_bytes()
-            pcm_buffer.extend(chunk)
+            samples = decoder.decode(await websocket.receive_bytes())
+            meter["audio_in_s"] += len(samples) / TARGET_RATE
+
+            events = segmenter.feed_samples(samples)
+            if BARGE_IN and (segmenter.in_speech or events):
+                # The user started talking over the reply: stop generating and synthesizing it.
+                await cancel_turn("barge-in")
+
+            for kind, audio in events:
+                if kind == "partial" and speculation is not None:
+                    await drop_speculation("abandoned")  # the pause was not the end after all
+                if kind != "final" and scheduler.saturated:
+                    continue  # partials and speculation are best-effort; skip them under load
 
-            if len(pcm_buffer) >= 32000:  # 1 second of audio at 16kHz
-                wav_data = convert_pcm_to_wav(pcm_buffer)
-                segments, _ = model.transcribe(wav_data, beam_size=1)
-                text = " ".join([seg.text.strip() for seg in segments])
+                # A final utterance starts a turn: end of speech -> transcript -> reply audio.
+                trace = metrics.start_turn(session_id) if kind == "final" else metrics.NullTrace(session_id)
+                try:
+                    with trace.span("transcribe"):
+                        text = await scheduler.run_batch(session_id, transcribe_segments, audio)
+                except SchedulerBusy:
+                    trace.finish("busy")
+                    if kind == "final":
+                        await websocket.send_text(json.dumps({
+                            "busy": True,
+                            "text": "Sorry, I'm a little busy right now. Could you repeat that?"
+                        }))
+                    continue
+
+                if kind == "partial":
+                    if text:
+                        await websocket.send_text(json.dumps({"partial": text}))
+                    continue
+
+                if kind == "tentative":
+                    if speculation is not None and transcripts_match(speculation.text, text):
+                        continue
+                    await drop_speculation("abandoned")
+                    if text and text != last_transcript:
+                        speculation = SpeculativeReply(session_id, text)
+                        spec_meter["speculations"] += 1
+                    continue
 
                 if text and text != last_transcript:
-                    print("🗣", text)
-                    reply = await stream_text_to_gpt(text)
-                    print("🤖", reply)
+                    log("transcript", f"🗣 {text}", session_id=session_id, turn_id=trace.turn_id)
+                    await websocket.send_text(json.dumps({"transcript": text}))
                     last_transcript = text
 
-                    speech = client.audio.speech.create(
-                        model="tts-1",
-                        voice="nova",
-                        input=reply,
-                        response_format="wav"
-                    )
-                    reply_audio_b64 = base64.b64encode(speech.content).decode("utf-8")
-
-                    await websocket.send_text(json.dumps({
-                        "text": reply,
-                        "audio_b64": reply_audio_b64
-                    }))
+                    await cancel_turn("superseded")
+                    state = await store.aadd_message(session_id, "user", text)
+                    deltas = None
+                    answer = await form_progress.answer(session_id, text)
+                    if answer:
+                        # A reply to the read-back, settled without GPT: speak the tracker's answer
+                        await drop_speculation("misses")
+                        await realtime_pool.add_message(session_id, "user", text)
+                        await realtime_pool.add_message(session_id, "assistant", answer)
+                        deltas = iter_text(answer)
+                    elif speculation is not None and transcripts_match(speculation.text, text):
+                        saved = speculation.head_start()
+                        spec_meter["hits"] += 1
+                        spec_meter["saved_s"] += saved
+                        metrics.observe("speculation_saved", saved)
+                        log("speculation", f"🔮 Speculative reply kept ({saved * 1000:.0f} ms ahead)",
+                            session_id=session_id, turn_id=trace.turn_id, outcome="hits", saved_ms=round(saved * 1000, 1))
+                        deltas, speculation = speculation.adopt(), None
+                    else:
+                        await drop_speculation("misses")
+                    if not answer:
+                        # Answers the assistant's last question; extracted in the background
+                        extractor.submit(session_id, text, state["last_assistant_msg"])
+                    # Queued rather than started: speak() may have queued a read-back since cancel_turn
+                    queue_turn(functools.partial(reply_to_client, websocket, text, session_id, streaming, meter,
+                                                 trace, deltas, fmt))
+                else:
+                    await drop_speculation("misses")
+                    trace.finish("empty")
 
-                pcm_buffer.clear()
+            replying = turn is not None and not turn.done()
+            drain.set_busy(connection, segmenter.in_speech or replying)
+            if drain.draining and not replying and speculation is None and not segmenter.in_speech:
+                # Between turns while shutting down: hand the conversation back so the client reconnects elsewhere
+                log("drained", "🚰 Closing idle connection for drain", session_id=session_id)
+                await websocket.close(code=1012)
+                break
 
     except Exception as e:
-        print("❌ Stream closed or error:", e)
+        log("closed", f"❌ Stream closed or error: {e}", session_id=session_id)
         await websocket.close()
+    finally:
+        if form_progress.speakers.get(session_id) is speak:
+            del form_progress.speakers[session_id]
+        drain.set_busy(connection, False)
+        if turn is not None:
+            turn.cancel()
+        if speculation is not None:
+            speculation.task.cancel()
+        for key, value in meter.items():
+            turn_stats[key] += value
+        for key, value in spec_meter.items():
+            speculation_stats[key] += value
+        wasted = meter["synthesized_s"] - meter["delivered_s"]
+        summary = (f"📊 Session {session_id}: {meter['turns']} turns, {meter['cancelled_turns']} cancelled, "
+                   f"{meter['delivered_s']:.1f}s audio delivered, {wasted:.1f}s wasted "
+                   f"({meter['interrupted_s']:.1f}s cut off while playing), "
+                   f"{meter['bytes_in'] / 1024:.0f} KB in ({kbps(meter['bytes_in'], meter['audio_in_s'])}) / "
+                   f"{meter['bytes_out'] / 1024:.0f} KB out ({kbps(meter['bytes_out'], meter['sent_s'])})")
+        if spec_meter["speculations"]:
+            hit_rate = spec_meter["hits"] / spec_meter["speculations"]
+            summary += (f", speculation {spec_meter['hits']}/{spec_meter['speculations']} hits ({hit_rate:.0%}), "
+                        f"{spec_meter['saved_s']:.2f}s saved")
+        log("session_summary", summary, session_id=session_id, **meter, input_codec=fmt.codec,
+            input_rate=fmt.rate, reply_codec=fmt.reply, corrupt_packets=getattr(decoder, "corrupt", 0),
+            **{f"speculation_{key}": value for key, value in spec_meter.items()})
+        await realtime_pool.release(session_id)
@@ -0,0 +1,90 @@
+# streaming_tts.py (sentence-chunked, pipelined text-to-speech)
+
+import os
+import re
+import asyncio
+from tts_cache import tts_cache
+
+TTS_CONCURRENCY = int(os.getenv("TTS_CONCURRENCY", "3"))
+MIN_SENTENCE_CHARS = 12
+PCM_SAMPLE_RATE = 24000    # OpenAI "pcm" response_format: 24 kHz, 16-bit LE, mono
+
+SENTENCE_END = re.compile(r'[.!?…]+["\')\]]*\s+')
+
+
+class SentenceSplitter:
+    """
+    Incrementally splits streamed text deltas at sentence boundaries. Very
+    short sentences are held back and merged with the next one so TTS is not
+    called for fragments like "Sure."
+    """
+
+    def __init__(self, min_chars=MIN_SENTENCE_CHARS):
+        self.min_chars = min_chars
+        self.buffer = ""
+
+    def feed(self, delta):
+        self.buffer += delta
+        sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(self.buffer):
+            candidate = self.buffer[start:match.end()].strip()
+            if len(candidate) >= self.min_chars:
+                sentences.append(candidate)
+                start = match.end()
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def flush(self):
+        rest, self.buffer = self.buffer.strip(), ""
+        return [rest] if rest else []
+
+
+async def synthesize_pcm(client, text, voice="nova"):
+    return await tts_cache.asynthesize(client, text, response_format="pcm", voice=voice)
+
+
+async def iter_text(text):
+    yield text
+
+
+async def stream_reply_audio(deltas, synthesize, max_concurrency=TTS_CONCURRENCY):
+    """
+    Consumes an async iterator of text deltas and yields (sentence, audio) in
+    reply order. Each sentence is handed to synthesize as soon as it is
+    complete, with at most max_concurrency syntheses in flight, so the first
+    sentence can play while the rest of the reply is still being generated.
+    """
+    queue = asyncio.Queue()
+    limit = asyncio.Semaphore(max_concurrency)
+
+    async def synth(sentence):
+        async with limit:
+            return await synthesize(sentence)
+
+    def schedule(sentence):
+        queue.put_nowait((sentence, asyncio.ensure_future(synth(sentence))))
+
+    async def produce():
+        splitter = SentenceSplitter()
+        try:
+            async for delta in deltas:
+                for sentence in splitter.feed(delta):
+                    schedule(sentence)
+            for sentence in splitter.flush():
+                schedule(sentence)
+        finally:
+            queue.put_nowait(None)
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        while (item := await queue.get()) is not None:
+            sentence, task = item
+            yield sentence, await task
+        await producer  # surface errors raised while reading deltas
+    finally:
+        producer.cancel()
+        while not queue.empty():
+            item = queue.get_nowait()
+            if item is not None:
+                item[1].cancel()
@@ -0,0 +1,280 @@
+# tts_cache.py (content-addressed cache for synthesized speech)
+
+import os
+import re
+import hashlib
+import asyncio
+import threading
+from collections import OrderedDict
+
+TTS_MODEL = "tts-1"
+TTS_VOICE = "nova"
+
+MEMORY_MAX_BYTES = int(os.getenv("TTS_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024)))
+DISK_DIR = os.getenv("TTS_CACHE_DIR")                     # unset = memory tier only
+DISK_MAX_BYTES = int(os.getenv("TTS_CACHE_DISK_BYTES", str(512 * 1024 * 1024)))
+DISK_LOW_WATER = 0.9   # eviction frees down to this share of the budget, so it runs rarely
+
+# Phrases synthesized at startup: one per line in TTS_PREWARM_FILE, or "|"-separated in
+# TTS_PREWARM_PHRASES. None by default, since each one is a paid call per format per worker
+# (workers sharing TTS_CACHE_DIR get the later ones from disk).
+PREWARM_FILE = os.getenv("TTS_PREWARM_FILE")
+PREWARM_FORMATS = os.getenv("TTS_PREWARM_FORMATS", "wav,pcm").split(",")
+
+
+def load_prewarm_phrases(path=PREWARM_FILE, env=os.getenv("TTS_PREWARM_PHRASES", "")):
+    if path:
+        with open(path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    else:
+        lines = env.split("|")
+    return [line.strip() for line in lines if line.strip() and not line.lstrip().startswith("#")]
+
+
+PREWARM_PHRASES = load_prewarm_phrases()
+
+
+def normalize_text(text):
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def cache_key(model, voice, response_format, text):
+    raw = "\0".join([model, voice, response_format, normalize_text(text)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """
+    Two-tier cache of TTS audio keyed on (model, voice, format, normalized text).
+    The memory tier is an LRU bounded by total bytes; the optional disk tier
+    keeps one file per key and evicts the least recently touched files once
+    it grows past its byte budget. The disk total is kept in memory: the
+    directory is only scanned at startup and when a write takes it over
+    budget (which also picks up files other workers wrote). Safe to share
+    between the event loop and worker threads.
+    """
+
+    def __init__(self, max_bytes=MEMORY_MAX_BYTES, disk_dir=DISK_DIR, max_disk_bytes=DISK_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.inflight = {}
+        self.waiters = {}   # key -> callers awaiting inflight[key]
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.abandoned = 0
+        self.prewarmed = False
+        self.disk_lock = threading.Lock()
+        self.disk_size = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self.disk_size = sum(size for _, size, _ in self._disk_files())
+
+    # ---- memory tier ----
+
+    def _memory_get(self, key):
+        with self.lock:
+            data = self.entries.get(key)
+            if data is not None:
+                self.entries.move_to_end(key)
+            return data
+
+    def _memory_put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self.entries[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    # ---- disk tier ----
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], key)
+
+    def _disk_get(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except OSError:
+            return None
+
+    def _disk_put(self, key, data):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        try:
+            replaced = os.stat(path).st_size
+        except OSError:
+            replaced = 0
+        os.replace(tmp_path, path)
+        with self.disk_lock:
+            self.disk_size += len(data) - replaced
+            if self.disk_size > self.max_disk_bytes:
+                self._disk_evict()
+
+    def _disk_files(self):
+        files = []
+        for root, _, names in os.walk(self.disk_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                files.append((st.st_mtime, st.st_size, path))
+        return files
+
+    def _disk_evict(self):
+        # Called with disk_lock held, once the running total is over budget
+        files = self._disk_files()
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes * DISK_LOW_WATER:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self.disk_size = total
+
+    # ---- public API ----
+
+    def get(self, key):
+        data = self._memory_get(key)
+        if data is not None:
+            self.hits += 1
+            return data
+        data = self._disk_get(key)
+        if data is not None:
+            self.disk_hits += 1
+            self._memory_put(key, data)
+            return data
+        self.misses += 1
+        return None
+
+    def put(self, key, data):
+        self._memory_put(key, data)
+        self._disk_put(key, data)
+
+    def synthesize(self, client, text, response_format="wav", model=TTS_MODEL, voice=TTS_VOICE):
+        """Cached client.audio.speech.create for the synchronous OpenAI client."""
+        key = cache_key(model, voice, response_format, text)
+        data = self.get(key)
+        if data is None:
+            speech = client.audio.speech.create(
+                model=model,
+                voice=voice,
+                input=text,
+                response_format=response_format
+            )
+            data = speech.content
+            self.put(key, data)
+        return data
+
+    async def asynthesize(self, client, text, response_format="wav", model=TTS_MODEL, voice=TTS_VOICE):
+        """
+        Cached client.audio.speech.create for AsyncOpenAI. Concurrent requests
+        for the same key share one upstream call, which is cancelled once
+        every caller waiting on it has been (a barge-in stops paying for it).
+        """
+        key = cache_key(model, voice, response_format, text)
+        data = self._memory_get(key)
+        if data is not None:
+            self.hits += 1
+            return data
+
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._afetch(key, client, text, response_format, model, voice))
+            self.inflight[key] = task
+        self.waiters[key] = self.waiters.get(key, 0) + 1
+        try:
+            # Shielded so one caller's cancel does not fail the others sharing the call
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self.waiters[key] == 1 and not task.done():
+                task.cancel()
+                self.inflight.pop(key, None)   # the next caller for this text starts afresh
+                self.abandoned += 1
+            raise
+        finally:
+            self.waiters[key] -= 1
+            if not self.waiters[key]:
+                del self.waiters[key]
+
+    async def _afetch(self, key, client, text, response_format, model, voice):
+        try:
+            data = await asyncio.to_thread(self._disk_get, key) if self.disk_dir else None
+            if data is not None:
+                self.disk_hits += 1
+                self._memory_put(key, data)
+                return data
+            self.misses += 1
+            speech = await client.audio.speech.create(
+                model=model,
+                voice=voice,
+                input=text,
+                response_format=response_format
+            )
+            data = speech.content
+            self._memory_put(key, data)
+            if self.disk_dir:
+                await asyncio.to_thread(self._disk_put, key, data)
+            return data
+        finally:
+            if self.inflight.get(key) is asyncio.current_task():
+                del self.inflight[key]
+
+    async def prewarm(self, client, phrases=PREWARM_PHRASES, formats=PREWARM_FORMATS):
+        if not phrases:
+            self.prewarmed = True   # nothing configured: ready without any TTS calls
+            return
+        for phrase in phrases:
+            for response_format in formats:
+                try:
+                    await self.asynthesize(client, phrase, response_format=response_format)
+                except Exception as e:
+                    print("⚠️ TTS prewarm failed:", phrase, e)
+        self.prewarmed = True
+        print(f"🔥 TTS cache prewarmed: {len(self.entries)} entries, {self.size} bytes")
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            "entries": len(self.entries),
+            "memory_bytes": self.size,
+            "memory_max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            "abandoned": self.abandoned,
+            "disk_dir": self.disk_dir,
+            "disk_bytes": self.disk_size,
+        }
+
+
+tts_cache = TTSCache()
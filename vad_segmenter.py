@@ -0,0 +1,139 @@
+# vad_segmenter.py (energy-based voice activity detection and utterance endpointing)
+
+import os
+import numpy as np
+
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+ENERGY_THRESHOLD = float(os.getenv("VAD_ENERGY_THRESHOLD", "0.01"))   # RMS on a [-1, 1] scale
+NOISE_RATIO = 3.0            # speech must be this much louder than the tracked noise floor
+SILENCE_MS = int(os.getenv("VAD_SILENCE_MS", "500"))                   # pause that ends an utterance
+MIN_SPEECH_MS = 90           # consecutive voiced audio needed to open an utterance
+PREROLL_MS = 200             # audio kept from before the detected onset
+MAX_UTTERANCE_S = 15.0
+PARTIAL_INTERVAL_S = float(os.getenv("VAD_PARTIAL_INTERVAL_S", "1.0"))  # 0 disables partials
+TENTATIVE_MS = int(os.getenv("VAD_TENTATIVE_MS", "0"))                 # short pause that may end it; 0 disables
+
+
+def pcm16_to_float32(pcm_data):
+    return np.frombuffer(pcm_data, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def frame_rms(samples, frame_len):
+    """
+    RMS energy of every complete frame in samples, computed in one vectorized pass.
+    """
+    n_frames = len(samples) // frame_len
+    frames = samples[:n_frames * frame_len].reshape(n_frames, frame_len)
+    return np.sqrt(np.mean(frames * frames, axis=1))
+
+
+class UtteranceSegmenter:
+    """
+    Consumes raw 16-bit PCM chunks and yields ("partial", audio) while the user
+    is talking and ("final", audio) once a pause ends the utterance. With
+    tentative_ms set, a shorter pause first yields ("tentative", audio): the
+    utterance as it stands if the user does not resume. Audio is
+    float32 at SAMPLE_RATE, ready for WhisperModel.transcribe. Silence never
+    leaves the segmenter, so it is never transcribed.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, frame_ms=FRAME_MS, threshold=ENERGY_THRESHOLD,
+                 silence_ms=SILENCE_MS, min_speech_ms=MIN_SPEECH_MS, preroll_ms=PREROLL_MS,
+                 max_utterance_s=MAX_UTTERANCE_S, partial_interval_s=PARTIAL_INTERVAL_S,
+                 tentative_ms=TENTATIVE_MS):
+        self.sample_rate = sample_rate
+        self.frame_len = sample_rate * frame_ms // 1000
+        self.threshold = threshold
+        self.silence_frames = max(1, silence_ms // frame_ms)
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.preroll_frames = preroll_ms // frame_ms
+        self.max_frames = int(max_utterance_s * 1000 // frame_ms)
+        self.partial_frames = int(partial_interval_s * 1000 // frame_ms)
+        self.tentative_frames = tentative_ms // frame_ms if 0 < tentative_ms < silence_ms else 0
+
+        self.noise_floor = threshold / NOISE_RATIO
+        self._leftover = b""
+        self._pending = np.zeros(0, dtype=np.float32)
+        self.reset()
+
+    def reset(self):
+        self._frames = []          # frames of the current (or candidate) utterance
+        self._in_speech = False
+        self._voiced_run = 0
+        self._silent_run = 0
+        self._since_partial = 0
+
+    @property
+    def in_speech(self):
+        return self._in_speech
+
+    def _is_voiced(self, rms):
+        voiced = rms > max(self.threshold, self.noise_floor * NOISE_RATIO)
+        if not voiced:
+            # Track background noise so a noisy room does not read as speech.
+            self.noise_floor = 0.95 * self.noise_floor + 0.05 * rms
+        return voiced
+
+    def feed(self, pcm_data):
+        pcm_data = self._leftover + bytes(pcm_data)
+        usable = len(pcm_data) - (len(pcm_data) % 2)
+        self._leftover = pcm_data[usable:]
+        return self.feed_samples(pcm16_to_float32(pcm_data[:usable]))
+
+    def feed_samples(self, samples):
+        """feed() for audio already decoded to float32 at sample_rate (opus, resampled PCM)."""
+        samples = np.concatenate([self._pending, samples])
+
+        energies = frame_rms(samples, self.frame_len)
+        consumed = len(energies) * self.frame_len
+        self._pending = samples[consumed:]
+
+        events = []
+        for i, rms in enumerate(energies):
+            frame = samples[i * self.frame_len:(i + 1) * self.frame_len]
+            event = self._step(frame, self._is_voiced(rms))
+            if event:
+                events.append(event)
+        return events
+
+    def _step(self, frame, voiced):
+        self._frames.append(frame)
+
+        if not self._in_speech:
+            self._voiced_run = self._voiced_run + 1 if voiced else 0
+            if self._voiced_run >= self.min_speech_frames:
+                self._in_speech = True
+                self._silent_run = 0
+                self._since_partial = 0
+            else:
+                keep = self.preroll_frames + self._voiced_run
+                if len(self._frames) > keep:
+                    del self._frames[:len(self._frames) - keep]
+            return None
+
+        self._silent_run = 0 if voiced else self._silent_run + 1
+        self._since_partial += 1
+
+        if self._silent_run >= self.silence_frames or len(self._frames) >= self.max_frames:
+            return self._finish()
+        if self.tentative_frames and self._silent_run == self.tentative_frames:
+            return ("tentative", np.concatenate(self._frames[:-self._silent_run]))
+        if self.partial_frames and voiced and self._since_partial >= self.partial_frames:
+            self._since_partial = 0
+            return ("partial", np.concatenate(self._frames))
+        return None
+
+    def _finish(self):
+        # Trim the trailing pause; Whisper does not need it.
+        frames = self._frames[:len(self._frames) - self._silent_run] or self._frames
+        audio = np.concatenate(frames)
+        self.reset()
+        return ("final", audio)
+
+    def flush(self):
+        """Ends any utterance in progress, e.g. when the client disconnects."""
+        if self._in_speech:
+            return [self._finish()]
+        self.reset()
+        return []
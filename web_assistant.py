@@ -1,17 +1,14 @@
 import tempfile
 import base64
 import os
-import whisper
-from openai import OpenAI
 import soundfile as sf
 import io
-
-model = whisper.load_model("base")
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+import whisper_registry
+from tts_cache import tts_cache
+from app_resources import resources
 
 def transcribe_audio(file_path):
-    result = model.transcribe(file_path)
-    return result.get("text", "")
+    return whisper_registry.transcribe(file_path)
 
 def query_gpt_response(user_text):
     system_prompt = "You are an AI assistant helping fill out a merchant processing form. Keep your responses concise and formal."
@@ -19,7 +16,7 @@ def query_gpt_response(user_text):
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": user_text}
     ]
-    response = client.chat.completions.create(
+    response = resources.openai_sync.chat.completions.create(
         model="gpt-4",
         messages=messages,
         temperature=0.4
@@ -27,13 +24,7 @@ def query_gpt_response(user_text):
     return response.choices[0].message.content.strip()
 
 def synthesize_speech(text):
-    speech_response = client.audio.speech.create(
-        model="tts-1",
-        voice="nova",
-        input=text,
-        response_format="wav"
-    )
-    audio_bytes = speech_response.content
+    audio_bytes = tts_cache.synthesize(resources.openai_sync, text, response_format="wav")
     return base64.b64encode(audio_bytes).decode("utf-8")
 
 def process_audio_input(file_path):
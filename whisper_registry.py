@@ -0,0 +1,194 @@
+# whisper_registry.py (one lazily loaded Whisper engine per process, shared by every entry point)
+#
+# WHISPER_BACKEND       faster-whisper (CTranslate2, default) or openai-whisper (PyTorch)
+# WHISPER_MODEL_SIZE    tiny / base / small / medium / ... (or a .en variant)
+# WHISPER_COMPUTE_TYPE  int8 / int8_float32 / float32 ...   (faster-whisper only)
+# WHISPER_NUM_WORKERS   transcriptions that may run in parallel; matches INFERENCE_WORKERS by default
+# WHISPER_CPU_THREADS   intra-op threads per worker; cores / workers by default so they do not oversubscribe
+
+import os
+import time
+import threading
+import numpy as np
+from pipeline_metrics import timed
+
+CPU_COUNT = os.cpu_count() or 2
+
+WHISPER_BACKEND = os.getenv("WHISPER_BACKEND", "faster-whisper")   # or "openai-whisper"
+WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL_SIZE", "base")
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")  # faster-whisper only
+WHISPER_NUM_WORKERS = int(os.getenv("WHISPER_NUM_WORKERS", os.getenv("INFERENCE_WORKERS", str(max(1, CPU_COUNT // 2)))))
+WHISPER_CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS", str(max(1, CPU_COUNT // WHISPER_NUM_WORKERS))))
+WHISPER_LANGUAGE = os.getenv("WHISPER_LANGUAGE", "en")
+WHISPER_WARMUP = os.getenv("WHISPER_WARMUP", "1") == "1"
+
+SAMPLE_RATE = 16000
+CHUNK_SECONDS = 30   # Whisper's fixed input window; utterances are capped well below it
+
+
+def _rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class WhisperEngine:
+    """
+    One Whisper model behind a backend-neutral interface: transcribe() for a
+    single file path or 16 kHz float32 array, transcribe_batch() for several
+    short segments decoded in one forward pass. The model loads lazily on
+    first use and only once, however many threads ask for it.
+    """
+
+    def __init__(self, backend=WHISPER_BACKEND, model_size=WHISPER_MODEL_SIZE, compute_type=WHISPER_COMPUTE_TYPE,
+                 cpu_threads=WHISPER_CPU_THREADS, num_workers=WHISPER_NUM_WORKERS, language=WHISPER_LANGUAGE):
+        self.backend = backend
+        self.model_size = model_size
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+        self.num_workers = num_workers
+        self.language = language
+        self.model = None
+        self.lock = threading.Lock()
+        self.batch_fallback = False
+        self.stats = {
+            "backend": backend,
+            "model_size": model_size,
+            "compute_type": compute_type if backend == "faster-whisper" else "float32",
+            "cpu_threads": cpu_threads,
+            "num_workers": num_workers,
+            "loaded": False,
+            "load_seconds": None,
+            "rss_delta_mb": None,
+            "transcriptions": 0,
+            "batches": 0,
+            "batched_segments": 0,
+        }
+
+    def _load(self):
+        if self.backend == "openai-whisper":
+            import torch
+            import whisper
+            torch.set_num_threads(self.cpu_threads)
+            return whisper.load_model(self.model_size, device="cpu")
+        import faster_whisper
+        return faster_whisper.WhisperModel(
+            self.model_size, device="cpu", compute_type=self.compute_type,
+            cpu_threads=self.cpu_threads, num_workers=self.num_workers
+        )
+
+    def get_model(self):
+        if self.model is None:
+            with self.lock:
+                if self.model is None:
+                    rss_before, start = _rss_mb(), time.perf_counter()
+                    model = self._load()
+                    self.stats["load_seconds"] = round(time.perf_counter() - start, 3)
+                    self.stats["rss_delta_mb"] = round(_rss_mb() - rss_before, 1)
+                    self.stats["loaded"] = True
+                    print(f"🧠 Whisper {self.backend}/{self.model_size} ({self.stats['compute_type']}, "
+                          f"{self.cpu_threads} threads x {self.num_workers} workers) loaded in {self.stats['load_seconds']}s")
+                    self.model = model
+        return self.model
+
+    def transcribe(self, audio, **kwargs) -> str:
+        model = self.get_model()
+        self.stats["transcriptions"] += 1
+        # Fixed language as in the batched path: no detection pass per call, same text either way
+        multilingual = model.is_multilingual if self.backend == "openai-whisper" else model.model.is_multilingual
+        if multilingual:
+            kwargs.setdefault("language", self.language)
+        with timed("whisper_inference"):
+            if self.backend == "openai-whisper":
+                return model.transcribe(audio, fp16=False, **kwargs).get("text", "").strip()
+            kwargs.setdefault("beam_size", 1)
+            segments, _ = model.transcribe(audio, **kwargs)  # lazy generator: decoding happens in the join
+            return " ".join([seg.text.strip() for seg in segments]).strip()
+
+    def transcribe_batch(self, audios) -> list:
+        """
+        Transcribes several float32 segments (each under 30 s) together. Falls
+        back to one call per segment for a single segment, or if the backend
+        cannot batch.
+        """
+        if len(audios) == 1 or self.batch_fallback:
+            return [self.transcribe(audio) for audio in audios]
+        model = self.get_model()
+        try:
+            with timed("whisper_batch_inference"):
+                if self.backend == "openai-whisper":
+                    texts = self._decode_batch_torch(model, audios)
+                else:
+                    texts = self._decode_batch_ctranslate2(model, audios)
+        except Exception as e:
+            print("⚠️ Batched Whisper decode unavailable, transcribing one by one:", e)
+            self.batch_fallback = True
+            return [self.transcribe(audio) for audio in audios]
+        self.stats["transcriptions"] += len(audios)
+        self.stats["batches"] += 1
+        self.stats["batched_segments"] += len(audios)
+        return texts
+
+    def _decode_batch_torch(self, model, audios):
+        import torch
+        import whisper
+        mels = torch.stack([
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(np.asarray(audio, dtype=np.float32)),
+                                        n_mels=model.dims.n_mels)
+            for audio in audios
+        ]).to(model.device)
+        language = self.language if model.is_multilingual else None
+        options = whisper.DecodingOptions(language=language, fp16=False, without_timestamps=True)
+        return [result.text.strip() for result in whisper.decode(model, mels, options)]
+
+    def _decode_batch_ctranslate2(self, model, audios):
+        import ctranslate2
+        from faster_whisper.audio import pad_or_trim
+        from faster_whisper.tokenizer import Tokenizer
+
+        n_frames = CHUNK_SECONDS * SAMPLE_RATE // model.feature_extractor.hop_length
+        features = np.stack([
+            pad_or_trim(model.feature_extractor(np.asarray(audio, dtype=np.float32)), n_frames)
+            for audio in audios
+        ]).astype(np.float32)
+        multilingual = model.model.is_multilingual
+        tokenizer = Tokenizer(model.hf_tokenizer, multilingual, task="transcribe",
+                              language=self.language if multilingual else None)
+        prompt = list(tokenizer.sot_sequence) + [tokenizer.no_timestamps]
+        results = model.model.generate(ctranslate2.StorageView.from_array(features),
+                                       [prompt] * len(audios), beam_size=1)
+        return [tokenizer.decode(result.sequences_ids[0]).strip() for result in results]
+
+
+engine = WhisperEngine()
+
+
+def get_model():
+    """Returns the process-wide model, loading it on first use."""
+    return engine.get_model()
+
+
+def transcribe(audio, **kwargs) -> str:
+    """
+    Transcribes a file path or a 16 kHz float32 numpy array with whichever
+    backend is configured and returns the plain text.
+    """
+    return engine.transcribe(audio, **kwargs)
+
+
+def transcribe_batch(audios) -> list:
+    return engine.transcribe_batch(audios)
+
+
+def warm_up_in_background():
+    """Starts loading the model on a daemon thread so the first request does not pay for it."""
+    if WHISPER_WARMUP and engine.model is None:
+        threading.Thread(target=engine.get_model, name="whisper-warmup", daemon=True).start()
+
+
+def stats():
+    return dict(engine.stats)
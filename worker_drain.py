@@ -0,0 +1,55 @@
+# worker_drain.py (graceful shutdown: stop taking new work, let in-flight turns finish)
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+DRAIN_TIMEOUT = float(os.getenv("DRAIN_TIMEOUT", "30"))
+
+
+class Drain:
+    """
+    Counts in-flight turns (a reply being generated and spoken, a PDF being
+    rendered) and connections that are mid-utterance. Once begin() is called the worker reports itself not ready,
+    refuses new conversations and hands idle ones back to the client; the
+    server exits when idle or after DRAIN_TIMEOUT.
+    """
+
+    def __init__(self):
+        self.draining = False
+        self.since = None
+        self.active = 0
+        self.busy = set()              # connections with speech or a reply in progress
+        self.lock = threading.Lock()   # process_browser_audio turns run on worker threads
+
+    def begin(self):
+        if not self.draining:
+            self.draining, self.since = True, time.monotonic()
+            print(f"🚰 Draining: waiting for {self.active} turn(s), {len(self.busy)} busy connection(s)")
+
+    @property
+    def idle(self):
+        return self.active == 0 and not self.busy
+
+    def set_busy(self, key, busy):
+        if busy:
+            self.busy.add(key)
+        else:
+            self.busy.discard(key)
+
+    @contextmanager
+    def turn(self):
+        with self.lock:
+            self.active += 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.active -= 1
+
+    def stats(self):
+        return {"draining": self.draining, "active_turns": self.active, "busy_connections": len(self.busy)}
+
+
+drain = Drain()
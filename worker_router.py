@@ -0,0 +1,159 @@
+# worker_router.py (session-affinity front end for several app workers; started by serve.py)
+
+import os
+import json
+import asyncio
+import hashlib
+import itertools
+from contextlib import asynccontextmanager
+import httpx
+import websockets
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route, WebSocketRoute
+from starlette.websockets import WebSocket
+
+HEALTH_INTERVAL = float(os.getenv("ROUTER_HEALTH_INTERVAL", "1.0"))
+HOP_BY_HOP = {"connection", "keep-alive", "proxy-connection", "transfer-encoding", "te", "trailer", "upgrade", "host"}
+METHODS = ["GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"]
+
+
+class WorkerRouter:
+    """
+    Proxies HTTP and WebSocket traffic to a fixed set of workers. A request
+    carrying a session_id (query string, or JSON body) goes to the same worker
+    every time by rendezvous hashing over the workers whose /readyz answers
+    200, so a session's WebSocket and HTTP calls land together and only a
+    lost or draining worker's sessions move. Everything else is round-robin.
+    """
+
+    def __init__(self, workers):
+        self.workers = list(workers)          # "127.0.0.1:8001", ...
+        self.healthy = set(self.workers)
+        self.turn = itertools.count()
+        self.client = None
+        self.stats = {"http": 0, "websocket": 0, "failovers": 0, "by_worker": dict.fromkeys(self.workers, 0)}
+
+    def pick(self, session_id=None):
+        candidates = [w for w in self.workers if w in self.healthy] or self.workers
+        if session_id:
+            return max(candidates, key=lambda w: hashlib.blake2b(f"{session_id}|{w}".encode(), digest_size=8).digest())
+        return candidates[next(self.turn) % len(candidates)]
+
+    async def check_health(self):
+        while True:
+            for worker in self.workers:
+                try:
+                    response = await self.client.get(f"http://{worker}/readyz", timeout=2)
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    self.healthy.add(worker)
+                elif worker in self.healthy:
+                    self.healthy.discard(worker)
+                    print(f"🩺 Worker {worker} not ready; routing around it")
+            await asyncio.sleep(HEALTH_INTERVAL)
+
+    @staticmethod
+    def session_of(request, body):
+        session_id = request.query_params.get("session_id")
+        if session_id or not body or "json" not in request.headers.get("content-type", ""):
+            return session_id
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return None
+        return data.get("session_id") if isinstance(data, dict) else None
+
+    async def proxy_http(self, request: Request):
+        body = await request.body()
+        session_id = self.session_of(request, body)
+        headers = [(k, v) for k, v in request.headers.raw if k.decode("latin-1").lower() not in HOP_BY_HOP]
+        path = request.url.path + (f"?{request.url.query}" if request.url.query else "")
+        for attempt in range(2):
+            worker = self.pick(session_id)
+            upstream_request = self.client.build_request(request.method, f"http://{worker}{path}",
+                                                         headers=headers, content=body)
+            try:
+                upstream = await self.client.send(upstream_request, stream=True)
+                break
+            except httpx.ConnectError:
+                # Worker gone: state is shared, so any other worker can take the session
+                self.healthy.discard(worker)
+                self.stats["failovers"] += 1
+                if attempt:
+                    return JSONResponse({"error": "No worker available"}, status_code=503)
+        self.stats["http"] += 1
+        self.stats["by_worker"][worker] += 1
+        response_headers = {k: v for k, v in upstream.headers.items() if k.lower() not in HOP_BY_HOP}
+        response_headers["x-worker"] = worker
+        return StreamingResponse(upstream.aiter_raw(), status_code=upstream.status_code,
+                                 headers=response_headers, background=BackgroundTask(upstream.aclose))
+
+    async def proxy_websocket(self, websocket: WebSocket):
+        worker = self.pick(websocket.query_params.get("session_id"))
+        path = websocket.url.path + (f"?{websocket.url.query}" if websocket.url.query else "")
+        try:
+            upstream = await websockets.connect(f"ws://{worker}{path}", max_size=None, ping_interval=None)
+        except (OSError, websockets.InvalidHandshake):
+            self.healthy.discard(worker)
+            self.stats["failovers"] += 1
+            await websocket.close(code=1013)
+            return
+        self.stats["websocket"] += 1
+        self.stats["by_worker"][worker] += 1
+        await websocket.accept(headers=[(b"x-worker", worker.encode())])
+
+        async def to_worker():
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+                await upstream.send(message["bytes"] if message.get("bytes") is not None else message["text"])
+
+        async def to_client():
+            async for message in upstream:
+                if isinstance(message, bytes):
+                    await websocket.send_bytes(message)
+                else:
+                    await websocket.send_text(message)
+
+        pumps = [asyncio.create_task(to_worker()), asyncio.create_task(to_client())]
+        try:
+            done, pending = await asyncio.wait(pumps, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pumps:
+                task.cancel()
+            await upstream.close()
+        if pumps[1] in done:
+            # The worker closed (1012 while draining): pass its code on so the client reconnects
+            try:
+                await websocket.close(code=upstream.close_code or 1000)
+            except RuntimeError:
+                pass
+
+
+def make_app(workers):
+    router = WorkerRouter(workers)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        router.client = httpx.AsyncClient(timeout=None, limits=httpx.Limits(max_keepalive_connections=50))
+        health = asyncio.create_task(router.check_health())
+        yield
+        health.cancel()
+        await router.client.aclose()
+
+    async def router_stats(request):
+        return JSONResponse({**router.stats, "healthy": sorted(router.healthy)})
+
+    app = Starlette(lifespan=lifespan, routes=[
+        Route("/router/stats", router_stats),
+        Route("/{path:path}", router.proxy_http, methods=METHODS),
+        WebSocketRoute("/{path:path}", router.proxy_websocket),
+    ])
+    app.state.router = router
+    return app